@@ -0,0 +1 @@
+# Benchmark scripts for the backend services (run from the backend directory)
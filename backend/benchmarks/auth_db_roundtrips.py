@@ -0,0 +1,188 @@
+"""
+Compare database round trips and latency of the AuthDatabase user paths
+before (find_one + insert_one, full-document login read) and after
+(single insert, projected login read).
+
+Usage (from the backend directory):
+    python -m benchmarks.auth_db_roundtrips                      # mock collection, simulated RTT
+    python -m benchmarks.auth_db_roundtrips --uri mongodb://...  # real MongoDB
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import bcrypt
+import bson
+from pymongo import MongoClient, monitoring
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+auth_dir = os.path.join(backend_root, 'services', 'auth_service')
+for path in (backend_root, auth_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from database import AuthDatabase  # noqa: E402
+from services.utils.mock_db import MockCollection  # noqa: E402
+
+
+class CountingCollection:
+    """Wraps a collection, counting each operation as one round trip and sleeping a simulated RTT"""
+
+    def __init__(self, collection, rtt_ms=0.0):
+        self._collection = collection
+        self._rtt = rtt_ms / 1000.0
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            self.round_trips += 1
+            if self._rtt:
+                time.sleep(self._rtt)
+            return attr(*args, **kwargs)
+        return wrapper
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to a real MongoDB server"""
+
+    def __init__(self):
+        self.round_trips = 0
+
+    def started(self, event):
+        self.round_trips += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_create_user(users, username, email, password):
+    """The previous create_user: duplicate check, then insert"""
+    if users.find_one({"$or": [{"username": username}, {"email": email}]}):
+        return None, "User exists"
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    user = {
+        "username": username,
+        "email": email,
+        "password": hashed,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M")
+    }
+    result = users.insert_one(user)
+    user["_id"] = str(result.inserted_id)
+    return user, None
+
+
+def legacy_verify_user(users, username, password):
+    """The previous verify_user: reads the whole user document"""
+    user = users.find_one({"username": username})
+    if user and bcrypt.checkpw(password.encode("utf-8"), user["password"]):
+        user["_id"] = str(user["_id"])
+        return user, None
+    return None, "Invalid credentials"
+
+
+def _summary(samples, round_trips, doc_bytes=None):
+    samples_ms = sorted(s * 1000 for s in samples)
+    result = {
+        "ops": len(samples_ms),
+        "round_trips_per_op": round(round_trips / len(samples_ms), 2),
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+        "p50_ms": round(samples_ms[len(samples_ms) // 2], 3),
+        "p95_ms": round(samples_ms[int(len(samples_ms) * 0.95) - 1], 3),
+    }
+    if doc_bytes is not None:
+        result["login_doc_bytes"] = doc_bytes
+    return result
+
+
+def _timed(counter, fn, calls):
+    samples = []
+    start_trips = counter.round_trips
+    last = None
+    for args in calls:
+        t0 = time.perf_counter()
+        last = fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return samples, counter.round_trips - start_trips, last
+
+
+def run(users, counter, n, label):
+    """Run registrations, duplicate registrations and logins through both code paths"""
+    db = AuthDatabase.__new__(AuthDatabase)  # Skip the connect/ping in __init__
+    db.users = users
+    run_id = uuid.uuid4().hex[:8]
+    password = "benchmark-password"
+    results = {}
+
+    for path in ("before", "after"):
+        names = [f"{label}-{path}-{run_id}-{i}" for i in range(n)]
+        new_users = [(name, f"{name}@example.com", password) for name in names]
+        logins = [(name, password) for name in names]
+        if path == "before":
+            create = functools.partial(legacy_create_user, users)
+            verify = functools.partial(legacy_verify_user, users)
+        else:
+            create, verify = db.create_user, db.verify_user
+
+        reg_samples, reg_trips, _ = _timed(counter, create, new_users)
+        dup_samples, dup_trips, dup = _timed(counter, create, new_users[:max(1, n // 4)])
+        assert dup == (None, "User exists"), dup
+        login_samples, login_trips, login = _timed(counter, verify, logins)
+        user, _ = login
+        user.pop("_id", None)
+
+        results[path] = {
+            "register": _summary(reg_samples, reg_trips),
+            "register_duplicate": _summary(dup_samples, dup_trips),
+            "login": _summary(login_samples, login_trips, len(bson.encode(user))),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="MongoDB URI; defaults to a temporary mock collection")
+    parser.add_argument("-n", type=int, default=200, help="users to register and log in per path")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="simulated round-trip time for the mock")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="bcrypt cost used during the run, kept low so hashing does not hide DB latency")
+    args = parser.parse_args()
+
+    bcrypt.gensalt = functools.partial(bcrypt.gensalt, rounds=args.bcrypt_rounds)
+
+    if args.uri:
+        counter = CommandCounter()
+        client = MongoClient(args.uri, serverSelectionTimeoutMS=5000, event_listeners=[counter])
+        users = client.get_database().users
+        users.create_index([("username", 1)], unique=True)
+        users.create_index([("email", 1)], unique=True)
+        try:
+            results = run(users, counter, args.n, "bench")
+        finally:
+            users.delete_many({"username": {"$regex": "^bench-"}})
+            client.close()
+    else:
+        collection = MockCollection("users", None)  # In memory: measure round trips, not mock file persistence
+        collection.create_index([("username", 1)], unique=True)
+        collection.create_index([("email", 1)], unique=True)
+        counter = CountingCollection(collection, args.rtt_ms)
+        results = run(counter, counter, args.n, "bench")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
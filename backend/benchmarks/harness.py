@@ -0,0 +1,62 @@
+"""
+Shared pieces of the benchmarks: timing/percentile helpers and proxy event
+builders. Services benchmarked in-process use MONGODB_URI=memory://..., the
+mock database held in memory (see utils/db_backend.py).
+"""
+import json
+import statistics
+import subprocess
+import time
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 3)
+
+    return {"mean": round(statistics.mean(ordered), 3), "p50": pct(0.50), "p95": pct(0.95),
+            "p99": pct(0.99), "max": round(ordered[-1], 3)}
+
+
+def measure(fn, n, warmup=20, setup=None):
+    """
+    Call fn() n times (after a few untimed calls) and return latency percentiles
+    and the sequential request rate. setup(i), if given, runs untimed before each
+    call and its result is passed to fn.
+    """
+    for i in range(min(warmup, n)):
+        fn(setup(-1 - i)) if setup else fn()
+    samples = []
+    for i in range(n):
+        arg = setup(i) if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    result = percentiles(samples)
+    result["rps"] = round(1000 / result["mean"], 1)
+    return result
+
+
+def git_commit(cwd):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def api_event(method, path, body=None, token=None, query=None, source_ip="203.0.113.10"):
+    """A REST API (payload 1.0) proxy event, as API Gateway sends it"""
+    headers = {"Accept": "application/json", "Host": "abc123defg.execute-api.us-east-1.amazonaws.com",
+               "Origin": "https://d1k7vf5yu4148q.cloudfront.net", "X-Forwarded-Proto": "https"}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return {
+        "resource": path, "path": path, "httpMethod": method, "headers": headers,
+        "queryStringParameters": query, "pathParameters": None,
+        "requestContext": {"identity": {"sourceIp": source_ip}, "stage": "prod"},
+        "body": json.dumps(body) if body is not None else None, "isBase64Encoded": False,
+    }
@@ -0,0 +1,141 @@
+"""
+Cold-start import profile for each service handler.
+
+Imports every handler in a fresh interpreter with `-X importtime` and reports
+the wall-clock cold-init time, the time spent per top-level package and the
+slowest import chains. Secrets Manager is disabled (SECRETS_ARN unset) so the
+numbers reflect imports and module-level setup only.
+
+Usage (from the backend directory):
+    python -m benchmarks.import_profile [--service auth] [--repeat 5] [--top 15] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICES = {
+    "auth": "services/auth_service",
+    "inventory": "services/inventory_service",
+    "recipe": "services/recipe_service",
+}
+
+# Dependencies that should only be loaded on first use, never while importing a handler
+HEAVY_MODULES = ("boto3", "botocore", "pymongo", "bcrypt", "groq", "requests", "dotenv")
+
+SNIPPET = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import handler\n"
+    "ms = (time.perf_counter() - t) * 1000\n"
+    "heavy = sorted(m for m in {heavy!r} if m in sys.modules)\n"
+    "print('__PROFILE__' + json.dumps({{'init_ms': ms, 'heavy_loaded': heavy}}), flush=True)\n"
+)
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def profile_once(service_dir):
+    env = dict(os.environ)
+    env.pop("SECRETS_ARN", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET.format(heavy=HEAVY_MODULES)],
+        cwd=os.path.join(backend_root, service_dir), env=env,
+        capture_output=True, text=True, check=True,
+    )
+    summary = None
+    for line in result.stdout.splitlines():
+        if line.startswith("__PROFILE__"):
+            summary = json.loads(line[len("__PROFILE__"):])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return summary, imports
+
+
+def analyse(runs, top):
+    init_ms = [summary["init_ms"] for summary, _ in runs]
+    # Use the median run for the breakdown
+    median_index = sorted(range(len(runs)), key=lambda i: init_ms[i])[len(runs) // 2]
+    summary, imports = runs[median_index]
+
+    # importtime prints children before their parent: the handler's subtree is every
+    # line between the previous top-level import and the "handler" line itself
+    end = next(i for i, entry in enumerate(imports) if entry[0] == "handler" and entry[3] == 0)
+    start = end
+    while start > 0 and imports[start - 1][3] > 0:
+        start -= 1
+    subtree = imports[start:end + 1]
+
+    by_package = defaultdict(int)
+    for module, self_us, _, _ in subtree:
+        by_package[module.split(".")[0]] += self_us
+
+    # Modules imported directly by handler.py, with everything they pulled in
+    direct = sorted(
+        ((module, cumulative_us) for module, _, cumulative_us, depth in subtree if depth == 1),
+        key=lambda item: item[1], reverse=True,
+    )
+    return {
+        "init_ms": {
+            "median": round(statistics.median(init_ms), 1),
+            "min": round(min(init_ms), 1),
+            "max": round(max(init_ms), 1),
+        },
+        "handler_import_ms": round(imports[end][2] / 1000, 1),
+        "heavy_modules_loaded": summary["heavy_loaded"],
+        "by_package_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        "slowest_direct_imports_ms": {module: round(us / 1000, 1) for module, us in direct[:top]},
+    }
+
+
+def print_report(report):
+    for service, data in report.items():
+        init = data["init_ms"]
+        print(f"\n=== {service} service: cold init {init['median']} ms "
+              f"(min {init['min']}, max {init['max']}); handler import tree {data['handler_import_ms']} ms ===")
+        heavy = ", ".join(data["heavy_modules_loaded"]) or "none"
+        print(f"Heavy modules loaded at import: {heavy}")
+        print("Self time by package:")
+        for package, ms in data["by_package_ms"].items():
+            print(f"  {ms:8.1f} ms  {package}")
+        print("Slowest direct imports of handler.py (cumulative):")
+        for module, ms in data["slowest_direct_imports_ms"].items():
+            print(f"  {ms:8.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=sorted(SERVICES), action="append",
+                        help="service to profile (repeatable); defaults to all")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per service")
+    parser.add_argument("--top", type=int, default=15, help="rows per breakdown")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    for service in args.service or list(SERVICES):
+        runs = [profile_once(SERVICES[service]) for _ in range(args.repeat)]
+        report[service] = analyse(runs, args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local stand-in for the Groq chat-completions API, so benchmarks exercise the
+real prediction and recipe code paths without network access or an API key.
+
+Requests asking for a JSON object get a food prediction; everything else gets
+a Markdown recipe. An optional delay simulates model latency.
+
+    server, base_url = start_llm_stub(latency_ms=50)
+    os.environ["GROQ_API_URL"] = base_url + "/openai/v1/chat/completions"  # requests path
+    os.environ["GROQ_BASE_URL"] = base_url                                 # groq SDK
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREDICTION = {"category": "Produce", "expiry": "Keeps 5-7 days refrigerated in a sealed container"}
+
+RECIPE = """# Spinach and Feta Omelette
+
+**Serves:** 2 | **Time:** 15 minutes
+
+## Ingredients
+- 4 eggs
+- 2 cups baby spinach
+- 1/3 cup crumbled feta cheese
+- 1 tbsp butter, salt and pepper
+
+## Instructions
+1. Whisk the eggs with a pinch of salt and pepper.
+2. Melt the butter in a non-stick pan over medium heat and wilt the spinach.
+3. Pour in the eggs, let them set for a minute, then scatter the feta over one half.
+4. Fold, cook for another minute and serve warm.
+"""
+
+
+def completion(content, model):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 64, "completion_tokens": 160, "total_tokens": 224},
+    }
+
+
+def _handler_class(latency_ms):
+    class LLMStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Avoids 40 ms delayed-ACK stalls on keep-alive connections
+
+        def _reply(self, status, payload=None):
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_HEAD(self):
+            self._reply(405)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            wants_json = (request.get("response_format") or {}).get("type") == "json_object"
+            content = json.dumps(PREDICTION) if wants_json else RECIPE
+            self._reply(200, completion(content, request.get("model", "stub")))
+
+        def log_message(self, format, *args):
+            pass
+
+    return LLMStubHandler
+
+
+def start_llm_stub(latency_ms=0, port=0):
+    """Serve the stub on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler_class(latency_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
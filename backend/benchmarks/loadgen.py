@@ -0,0 +1,428 @@
+"""
+Load generator: seeds a synthetic dataset and drives concurrent user sessions.
+
+seed  writes N users and M items per user straight into MongoDB (--uri, or
+      MONGODB_URI; mock+sqlite:// URIs work too) or the file-backed mock
+      database (--mock). Item names
+      follow a Zipf-like popularity curve over a grocery catalogue, so a few
+      staples dominate like in real pantries. The users' credentials go to a
+      manifest file for the run phase.
+
+run   starts --concurrency workers, each playing user sessions back to back:
+      log in (or register), list items, add a few, delete one and sometimes
+      generate a recipe. Targets are the run-local.py ports by default, or a
+      deployed API with --base-url. At the end it prints throughput, error
+      rates and a latency histogram per operation.
+
+Usage (from the backend directory):
+    python -m benchmarks.loadgen seed --users 200 --items 40 [--uri mongodb://... | --mock]
+    python -m benchmarks.loadgen run --concurrency 20 --duration 60 \\
+        [--base-url https://abc123.execute-api.us-east-1.amazonaws.com/prod] [--out load.json]
+
+Against run-local.py, raise the login throttle first (LOGIN_THROTTLE_IP_BURST,
+LOGIN_THROTTLE_USER_BURST) or most logins come back 429.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from benchmarks.harness import percentiles  # noqa: E402
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "loadgen_users.json")
+DEFAULT_PASSWORD = "Load-Test-Pantry-7"
+LOCAL_URLS = {
+    "auth": "http://localhost:3000",
+    "inventory": "http://localhost:3001",
+    "recipe": "http://localhost:3002",
+}
+
+# (name, category, predicted expiry), most popular first
+CATALOGUE = [
+    ("Milk", "Dairy", "7 days"), ("Eggs", "Dairy", "3 weeks"), ("Bread", "Bakery", "5 days"),
+    ("Bananas", "Produce", "5 days"), ("Chicken Breast", "Meat", "2 days"), ("Butter", "Dairy", "1 month"),
+    ("Cheddar Cheese", "Dairy", "3 weeks"), ("Tomatoes", "Produce", "1 week"), ("Onions", "Produce", "1 month"),
+    ("Potatoes", "Produce", "3 weeks"), ("Apples", "Produce", "3 weeks"), ("Greek Yogurt", "Dairy", "2 weeks"),
+    ("Rice", "Pantry", "1 year"), ("Pasta", "Pantry", "1 year"), ("Carrots", "Produce", "3 weeks"),
+    ("Baby Spinach", "Produce", "5 days"), ("Ground Beef", "Meat", "2 days"), ("Garlic", "Produce", "1 month"),
+    ("Orange Juice", "Beverages", "1 week"), ("Lettuce", "Produce", "1 week"), ("Bell Peppers", "Produce", "1 week"),
+    ("Strawberries", "Produce", "4 days"), ("Salmon Fillet", "Seafood", "2 days"), ("Cucumber", "Produce", "1 week"),
+    ("Avocados", "Produce", "4 days"), ("Broccoli", "Produce", "5 days"), ("Olive Oil", "Pantry", "1 year"),
+    ("Canned Tomatoes", "Pantry", "1 year"), ("Peanut Butter", "Pantry", "6 months"), ("Oats", "Pantry", "6 months"),
+    ("Mozzarella", "Dairy", "2 weeks"), ("Bacon", "Meat", "1 week"), ("Lemons", "Produce", "3 weeks"),
+    ("Mushrooms", "Produce", "1 week"), ("Tortillas", "Bakery", "2 weeks"), ("Black Beans", "Pantry", "1 year"),
+    ("Frozen Peas", "Frozen", "8 months"), ("Cream Cheese", "Dairy", "3 weeks"), ("Blueberries", "Produce", "1 week"),
+    ("Ham", "Meat", "5 days"), ("Celery", "Produce", "2 weeks"), ("Sour Cream", "Dairy", "2 weeks"),
+    ("Zucchini", "Produce", "1 week"), ("Tofu", "Protein", "1 week"), ("Shrimp", "Seafood", "2 days"),
+    ("Feta Cheese", "Dairy", "3 weeks"), ("Parmesan", "Dairy", "2 months"), ("Kale", "Produce", "5 days"),
+    ("Sweet Potatoes", "Produce", "3 weeks"), ("Ginger", "Produce", "3 weeks"), ("Coconut Milk", "Pantry", "1 year"),
+    ("Frozen Pizza", "Frozen", "6 months"), ("Hummus", "Deli", "1 week"), ("Grapes", "Produce", "1 week"),
+    ("Limes", "Produce", "3 weeks"), ("Cilantro", "Produce", "1 week"), ("Pork Chops", "Meat", "3 days"),
+    ("Almond Milk", "Beverages", "7 days"), ("Ice Cream", "Frozen", "2 months"), ("Maple Syrup", "Pantry", "1 year"),
+]
+# Prefixes that make sense per category; the empty string keeps plain names the most common
+QUALIFIERS = {
+    "Dairy": ["", "", "", "Organic ", "Low-Fat ", "Whole ", "Store Brand "],
+    "Produce": ["", "", "", "Organic ", "Fresh ", "Local "],
+    "Meat": ["", "", "Organic ", "Free-Range ", "Lean "],
+    "Bakery": ["", "", "Whole Wheat ", "Sourdough "],
+}
+FIRST_NAMES = ["olivia", "liam", "emma", "noah", "ava", "oliver", "sophia", "elijah", "mia", "lucas", "amelia",
+               "mateo", "harper", "ethan", "aria", "arjun", "priya", "wei", "yuki", "fatima", "omar", "chloe",
+               "diego", "sara", "kofi", "ines", "hana", "leo", "nora", "ravi"]
+LAST_NAMES = ["smith", "garcia", "chen", "patel", "nguyen", "kim", "brown", "martin", "singh", "lopez", "khan",
+              "murphy", "rossi", "tanaka", "silva", "cohen", "okafor", "muller", "ivanova", "haddad"]
+
+
+def zipf_weights(n, s=1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+ITEM_WEIGHTS = zipf_weights(len(CATALOGUE))
+
+
+def random_item(rng):
+    """(item_name, category, predicted_expiry) drawn by popularity"""
+    name, category, expiry = rng.choices(CATALOGUE, weights=ITEM_WEIGHTS)[0]
+    return rng.choice(QUALIFIERS.get(category, ["", "", "Store Brand "])) + name, category, expiry
+
+
+def random_username(rng, n):
+    return f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}{n}"
+
+
+# --- Seeding ---
+
+def _object_id(mock):
+    from bson import ObjectId
+
+    oid = ObjectId()
+    if mock:
+        from services.utils.mock_db import MockObjectId
+        return MockObjectId(str(oid))
+    return oid
+
+
+def _insert_all(collection, docs):
+    if not docs:
+        return
+    if hasattr(collection, "insert_many"):
+        collection.insert_many(docs)
+    else:
+        for doc in docs:
+            collection.insert_one(doc)
+
+
+def seed(db, users, items_per_user, password=DEFAULT_PASSWORD, bcrypt_rounds=10, seed_value=None,
+         mock=False, batch_size=1000):
+    """Insert the synthetic users and items; returns the credentials of the seeded users"""
+    import bcrypt
+
+    rng = random.Random(seed_value)
+    # Every seeded user shares one password, so one hash does for all of them
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=bcrypt_rounds))
+    now = datetime.now()
+    run_tag = format(int(time.time()), "x")
+
+    credentials, user_docs, item_docs = [], [], []
+    for n in range(users):
+        username = f"{random_username(rng, n)}.{run_tag}"
+        user_id = _object_id(mock)
+        user_docs.append({
+            "_id": user_id,
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": hashed,
+            "created_at": (now - timedelta(days=rng.randint(0, 365))).strftime("%Y-%m-%d %H:%M"),
+        })
+        credentials.append({"username": username, "password": password, "user_id": str(user_id)})
+        # Pantry sizes vary around the requested mean
+        for _ in range(max(0, int(rng.gauss(items_per_user, items_per_user / 4)))):
+            item_name, category, expiry = random_item(rng)
+            item_docs.append({
+                "_id": _object_id(mock),
+                "user_id": str(user_id),
+                "item_name": item_name,
+                "category": category,
+                "predicted_expiry": expiry,
+                "added_on": (now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))).strftime("%Y-%m-%d %H:%M"),
+            })
+        if len(item_docs) >= batch_size:
+            _insert_all(db.items, item_docs)
+            item_docs = []
+    _insert_all(db.users, user_docs)
+    _insert_all(db.items, item_docs)
+    return credentials
+
+
+def run_seed(args):
+    from utils.config import MOCK_MONGODB_URI
+    from utils.db_backend import create_client, is_mock_uri
+
+    uri = MOCK_MONGODB_URI if args.mock else args.uri or os.environ.get("MONGODB_URI")
+    if not uri:
+        sys.exit("Pass --uri, set MONGODB_URI or use --mock")
+    mock = is_mock_uri(uri)
+    client = create_client(uri, serverSelectionTimeoutMS=5000)
+    if mock and getattr(client, "data_dir", None):
+        target = f"mock database in {os.path.abspath(client.data_dir)}"
+    else:
+        target = uri.split("@")[-1]  # Keep credentials out of the output
+    db = client.get_database()
+
+    start = time.perf_counter()
+    credentials = seed(db, args.users, args.items, args.password, args.bcrypt_rounds, args.seed, mock=mock)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.manifest)), exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump({"created": datetime.now().isoformat(timespec="seconds"), "users": credentials}, f, indent=2)
+    client.close()
+    print(f"Seeded {len(credentials)} users (~{args.items} items each) into {target} in {elapsed:.1f} s")
+    print(f"Credentials written to {args.manifest}")
+
+
+# --- Load ---
+
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Recorder:
+    """Latency samples, status codes and errors per operation, shared by the workers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.statuses = {}
+        self.errors = Counter()
+
+    def record(self, operation, ms, status, ok):
+        with self._lock:
+            self.samples.setdefault(operation, []).append(ms)
+            self.statuses.setdefault(operation, Counter())[status] += 1
+            if not ok:
+                self.errors[operation] += 1
+
+    def summary(self, elapsed_s):
+        operations = {}
+        for operation, samples in sorted(self.samples.items()):
+            histogram = Counter()
+            for ms in samples:
+                histogram[next((b for b in HISTOGRAM_BOUNDS_MS if ms <= b), "inf")] += 1
+            operations[operation] = {
+                "requests": len(samples),
+                "errors": self.errors[operation],
+                "error_rate": round(self.errors[operation] / len(samples), 4),
+                "rps": round(len(samples) / elapsed_s, 1),
+                "latency_ms": percentiles(samples),
+                "statuses": {str(k): v for k, v in sorted(self.statuses[operation].items(), key=str)},
+                "histogram_ms": {f"<={b}" if b != "inf" else f">{HISTOGRAM_BOUNDS_MS[-1]}": histogram[b]
+                                 for b in (*HISTOGRAM_BOUNDS_MS, "inf") if histogram[b]},
+            }
+        total = sum(op["requests"] for op in operations.values())
+        errors = sum(op["errors"] for op in operations.values())
+        return {
+            "elapsed_s": round(elapsed_s, 2),
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "rps": round(total / elapsed_s, 1) if elapsed_s else 0.0,
+            "operations": operations,
+        }
+
+
+class Session:
+    """One virtual user: a requests session with its own token"""
+
+    def __init__(self, urls, recorder, rng, timeout):
+        import requests
+
+        self.http = requests.Session()
+        self.urls = urls
+        self.recorder = recorder
+        self.rng = rng
+        self.timeout = timeout
+        self.token = None
+
+    def request(self, operation, service, method, path, expected, **kwargs):
+        import requests
+
+        headers = {"Accept-Encoding": "gzip, br"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.urls[service] + path, headers=headers,
+                                         timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        self.recorder.record(operation, (time.perf_counter() - start) * 1000, status, status in expected)
+        return response if status in expected else None
+
+    def login(self, credentials):
+        response = self.request("login", "auth", "POST", "/auth/login", (200,), json=credentials)
+        self.token = response.json()["token"] if response is not None else None
+        return self.token is not None
+
+    def register(self, n):
+        username = f"{random_username(self.rng, n)}.{os.getpid()}"
+        credentials = {"username": username, "password": DEFAULT_PASSWORD}
+        response = self.request("register", "auth", "POST", "/auth/register", (200, 201),
+                                json={**credentials, "email": f"{username}@example.com"})
+        return credentials if response is not None else None
+
+
+def play_session(session, credentials, args, new_user_n):
+    """register/login -> list -> add -> list -> delete -> maybe generate a recipe"""
+    rng = session.rng
+    think = args.think_ms / 1000
+
+    if credentials is None or rng.random() < args.register_ratio:
+        credentials = session.register(new_user_n) or credentials
+    if credentials is None or not session.login(credentials):
+        return
+    time.sleep(think)
+
+    session.request("list_items", "inventory", "GET", "/inventory/items", (200,))
+    added = []
+    for _ in range(rng.randint(1, args.adds_per_session)):
+        time.sleep(think)
+        item_name = random_item(rng)[0]
+        response = session.request("add_item", "inventory", "POST", "/inventory/items", (201,),
+                                   json={"item_name": item_name})
+        if response is not None:
+            added.append(response.json()["item"])
+    time.sleep(think)
+
+    response = session.request("list_items", "inventory", "GET", "/inventory/items", (200,))
+    if added:
+        time.sleep(think)
+        victim = added.pop(rng.randrange(len(added)))
+        session.request("delete_item", "inventory", "DELETE", f"/inventory/items/{victim['_id']}", (200,))
+
+    if response is not None and rng.random() < args.recipe_ratio:
+        items = [item["item_name"] for item in response.json().get("items", [])]
+        if items:
+            time.sleep(think)
+            chosen = rng.sample(items, min(len(items), 5))
+            session.request("generate_recipe", "recipe", "GET", "/recipes/generate", (200,),
+                            params={"items": ",".join(chosen)})
+
+
+def run_load(args):
+    if args.base_url:
+        urls = dict.fromkeys(LOCAL_URLS, args.base_url.rstrip("/"))
+    else:
+        urls = {service: getattr(args, f"{service}_url") or url for service, url in LOCAL_URLS.items()}
+
+    users = []
+    if os.path.exists(args.manifest):
+        with open(args.manifest) as f:
+            users = [{"username": u["username"], "password": u["password"]} for u in json.load(f)["users"]]
+    elif args.register_ratio < 1:
+        print(f"No manifest at {args.manifest}; every session registers a new user")
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    counter = {"sessions": 0}
+    counter_lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(None if args.seed is None else args.seed + index)
+        session = Session(urls, recorder, rng, args.timeout)
+        while time.monotonic() < deadline:
+            with counter_lock:
+                if args.sessions and counter["sessions"] >= args.sessions:
+                    return
+                counter["sessions"] += 1
+                n = counter["sessions"]
+            session.token = None
+            play_session(session, rng.choice(users) if users else None, args, n)
+
+    print(f"Running {args.concurrency} workers for up to {args.duration} s against "
+          f"{', '.join(sorted(set(urls.values())))}")
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = recorder.summary(time.perf_counter() - start)
+    report["sessions"] = counter["sessions"]
+    report["config"] = {key: getattr(args, key) for key in
+                        ("concurrency", "duration", "sessions", "think_ms", "register_ratio",
+                         "recipe_ratio", "adds_per_session")}
+    report["targets"] = urls
+    return report
+
+
+def print_load_report(report):
+    print(f"\n{report['sessions']} sessions, {report['requests']} requests in {report['elapsed_s']} s: "
+          f"{report['rps']} req/s, {report['error_rate']:.2%} errors")
+    print(f"\n  {'operation':<16}{'reqs':>7}{'req/s':>8}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}  statuses")
+    for name, op in report["operations"].items():
+        lat = op["latency_ms"]
+        statuses = " ".join(f"{code}:{count}" for code, count in op["statuses"].items())
+        print(f"  {name:<16}{op['requests']:>7}{op['rps']:>8}{op['error_rate']:>8.1%}{lat['p50']:>9.1f}"
+              f"{lat['p95']:>9.1f}{lat['p99']:>9.1f}{lat['max']:>9.1f}  {statuses}")
+    for name, op in report["operations"].items():
+        print(f"\n  {name} latency histogram")
+        peak = max(op["histogram_ms"].values())
+        for bucket, count in op["histogram_ms"].items():
+            print(f"    {bucket:>8} ms {count:>7}  {'#' * max(1, round(40 * count / peak))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="seeded users' credentials (JSON)")
+    parser.add_argument("--seed", type=int, help="random seed for a reproducible dataset/run")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = commands.add_parser("seed", help="insert synthetic users and items")
+    seed_cmd.add_argument("--users", type=int, default=100)
+    seed_cmd.add_argument("--items", type=int, default=30, help="mean items per user")
+    seed_cmd.add_argument("--uri", help="MongoDB URI (default: MONGODB_URI)")
+    seed_cmd.add_argument("--mock", action="store_true", help="seed the file-backed mock database")
+    seed_cmd.add_argument("--password", default=DEFAULT_PASSWORD)
+    seed_cmd.add_argument("--bcrypt-rounds", type=int, default=10)
+
+    run_cmd = commands.add_parser("run", help="drive concurrent sessions")
+    run_cmd.add_argument("--concurrency", type=int, default=10)
+    run_cmd.add_argument("--duration", type=float, default=30, help="seconds")
+    run_cmd.add_argument("--sessions", type=int, default=0, help="stop after this many sessions (0: no limit)")
+    run_cmd.add_argument("--base-url", help="deployed API (all services under one URL)")
+    for service, url in LOCAL_URLS.items():
+        run_cmd.add_argument(f"--{service}-url", help=f"default {url}")
+    run_cmd.add_argument("--think-ms", type=float, default=0, help="pause between a session's requests")
+    run_cmd.add_argument("--register-ratio", type=float, default=0.05, help="share of sessions that register")
+    run_cmd.add_argument("--recipe-ratio", type=float, default=0.2, help="share of sessions that generate a recipe")
+    run_cmd.add_argument("--adds-per-session", type=int, default=3)
+    run_cmd.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    run_cmd.add_argument("--out", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        run_seed(args)
+        return
+
+    report = run_load(args)
+    print_load_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
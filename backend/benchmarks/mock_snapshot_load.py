@@ -0,0 +1,115 @@
+"""
+Startup cost of a large mock collection with a JSON snapshot vs a binary
+(memory-mapped, decoded on demand) one.
+
+Seeds an inventory collection of --docs items in a temporary directory in
+each format, then, in a fresh interpreter per run, loads it, builds the
+inventory service's indexes and looks up one user's items. Reports the time
+of each step and the resident memory the collection added.
+
+Usage (from the backend directory):
+    python -m benchmarks.mock_snapshot_load [--docs 200000] [--users 2000] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from services.utils.mock_db import MockCollection  # noqa: E402
+
+FORMATS = ("json", "binary")
+
+SNIPPET = (
+    "import json, resource, time\n"
+    "from services.utils.mock_db import MockCollection\n"
+    "def rss_kb():\n"
+    "    try:\n"
+    "        with open('/proc/self/statm') as f:\n"
+    "            return int(f.read().split()[1]) * resource.getpagesize() // 1024\n"
+    "    except OSError:\n"
+    "        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    "base = rss_kb()\n"
+    "t = time.perf_counter()\n"
+    "items = MockCollection('items', {data_dir!r}, snapshot_format={snapshot_format!r})\n"
+    "load = time.perf_counter()\n"
+    "items.create_index([('user_id', 1)])\n"
+    "items.create_index([('name', 1)])\n"
+    "index = time.perf_counter()\n"
+    "found = len(list(items.find({{'user_id': 'user-7'}})))\n"
+    "query = time.perf_counter()\n"
+    "print('__LOAD__' + json.dumps({{'load_ms': (load - t) * 1000, 'index_ms': (index - load) * 1000,\n"
+    "      'query_ms': (query - index) * 1000, 'found': found, 'rss_mb': (rss_kb() - base) / 1024}}), flush=True)\n"
+)
+
+
+def seed(data_dir, snapshot_format, docs, users):
+    items = MockCollection('items', data_dir, snapshot_format=snapshot_format)
+    items.create_index([('user_id', 1)])
+    items.create_index([('name', 1)])
+    items.insert_many([
+        {
+            'user_id': f"user-{n % users}",
+            'item_name': f"item {n}",
+            'category': ('Dairy', 'Produce', 'Bakery', 'Meat')[n % 4],
+            'predicted_expiry': f"{(n % 21) + 1} days",
+            'added_on': "2024-05-01 12:00",
+        }
+        for n in range(docs)
+    ])
+    with items._writing():
+        items._save_data()
+    items.close()
+    return os.path.getsize(items._get_file_path('.snap' if snapshot_format == 'binary' else '.json'))
+
+
+def load_once(data_dir, snapshot_format):
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(data_dir=data_dir, snapshot_format=snapshot_format)],
+        cwd=backend_root, capture_output=True, text=True, check=True,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("__LOAD__"):
+            return json.loads(line[len("__LOAD__"):])
+    raise RuntimeError(f"No result from the load run: {result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200000, help="items in the collection")
+    parser.add_argument("--users", type=int, default=2000, help="distinct user_ids")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per format")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for snapshot_format in FORMATS:
+            data_dir = os.path.join(tmp, snapshot_format)
+            size = seed(data_dir, snapshot_format, args.docs, args.users)
+            runs = [load_once(data_dir, snapshot_format) for _ in range(args.repeat)]
+            report[snapshot_format] = {
+                "snapshot_mb": round(size / 1024 / 1024, 1),
+                **{key: round(statistics.median(run[key] for run in runs), 1)
+                   for key in ("load_ms", "index_ms", "query_ms", "rss_mb")},
+                "found": runs[0]["found"],
+            }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{args.docs} items, {args.users} users; median of {args.repeat} fresh interpreters")
+    print(f"{'format':8} {'snapshot MB':>12} {'load ms':>9} {'index ms':>9} {'query ms':>9} {'RSS MB':>8}")
+    for snapshot_format, row in report.items():
+        print(f"{snapshot_format:8} {row['snapshot_mb']:12.1f} {row['load_ms']:9.1f} {row['index_ms']:9.1f} "
+              f"{row['query_ms']:9.1f} {row['rss_mb']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Latency of an inventory -> recipe food prediction per inter-service transport.
+
+The recipe service's real code runs against a local LLM stub
+(benchmarks.llm_stub), so the numbers show the transport's own overhead:
+
+- inprocess:       InProcessTransport, a direct call of _handle_prediction
+- http:            HttpTransport to the recipe Flask app on a local port
+- lambda:          LambdaTransport (one cached boto3 client) against a local
+                   emulation of the Lambda Invoke API that runs the recipe lambda_handler
+- lambda_per_call: the previous behaviour, a new boto3 client for every call
+
+send() (fire-and-forget) is timed as the time until the caller gets control back.
+
+Usage (from the backend directory):
+    python -m benchmarks.service_client_latency [-n 300] [--llm-latency-ms 0] [--out results.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from benchmarks.harness import measure  # noqa: E402
+from benchmarks.llm_stub import start_llm_stub  # noqa: E402
+
+FUNCTION_NAME = "GroceryAssistant-RecipeService-bench"
+
+
+def start_lambda_emulator(lambda_handler):
+    """Minimal Lambda Invoke API (POST /2015-03-31/functions/<name>/invocations)"""
+
+    class InvokeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Avoids 40 ms delayed-ACK stalls on keep-alive connections
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            event = json.loads(self.rfile.read(length) or b"{}")
+            if self.headers.get("X-Amz-Invocation-Type") == "Event":
+                threading.Thread(target=lambda_handler, args=(event, None), daemon=True).start()
+                status, body = 202, b""
+            else:
+                status, body = 200, json.dumps(lambda_handler(event, None)).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Amz-Executed-Version", "$LATEST")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InvokeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_wsgi_app(app):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=300, help="calls per transport")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="simulated model latency")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    _, llm_url = start_llm_stub(args.llm_latency_ms)
+    os.environ.update({
+        "GROQ_API_KEY": "bench", "GROQ_API_URL": llm_url + "/openai/v1/chat/completions",
+        "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench", "AWS_DEFAULT_REGION": "us-east-1",
+        "LOG_LEVEL": "WARNING",
+    })
+    os.environ.pop("SECRETS_ARN", None)
+
+    from utils.service_client import (HttpTransport, InProcessTransport, LambdaTransport,
+                                      load_service_module)
+
+    recipe = load_service_module("recipe")
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    # Fire-and-forget bursts overflow the keep-alive pools; that is expected here
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
+    _, recipe_url = start_wsgi_app(recipe.app)
+    _, lambda_url = start_lambda_emulator(recipe.lambda_handler)
+
+    payload = {"item_name": "Baby Spinach"}
+    transports = {
+        "inprocess": InProcessTransport("recipe", recipe),
+        "http": HttpTransport("recipe", recipe_url),
+        "lambda": LambdaTransport(FUNCTION_NAME, endpoint_url=lambda_url),
+    }
+
+    results = {"n": args.n, "llm_latency_ms": args.llm_latency_ms, "call_ms": {}, "send_ms": {}}
+    for name, transport in transports.items():
+        result = transport.call("predict_food_info", payload)
+        assert result.get("success"), (name, result)
+        results["call_ms"][name] = measure(lambda: transport.call("predict_food_info", payload), args.n)
+        results["send_ms"][name] = measure(lambda: transport.send("predict_food_info", payload), args.n)
+
+    import boto3
+
+    def per_call_client():
+        client = boto3.client("lambda", endpoint_url=lambda_url)
+        response = client.invoke(FunctionName=FUNCTION_NAME, InvocationType="RequestResponse",
+                                 Payload=json.dumps({"body": json.dumps(payload)}))
+        json.loads(response["Payload"].read())
+
+    results["call_ms"]["lambda_per_call"] = measure(per_call_client, max(1, args.n // 5), warmup=3)
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Benchmark suite for the hot paths of the three services.
+
+Each service runs in its own interpreter (the services share module names),
+in-process, against an in-memory database and a local LLM stub. Every scenario
+is driven twice:
+
+- wsgi:   the Flask app called as a WSGI callable (environ built untimed)
+- lambda: lambda_handler with an API Gateway proxy event
+
+The difference between the two is the per-invocation adapter overhead.
+Cold-import time comes from benchmarks.import_profile.
+
+Results are written as JSON (default: benchmarks/results/<commit>.json), and
+--compare prints the change against an earlier run.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite [--service auth] [-n 500] [--bcrypt-rounds 4]
+                               [--out results.json] [--compare benchmarks/results/abc1234.json]
+"""
+import argparse
+import copy
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SERVICES = {
+    "auth": "services/auth_service",
+    "inventory": "services/inventory_service",
+    "recipe": "services/recipe_service",
+}
+TEST_USER_ID = "6710f3a2c9e77b4d1a2b3c00"
+INVENTORY_SIZE = 25
+
+
+# --- Worker (runs inside the service directory) ---
+
+def _worker_setup(service, bcrypt_rounds):
+    sys.path.insert(0, backend_root)
+    sys.path.insert(0, os.getcwd())
+
+    from benchmarks.llm_stub import start_llm_stub
+
+    _, llm_url = start_llm_stub()
+    os.environ.update({
+        "GROQ_API_KEY": "bench",
+        "GROQ_API_URL": llm_url + "/openai/v1/chat/completions",
+        "GROQ_BASE_URL": llm_url,
+        "MONGODB_URI": "memory://grocery_assistant",
+        "LOG_LEVEL": "WARNING",
+        "TIMING_METRICS": "off",
+        "LOGIN_THROTTLE_IP_BURST": "1000000000",
+        "LOGIN_THROTTLE_USER_BURST": "1000000000",
+    })
+    os.environ.pop("SECRETS_ARN", None)
+
+    import bcrypt
+    # Keep bcrypt from drowning out everything else in login/register
+    bcrypt.gensalt = functools.partial(bcrypt.gensalt, rounds=bcrypt_rounds)
+
+    import handler
+    return handler
+
+
+def _wsgi_caller(app):
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+    def build(event):
+        return EnvironBuilder(
+            path=event["path"], method=event["httpMethod"], headers=event["headers"],
+            data=event["body"], query_string=event.get("queryStringParameters"),
+        ).get_environ()
+
+    def call(environ):
+        app_iter, status, headers = run_wsgi_app(app, environ, buffered=True)
+        body = b"".join(app_iter)
+        if hasattr(app_iter, "close"):
+            app_iter.close()
+        return int(status.split(" ", 1)[0]), body
+
+    return build, call
+
+
+def _expect(status, expected, name):
+    if status not in expected:
+        raise RuntimeError(f"{name}: unexpected status {status}")
+
+
+def _scenarios(service, handler):
+    """name -> (event_factory(i), expected status codes)"""
+    from flask_jwt_extended import create_access_token
+    from benchmarks.harness import api_event
+
+    with handler.app.app_context():
+        token = create_access_token(identity=TEST_USER_ID)
+
+    if service == "auth":
+        db = handler.get_db()
+        db.create_user("bench_user", "bench_user@example.com", "C0rrect-Horse-9")
+        counter = {"n": 0}
+
+        def register(i):
+            counter["n"] += 1
+            name = f"user_{counter['n']}_{os.getpid()}"
+            return api_event("POST", "/auth/register",
+                             {"username": name, "email": f"{name}@example.com", "password": "C0rrect-Horse-9"})
+
+        return {
+            "register": (register, (200,)),
+            "login": (lambda i: api_event("POST", "/auth/login",
+                                          {"username": "bench_user", "password": "C0rrect-Horse-9"}), (200,)),
+            "health": (lambda i: api_event("GET", "/auth/health"), (200,)),
+        }
+
+    if service == "inventory":
+        db = handler.get_db()
+        for i in range(INVENTORY_SIZE):
+            db.add_item(TEST_USER_ID, f"Pantry item {i}", "Pantry", "6 months")
+
+        def delete(i):
+            item, _ = db.add_item(TEST_USER_ID, f"Disposable item {i}", "Produce", "3 days")
+            return api_event("DELETE", f"/inventory/items/{item['_id']}", token=token)
+
+        return {
+            "list_items": (lambda i: api_event("GET", "/inventory/items", token=token), (200,)),
+            "add_item": (lambda i: api_event("POST", "/inventory/items", {"item_name": f"Greek Yogurt {i}"},
+                                             token=token), (201,)),
+            "delete_item": (delete, (200,)),
+            "health": (lambda i: api_event("GET", "/inventory/health"), (200,)),
+        }
+
+    return {
+        "predict": (lambda i: api_event("POST", "/recipes/predict_food_info", {"item_name": "Baby Spinach"}), (200,)),
+        "generate": (lambda i: api_event("GET", "/recipes/generate", token=token,
+                                         query={"items": "Eggs,Baby Spinach,Feta Cheese"}), (200,)),
+        "health": (lambda i: api_event("GET", "/recipes/health"), (200,)),
+    }
+
+
+def run_worker(service, n, bcrypt_rounds):
+    import logging
+
+    handler = _worker_setup(service, bcrypt_rounds)
+    from benchmarks.harness import measure
+
+    logging.getLogger().setLevel(logging.WARNING)
+    build_environ, call_wsgi = _wsgi_caller(handler.app)
+
+    results = {}
+    for name, (make_event, expected) in _scenarios(service, handler).items():
+        def via_wsgi(environ):
+            status, _ = call_wsgi(environ)
+            _expect(status, expected, name)
+
+        def via_lambda(event):
+            response = handler.lambda_handler(event, None)
+            _expect(response["statusCode"], expected, name)
+
+        wsgi = measure(via_wsgi, n, setup=lambda i: build_environ(make_event(i)))
+        lam = measure(via_lambda, n, setup=lambda i: copy.deepcopy(make_event(i)))
+        results[name] = {
+            "wsgi": wsgi,
+            "lambda": lam,
+            "adapter_overhead_us": round((lam["p50"] - wsgi["p50"]) * 1000, 1),
+        }
+    print("__SUITE__" + json.dumps(results), flush=True)
+
+
+# --- Driver ---
+
+def run_service(service, n, bcrypt_rounds):
+    env = dict(os.environ)
+    env.pop("SECRETS_ARN", None)
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", service, "-n", str(n),
+         "--bcrypt-rounds", str(bcrypt_rounds)],
+        cwd=os.path.join(backend_root, SERVICES[service]), env=env, capture_output=True, text=True,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("__SUITE__"):
+            return json.loads(line[len("__SUITE__"):])
+    raise RuntimeError(f"{service} benchmark failed:\n{result.stderr[-4000:]}")
+
+
+def compare(current, baseline):
+    """Print p50 and request-rate changes of every scenario present in both runs"""
+    print(f"\nChange vs {baseline['meta']['commit']} (p50 latency; negative is faster):")
+    for service, data in current["services"].items():
+        before = baseline.get("services", {}).get(service)
+        if not before:
+            continue
+        cold, cold_before = data["cold_import_ms"]["median"], before["cold_import_ms"]["median"]
+        print(f"  {service:<10} cold import      {cold:8.1f} ms  ({(cold - cold_before) / cold_before:+.1%})")
+        for name, modes in data["scenarios"].items():
+            for mode in ("wsgi", "lambda"):
+                old = before["scenarios"].get(name, {}).get(mode)
+                if old:
+                    new = modes[mode]
+                    print(f"  {service:<10} {name:<12} {mode:<6} {new['p50']:8.3f} ms  "
+                          f"({(new['p50'] - old['p50']) / old['p50']:+.1%}), {new['rps']:.0f} req/s")
+
+
+def print_report(report):
+    for service, data in report["services"].items():
+        print(f"\n=== {service} service: cold import {data['cold_import_ms']['median']} ms ===")
+        print(f"  {'scenario':<12} {'mode':<7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+        for name, modes in data["scenarios"].items():
+            for mode in ("wsgi", "lambda"):
+                stats = modes[mode]
+                print(f"  {name:<12} {mode:<7}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}"
+                      f"{stats['rps']:>9.0f}")
+            print(f"  {'':<12} adapter overhead {modes['adapter_overhead_us']} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=sorted(SERVICES), action="append",
+                        help="service to benchmark (repeatable); defaults to all")
+    parser.add_argument("-n", type=int, default=500, help="timed requests per scenario and mode")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="bcrypt cost used for login/register")
+    parser.add_argument("--import-repeat", type=int, default=5, help="fresh interpreters for the cold-import time")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--worker", choices=sorted(SERVICES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.n, args.bcrypt_rounds)
+        return
+
+    sys.path.insert(0, backend_root)
+    from benchmarks import import_profile
+    from benchmarks.harness import git_commit
+
+    report = {
+        "meta": {
+            "commit": git_commit(backend_root),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "n": args.n,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "services": {},
+    }
+    for service in args.service or list(SERVICES):
+        runs = [import_profile.profile_once(SERVICES[service]) for _ in range(args.import_repeat)]
+        report["services"][service] = {
+            "cold_import_ms": import_profile.analyse(runs, top=5)["init_ms"],
+            "scenarios": run_service(service, args.n, args.bcrypt_rounds),
+        }
+
+    print_report(report)
+    out = args.out or os.path.join(results_dir, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,9 @@ def run_service(service_name, service_config):
     # env["FLASK_ENV"] = "development"
     # env["FLASK_DEBUG"] = "1"
     env["SERVICE_PORT"] = str(port) # Add port environment variable
+    if service_name == "inventory":
+        # Exercise AI prediction locally by calling the recipe service over HTTP
+        env.setdefault("RECIPE_SERVICE_URL", f"http://localhost:{SERVICES['recipe']['port']}")
     
     # Run the service's app.py directly
     # cmd = ["python", "-m", "flask", "run", "--port", str(port)] # Old command
@@ -65,6 +68,12 @@ def cleanup():
             pass
 
 def main():
+    # All three services in one multi-threaded process (see server.py); other arguments are passed on
+    if "--single-process" in sys.argv:
+        server_args = [arg for arg in sys.argv[1:] if arg != "--single-process"]
+        server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+        os.execv(sys.executable, [sys.executable, server_path, *server_args])
+
     # Register cleanup function
     atexit.register(cleanup)
     signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Run all three services in one multi-threaded process.
+
+run-local.py starts each service's Flask development server on its own. This
+mounts the auth, inventory and recipe apps behind one WSGI dispatcher, which
+routes by the first path segment (/auth, /inventory, /recipes). It serves them
+with waitress when it is installed, and with werkzeug's threaded server
+otherwise. The services share:
+
+- one database client per URI, and so one connection pool (or mock store)
+- the LLM HTTP session, pooled to the thread count
+- in-process inventory -> recipe calls (RECIPE_TRANSPORT=inprocess)
+
+By default it listens on the run-local.py ports (3000-3002), so the frontend's
+local configuration works unchanged; every port serves every service.
+
+Usage (from the backend directory):
+    python server.py [--port 8080] [--threads 16] [--no-warmup]
+    gunicorn --workers 1 --threads 16 --bind :8080 'server:create_app()'
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+
+backend_root = os.path.dirname(os.path.abspath(__file__))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from utils import db_backend  # noqa: E402
+from utils.log import configure_logging  # noqa: E402
+from utils.service_client import load_service_module  # noqa: E402
+from utils.warmup import run_warmup  # noqa: E402
+
+configure_logging("server")  # Before the services load, so every log line says "server"
+logger = logging.getLogger("server")
+
+# First path segment -> service
+ROUTES = {"auth": "auth", "inventory": "inventory", "recipes": "recipe"}
+DEFAULT_PORTS = (3000, 3001, 3002)
+DEFAULT_THREADS = 16
+
+
+class ServiceDispatcher:
+    """WSGI app handing each request to the service that owns its first path segment"""
+
+    def __init__(self, apps):
+        self.apps = apps
+
+    def __call__(self, environ, start_response):
+        segment = environ.get("PATH_INFO", "").lstrip("/").split("/", 1)[0]
+        app = self.apps.get(segment)
+        if app is None:
+            body = json.dumps({"success": False, "message": "Not found"}).encode("utf-8")
+            start_response("404 NOT FOUND", [("Content-Type", "application/json"),
+                                             ("Content-Length", str(len(body)))])
+            return [body]
+        return app(environ, start_response)
+
+
+def create_app(threads=DEFAULT_THREADS, warmup=True):
+    """Load the three services into this process and return the dispatcher"""
+    os.environ.setdefault("RECIPE_TRANSPORT", "inprocess")
+    os.environ.setdefault("HTTP_POOL_SIZE", str(threads))
+
+    db_backend.share_clients()
+    modules = {service: load_service_module(service) for service in ROUTES.values()}
+
+    if warmup:
+        # Connect to MongoDB, load keys and sessions now rather than on the first requests
+        for service, module in modules.items():
+            report = run_warmup(service, module._warmup_steps())
+            failed = [name for name, step in report["primed"].items() if step["status"] != "ok"]
+            if failed:
+                logger.warning("%s service: %s not primed; they start on first use", service, ", ".join(failed))
+
+    return ServiceDispatcher({segment: modules[service].app for segment, service in ROUTES.items()})
+
+
+def serve(app, host, ports, threads):
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:  # Optional dependency
+        waitress_serve = None
+
+    addresses = ", ".join(f"http://{host}:{port}" for port in ports)
+    if waitress_serve is not None:
+        logger.info("Serving all services with waitress (%s threads) on %s", threads, addresses)
+        waitress_serve(app, listen=" ".join(f"{host}:{port}" for port in ports), threads=threads,
+                       ident="grocery-assistant")
+        return
+
+    from werkzeug.serving import make_server
+
+    logger.warning("waitress is not installed (pip install waitress); using werkzeug's threaded server")
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # One access log line per request is too slow
+    servers = [make_server(host, port, app, threaded=True) for port in ports]
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Serving all services on %s", addresses)
+    try:
+        servers[0].serve_forever()
+    finally:
+        for server in servers:
+            server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, action="append",
+                        help="port to listen on (repeatable; default: 3000, 3001 and 3002)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("SERVER_THREADS", DEFAULT_THREADS)))
+    parser.add_argument("--no-warmup", action="store_true", help="connect to MongoDB etc. on first use instead")
+    args = parser.parse_args()
+
+    app = create_app(args.threads, warmup=not args.no_warmup)
+    try:
+        serve(app, args.host, args.port or DEFAULT_PORTS, args.threads)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
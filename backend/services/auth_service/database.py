@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 import os
 import sys
@@ -7,11 +7,12 @@ import bcrypt
 import logging
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Add parent directory to the path so we can import the utils package
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from utils.db_backend import create_client
+from utils.timing import span
 
 # Load auth service environment variables
 # Try loading from .env file first (local development)
@@ -20,25 +21,8 @@ if os.path.exists(env_path):
     load_dotenv(dotenv_path=env_path)
     logger.info("Loaded environment variables from .env file")
 
-# Remove or comment out the module-level MONGODB_URI fetching logic
-# MONGODB_URI = os.environ.get('MONGODB_URI')
-# if not MONGODB_URI:
-#    logger.warning("MONGODB_URI environment variable not set - using mock database")
-#    MONGODB_URI = "mock://grocery_assistant"
-#
-# if MONGODB_URI.startswith('mock://'):
-#    try:
-#        from services.utils.mock_db import MockMongoClient
-#        logger.info("Using mock MongoDB for local development")
-#        MongoClientClass = MockMongoClient
-#    except ImportError:
-#        logger.warning("Could not import mock_db, falling back to real MongoDB")
-#        MongoClientClass = MongoClient
-# else:
-#    MongoClientClass = MongoClient
-
-# Define MongoClientClass directly here for clarity
-MongoClientClass = MongoClient
+# Fields read on login: enough to check the password and build the token/response
+USER_LOGIN_PROJECTION = {"_id": 1, "username": 1, "email": 1, "password": 1}
 
 class AuthDatabase:
     def __init__(self, db_uri):
@@ -47,8 +31,8 @@ class AuthDatabase:
 
         # Use the passed db_uri here
         try:
-            # Note: We assume if a real URI is passed, we use the real MongoClient
-            self.client = MongoClientClass(db_uri, serverSelectionTimeoutMS=5000)
+            # MongoClient, or the mock database for mock://, mock+sqlite:// and memory:// URIs
+            self.client = create_client(db_uri, serverSelectionTimeoutMS=5000)
             # Test the connection
             self.client.admin.command('ping')
             logger.info("Successfully connected to MongoDB")
@@ -65,7 +49,7 @@ class AuthDatabase:
             # Create indexes if they don't exist
             self._ensure_indexes()
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {str(e)}")
+            logger.error("Failed to connect to MongoDB: %s", e)
             raise
 
     def _ensure_indexes(self):
@@ -74,36 +58,43 @@ class AuthDatabase:
         self.users.create_index([("email", 1)], unique=True)
 
     def create_user(self, username, email, password):
-        """Create a new user"""
+        """Create a new user in a single insert; the unique indexes reject duplicates"""
         try:
-            if self.users.find_one({"$or": [{"username": username}, {"email": email}]}):
-                return None, "User exists"
-                
-            salt = bcrypt.gensalt()
-            hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+            with span("bcrypt"):
+                salt = bcrypt.gensalt()
+                hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
             user = {
                 "username": username,
                 "email": email,
                 "password": hashed,
                 "created_at": datetime.now().strftime("%Y-%m-%d %H:%M")
             }
-            result = self.users.insert_one(user)
+            with span("db.create_user"):
+                result = self.users.insert_one(user)
             user["_id"] = str(result.inserted_id)
             return user, None
+        except DuplicateKeyError:
+            # Username or email already taken (enforced by the unique indexes)
+            return None, "User exists"
         except Exception as e:
-            logger.error(f"Error creating user: {str(e)}")
+            logger.error("Error creating user: %s", e)
             return None, f"Database error: {str(e)}"
 
     def verify_user(self, username, password):
         """Verify user credentials"""
         try:
-            user = self.users.find_one({"username": username})
-            if user and bcrypt.checkpw(password.encode("utf-8"), user["password"]):
-                user["_id"] = str(user["_id"])
-                return user, None
+            # Only fetch the fields needed to check the password and build the response
+            with span("db.verify_user"):
+                user = self.users.find_one({"username": username}, USER_LOGIN_PROJECTION)
+            if user:
+                with span("bcrypt"):
+                    password_ok = bcrypt.checkpw(password.encode("utf-8"), user["password"])
+                if password_ok:
+                    user["_id"] = str(user["_id"])
+                    return user, None
             return None, "Invalid credentials"
         except Exception as e:
-            logger.error(f"Error verifying user: {str(e)}")
+            logger.error("Error verifying user: %s", e)
             return None, f"Database error: {str(e)}"
 
     def close(self):
@@ -112,4 +103,4 @@ class AuthDatabase:
             self.client.close()
             logger.info("MongoDB connection closed")
         except Exception as e:
-            logger.error(f"Error closing MongoDB connection: {str(e)}")
\ No newline at end of file
+            logger.error("Error closing MongoDB connection: %s", e)
\ No newline at end of file
@@ -2,14 +2,9 @@ import json
 import os
 import sys # Add sys import
 import logging
-import secrets
 from flask import Flask, request, jsonify
 from flask_cors import CORS, cross_origin
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-import boto3
-from werkzeug.datastructures import Headers
-from werkzeug.test import EnvironBuilder
-from dotenv import load_dotenv
 import traceback  # Added for better error logging
 
 # Add parent directory (backend) to sys.path for local execution
@@ -19,27 +14,31 @@ backend_root = os.path.dirname(parent_dir) # Go up two levels
 if backend_root not in sys.path:
     sys.path.insert(0, backend_root)
 
-# Import the shared utility
-from utils.secrets import get_secret_value 
+# Import the shared utilities (secrets, DB and clients are resolved lazily on first use)
+from utils.config import load_env_file, get_mongodb_uri, get_jwt_secret_key, configure_jwt_keys
+from utils.lazy import LazyResource
+from utils.modules import import_sibling
+from utils.log import configure_logging, init_request_logging, log_event, bind_log_context
+from utils.lambda_adapter import is_api_gateway_event, handle_api_gateway_event 
+from utils.compression import init_compression
+from utils.timing import init_request_timing
+from utils.warmup import is_warmup_event, run_warmup, prime_jwt, prime_mongo, prime_request
+from utils.health import ReadinessChecks, liveness, check_secrets
 
 # --- Top Level Log --- 
-print("--- Loading auth_service/handler.py ---", flush=True)
-logging.basicConfig(level=logging.INFO) # Ensure basicConfig is called early
+configure_logging("auth") # Structured JSON logs (LOG_FORMAT=text for plain output)
 logger = logging.getLogger(__name__) # Use __name__ for logger
 logger.info("--- Logger initialized for auth_service ---")
 
 # Try loading from .env file first (local development)
-env_path = os.path.join(os.path.dirname(__file__), '.env')
-logger.info(f"Checking for .env file at: {env_path}")
-if os.path.exists(env_path):
-    load_dotenv(dotenv_path=env_path)
-    logger.info("Loaded environment variables from .env file")
-else:
-    logger.warning(".env file not found, relying on system environment variables.")
+load_env_file(current_dir)
 
 # Initialize Flask app
 logger.info("Initializing Flask app...")
 app = Flask(__name__)
+init_request_logging(app, sample_rates={"/auth/health": 0.05, "/auth/health/live": 0.05, "/auth/health/ready": 0.05}) # Health checks are polled; log a sample
+init_request_timing(app, "auth", server_timing=False) # Per-phase metrics (EMF on Lambda); no Server-Timing header, which would reveal whether a login ran bcrypt
+init_compression(app) # gzip/brotli for large JSON responses when the client accepts it
 logger.info("Flask app initialized.")
 
 # Configure CORS explicitly for local dev and allow credentials
@@ -48,74 +47,37 @@ CORS(app, origins=["http://localhost:5000"], supports_credentials=True)
 logger.info("CORS configured.")
 
 # --- Secure JWT Configuration ---
-logger.info("Starting JWT Configuration...")
-SECRETS_ARN = os.environ.get('SECRETS_ARN')
-JWT_SECRET_KEY = None
-
-if SECRETS_ARN:
-    logger.info(f"SECRETS_ARN is set. Attempting to load JWT key from Secrets Manager: {SECRETS_ARN}")
-    JWT_SECRET_KEY = get_secret_value(SECRETS_ARN, "jwt_secret_key") # Use lowercase key for secret
-    if JWT_SECRET_KEY:
-        logger.info("Successfully loaded jwt_secret_key from Secrets Manager.")
-    else:
-        logger.error(f"Failed to load 'jwt_secret_key' from secret {SECRETS_ARN}. Check secret content and permissions.")
-else:
-    logger.warning("SECRETS_ARN environment variable not set. Loading JWT_SECRET_KEY from environment (expected from .env locally).")
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') # Use uppercase for direct env var read
-
-# Final fallback to default if not loaded from Secret or Env
-if not JWT_SECRET_KEY:
-    JWT_SECRET_KEY = "default_dev_secret_key_CHANGE_ME"
-    logger.warning("JWT_SECRET_KEY not found in Secrets Manager or environment. USING DEFAULT KEY - CHANGE FOR PRODUCTION!")
-
-logger.info(f"Applying JWT_SECRET_KEY to Flask config.") # Simplified log
-app.config["JWT_SECRET_KEY"] = JWT_SECRET_KEY
+# The signing key is loaded from Secrets Manager (or the environment) on the first token operation
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 86400
 jwt = JWTManager(app)
+configure_jwt_keys(jwt)
 logger.info("JWT configuration finished.")
 # --- End Secure JWT Configuration ---
 
-# Import database module
-logger.info("Importing AuthDatabase...")
-from database import AuthDatabase
-logger.info("AuthDatabase imported.")
+def _create_db():
+    # pymongo and bcrypt are only imported once the database is first needed
+    database = import_sibling(__file__, "database")
+    return database.AuthDatabase(get_mongodb_uri())
 
-# Prepare Database URI
-mongo_uri = None
-if SECRETS_ARN:
-    logger.info(f"Attempting to load MONGODB_URI from Secrets Manager: {SECRETS_ARN}")
-    mongo_uri = get_secret_value(SECRETS_ARN, "MONGODB_URI")
-    if mongo_uri:
-        logger.info("Successfully loaded MONGODB_URI from Secrets Manager.")
-        # Set environment variable so DB class can potentially read it
-        os.environ['MONGODB_URI'] = mongo_uri 
-    else:
-        logger.error(f"Failed to load 'MONGODB_URI' from secret {SECRETS_ARN}. Check secret content and permissions. Falling back to env var.")
-        # Fallback within AWS context if secret fetch failed
-        mongo_uri = os.environ.get('MONGODB_URI') 
+# Database connection, created on the first request that needs it
+_db = LazyResource(_create_db, "AuthDatabase")
 
-if not mongo_uri:
-    logger.warning(f"{'Could not load MONGODB_URI from Secrets Manager.' if SECRETS_ARN else 'SECRETS_ARN not set.'} Loading MONGODB_URI from environment (expected from .env locally).")
-    mongo_uri = os.environ.get('MONGODB_URI') # Load from env if not from secret or ARN not set
+def get_db():
+    """Returns the AuthDatabase, or None if it could not be initialized"""
+    return _db.get()
 
-# Final fallback to mock DB if not loaded from Secret or Env
-if not mongo_uri:
-    mongo_uri = 'mock://grocery_assistant'
-    logger.warning("MONGODB_URI not found in Secrets Manager or environment. USING MOCK DATABASE.")
+def _create_login_throttle():
+    # Login throttling (per source IP and per username), checked before any DB lookup or bcrypt work
+    throttle = import_sibling(__file__, "throttle")
+    return throttle.LoginThrottle.from_env(get_db) # Attaches the shared store once the database is up
 
-logger.info(f"Final MongoDB URI to be used: {mongo_uri}")
+_login_throttle = LazyResource(_create_login_throttle, "LoginThrottle")
 
-# Initialize database connection outside of the handler
-db = None
-try:
-    logger.info("Attempting to initialize AuthDatabase...")
-    # Pass the fetched mongo_uri to the constructor
-    db = AuthDatabase(mongo_uri) 
-    logger.info("AuthDatabase initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize AuthDatabase: {str(e)}")
-    logger.error(traceback.format_exc())
-    # db remains None, endpoints should check for this
+# Deep health checks, cached and refreshed in the background, so polling /auth/health costs no DB round trips
+readiness = ReadinessChecks("auth", [
+    ("secrets", lambda: check_secrets({"jwt_secret_key": get_jwt_secret_key, "MONGODB_URI": get_mongodb_uri}), True),
+    ("mongodb", lambda: prime_mongo(get_db), True),
+])
 
 # Define the frontend origin for CORS
 FRONTEND_ORIGIN = 'https://d1k7vf5yu4148q.cloudfront.net'
@@ -132,11 +94,20 @@ def _build_cors_response(body, status_code=200):
     }
     return jsonify(body), status_code, headers
 
+def _client_ip():
+    """
+    Caller's address for the per-IP bucket. On Lambda the adapter fills REMOTE_ADDR
+    from the API Gateway / function URL sourceIp, which the client cannot set;
+    X-Forwarded-For is deliberately not trusted, since any caller can send one.
+    """
+    return request.remote_addr
+
 logger.info("Defining routes...")
 
 @app.route('/auth/register', methods=['POST'])
 @cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True) # Use combined list
 def register():
+    db = get_db()
     if db is None:
         return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
         
@@ -160,6 +131,7 @@ def register():
         if error:
             return _build_cors_response({"success": False, "message": error}, 400)
         
+        bind_log_context(user_id=str(user["_id"]))
         token = create_access_token(identity=str(user["_id"]))
         response_body = {
             "success": True, 
@@ -169,13 +141,14 @@ def register():
         }
         return _build_cors_response(response_body, 200)
     except Exception as e:
-        logger.error(f"Registration error: {str(e)}")
+        logger.error("Registration error: %s", e)
         return _build_cors_response({"success": False, "message": "Registration failed"}, 500)
 
 @app.route('/auth/login', methods=['POST'])
 @cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True) # Use combined list
 def login():
     logger.info("--- Login request received ---") # Log start of request
+    db = get_db()
     if db is None:
         logger.error("Login attempt failed: Database connection is None")
         return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
@@ -189,28 +162,37 @@ def login():
             
         username = data.get("username")
         password = data.get("password")
-        logger.info(f"Login attempt for user: {username}")
+        logger.info("Login attempt for user: %s", username)
         
         if not all([username, password]):
             logger.error("Login failed: Username or password missing")
             return _build_cors_response({"success": False, "message": "Username and password required"}, 400)
+
+        allowed, retry_after = _login_throttle.get().check(_client_ip(), username)
+        if not allowed:
+            logger.warning("Login throttled for user '%s', retry after %ss", username, retry_after)
+            body, status_code, headers = _build_cors_response(
+                {"success": False, "message": "Too many login attempts, please try again later"}, 429)
+            headers['Retry-After'] = str(retry_after)
+            return body, status_code, headers
         
         logger.info("Attempting to verify user against database")
         user, error = db.verify_user(username, password)
         
         if error:
-            logger.warning(f"Login failed for user '{username}': {error}")
+            logger.warning("Login failed for user '%s': %s", username, error)
             # Note: Returning 401 for invalid credentials
             return _build_cors_response({"success": False, "message": error}, 401)
             
         if not user:
              # This case might occur if db.verify_user returns (None, None)
-             logger.error(f"Login failed: User '{username}' not found or password incorrect (verify_user returned None)")
+             logger.error("Login failed: User '%s' not found or password incorrect (verify_user returned None)", username)
              return _build_cors_response({"success": False, "message": "Invalid username or password"}, 401)
              
-        logger.info(f"User '{username}' verified successfully. Attempting token creation.")
+        bind_log_context(user_id=str(user["_id"]))
+        logger.info("User '%s' verified successfully. Attempting token creation.", username)
         token = create_access_token(identity=str(user["_id"]))
-        logger.info(f"Token created successfully for user '{username}'")
+        logger.info("Token created successfully for user '%s'", username)
         
         # Prepare the response body
         response_body = {
@@ -224,88 +206,51 @@ def login():
         return _build_cors_response(response_body, 200)
 
     except Exception as e:
-        logger.error(f"!!! Unhandled exception during login for user '{username if 'username' in locals() else 'unknown'}': {str(e)}")
+        logger.error("!!! Unhandled exception during login for user '%s': %s", username if 'username' in locals() else 'unknown', e)
         logger.error(traceback.format_exc()) # Log the full traceback
         return _build_cors_response({"success": False, "message": "Login failed due to server error"}, 500)
 
+@app.route('/auth/health/live', methods=['GET'])
+@cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True) # Use combined list
+def liveness_check():
+    """Liveness: the process is up and routing requests (no I/O)"""
+    return _build_cors_response(liveness("auth"), 200)
+
 @app.route('/auth/health', methods=['GET'])
+@app.route('/auth/health/ready', methods=['GET'])
 @cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True) # Use combined list
 def health_check():
-    """Health check endpoint for the frontend service health monitor"""
-    if db is None:
-        return _build_cors_response({"status": "unhealthy", "message": "Database connection failed"}, 500)
-        
-    try:
-        # Try a lightweight DB operation to test connection
-        db.users.find_one({}, {"_id": 1})
-        return _build_cors_response({"status": "healthy", "service": "auth"}, 200)
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return _build_cors_response({"status": "unhealthy", "message": str(e)}, 500)
+    """Readiness, for the frontend service health monitor: the cached deep checks (see utils/health.py)"""
+    body, status_code = readiness.response()
+    return _build_cors_response(body, status_code)
+
+def _prime_login_throttle():
+    if _login_throttle.get() is None:
+        raise RuntimeError("login throttle unavailable")
+
+def _warmup_steps():
+    """What a warmup invocation primes; local work first, so a slow network step cannot starve it"""
+    return [
+        ("jwt", lambda: prime_jwt(app)),
+        ("mongodb", lambda: prime_mongo(get_db)),
+        ("login_throttle", _prime_login_throttle),
+        ("request_path", lambda: prime_request(app, "/auth/health")),
+    ]
 
 def lambda_handler(event, context):
     """
     AWS Lambda handler function that processes API Gateway events
     and routes them to the Flask application
     """
-    logger.info(f"Event: {json.dumps(event)}")
+    log_event(logger, event, context) # Summary at INFO; redacted event only at DEBUG
 
-    # Check if this is a warmup event
-    if event.get('source') == 'serverless-plugin-warmup':
-        logger.info('WarmUp - Lambda is warm!')
-        return {}
+    # Warmup event: prime connections and hot code paths instead of returning straight away
+    if is_warmup_event(event):
+        return run_warmup("auth", _warmup_steps(), event, context)
 
-    # Process HTTP API Gateway event
-    if 'httpMethod' in event:
-        # Set up the Flask environment from the API Gateway event
-        headers = event.get('headers', {}) or {}
-        query_params = event.get('queryStringParameters', {}) or {}
-        path_params = event.get('pathParameters', {}) or {}
-        body = event.get('body', '')
-        
-        path = event.get('path', '')
-        method = event.get('httpMethod', '')
-        
-        # Parse JSON body if it exists
-        if body and isinstance(body, str):
-            try:
-                body = json.loads(body)
-            except:
-                pass
-
-        # Create a Flask-compatible WSGI environment
-        builder = EnvironBuilder(
-            path=path,
-            method=method,
-            headers=Headers(headers),
-            data=json.dumps(body) if isinstance(body, dict) else body,
-            query_string=query_params
-        )
-        
-        env = builder.get_environ()
-        
-        # Add path parameters to the Flask request
-        if path_params:
-            for param, value in path_params.items():
-                path = path.replace(f"{{{param}}}", value)
-                
-        # Override the PATH_INFO
-        env['PATH_INFO'] = path
-        
-        # Create a Flask request with our environment
-        with app.request_context(env):
-            # Process the request through Flask
-            response = app.full_dispatch_request()
-            
-            # Convert Flask response to Lambda/API Gateway format
-            return {
-                "statusCode": response.status_code,
-                "headers": {
-                    "Content-Type": response.content_type,
-                    **dict(response.headers)
-                },
-                "body": response.get_data(as_text=True)
-            }
+    # Process API Gateway proxy event (REST API v1, HTTP API / function URL v2)
+    if is_api_gateway_event(event):
+        return handle_api_gateway_event(app, event, context)
 
     # Handle other event types or return an error
     return {
@@ -316,4 +261,3 @@ def lambda_handler(event, context):
 
 # --- End of handler.py Log ---
 logger.info("--- Finished loading auth_service/handler.py ---")
-print("--- Finished loading auth_service/handler.py ---", flush=True)
\ No newline at end of file
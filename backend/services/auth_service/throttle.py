@@ -0,0 +1,164 @@
+"""
+Token-bucket throttling for login attempts.
+
+Each attempt takes one token from a per-source-IP bucket and a per-username
+bucket. Buckets refill continuously at a fixed rate up to their burst size, so
+a normal user never notices them, while a credential-stuffing burst is turned
+away before it reaches the database or bcrypt.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# How often a throttle waiting for its shared store tries the database again
+ATTACH_RETRY_SECONDS = 30
+
+
+class MemoryBucketStore:
+    """Per-container bucket state. Bounded so a spray of random usernames cannot grow it forever."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, now=None):
+        """Take one token. Returns (allowed, retry_after_seconds)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class MongoBucketStore:
+    """
+    Bucket state shared by every warm container through a MongoDB collection.
+
+    The refill-and-take is a single pipeline update, so concurrent containers
+    cannot both spend the last token. Idle buckets are removed by a TTL index.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def consume(self, key, capacity, rate, now=None):
+        from pymongo import ReturnDocument
+
+        now = time.time() if now is None else now
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, rate]}
+        ]}]}
+        doc = self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "ts": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    # A bucket is full again after capacity / rate seconds; drop it then
+                    "expires_at": datetime.utcnow() + timedelta(seconds=capacity / rate),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["allowed"]:
+            return True, 0
+        return False, (1 - doc["tokens"]) / rate
+
+
+class LoginThrottle:
+    """
+    Checks the per-IP and per-username buckets for a login attempt.
+
+    With `get_db`, the buckets move to a MongoBucketStore on that database. Until
+    the database is reachable they are kept in memory, and attaching is retried
+    every ATTACH_RETRY_SECONDS, so a cold start during an outage does not leave
+    the container on per-container buckets for good.
+    """
+
+    def __init__(self, store=None, ip_burst=20, ip_rate=1.0, user_burst=5, user_rate=1 / 30, get_db=None):
+        self.local_store = MemoryBucketStore()
+        self.store = store or self.local_store
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_rate
+        self.user_burst = user_burst
+        self.user_rate = user_rate
+        self.rejected = 0
+        self._get_db = get_db  # Cleared once the shared store is attached
+        self._attach_after = 0.0
+        self._attach_lock = threading.Lock()
+        self._attach_shared_store()
+
+    @classmethod
+    def from_env(cls, get_db=None):
+        """Build from LOGIN_THROTTLE_* environment variables; LOGIN_THROTTLE_STORE=mongo shares state via `get_db()`"""
+        shared = os.environ.get("LOGIN_THROTTLE_STORE", "memory").lower() == "mongo"
+        if shared and get_db is None:
+            logger.warning("LOGIN_THROTTLE_STORE=mongo but no database is configured, using in-memory buckets")
+        return cls(
+            ip_burst=float(os.environ.get("LOGIN_THROTTLE_IP_BURST", 20)),
+            ip_rate=float(os.environ.get("LOGIN_THROTTLE_IP_PER_SEC", 1.0)),
+            user_burst=float(os.environ.get("LOGIN_THROTTLE_USER_BURST", 5)),
+            user_rate=float(os.environ.get("LOGIN_THROTTLE_USER_PER_SEC", 1 / 30)),
+            get_db=get_db if shared else None,
+        )
+
+    def _attach_shared_store(self):
+        if self._get_db is None or time.monotonic() < self._attach_after:
+            return
+        with self._attach_lock:
+            if self._get_db is None or time.monotonic() < self._attach_after:
+                return
+            self._attach_after = time.monotonic() + ATTACH_RETRY_SECONDS
+            db = self._get_db()
+            if db is None:
+                logger.warning("No database for the shared throttle store yet, using in-memory buckets")
+                return
+            try:
+                self.store = MongoBucketStore(db.db.login_throttle)
+            except Exception as e:
+                logger.error("Could not set up MongoDB throttle store, using in-memory buckets for now: %s", e)
+                return
+            self._get_db = None
+            logger.info("Login throttle using shared MongoDB bucket store")
+
+    def _consume(self, key, capacity, rate):
+        self._attach_shared_store()
+        try:
+            return self.store.consume(key, capacity, rate)
+        except Exception as e:
+            # Never lock everyone out because the shared store is unavailable
+            logger.error("Throttle store error, falling back to in-memory bucket: %s", e)
+            return self.local_store.consume(key, capacity, rate)
+
+    def check(self, source_ip, username):
+        """Returns (allowed, retry_after) where retry_after is whole seconds for the Retry-After header"""
+        checks = []
+        if source_ip:
+            checks.append((f"ip:{source_ip}", self.ip_burst, self.ip_rate))
+        if username:
+            checks.append((f"user:{username}", self.user_burst, self.user_rate))
+
+        for key, capacity, rate in checks:
+            allowed, retry_after = self._consume(key, capacity, rate)
+            if not allowed:
+                self.rejected += 1
+                return False, max(1, math.ceil(retry_after))
+        return True, 0
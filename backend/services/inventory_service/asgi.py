@@ -0,0 +1,432 @@
+"""
+ASGI variant of the inventory service: Quart on an async MongoDB driver.
+
+It serves the same routes, request/response bodies and status codes as
+handler.py, but each request is a coroutine. While one request waits on
+MongoDB or on the recipe service, the event loop serves the others, so one
+process can hold thousands of requests in flight instead of one per thread.
+
+Experimental: in benchmarks/async_inventory.py it measured 0.91-0.95x the
+WSGI throughput. Its dependencies (requirements-asgi.txt) need their own
+virtualenv, since Quart requires Flask 3, and it needs a real MongoDB (the
+mock database is synchronous). Run it under any ASGI server (from this directory):
+    hypercorn asgi:app --bind 0.0.0.0:3001
+    python asgi.py    # Quart's built-in runner on SERVICE_PORT (default 3001)
+
+Lambda keeps using the WSGI handler.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+from quart import Quart, g, jsonify, request
+
+# Add parent directory (backend) to sys.path for local execution
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_root = os.path.dirname(os.path.dirname(current_dir))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from utils.config import load_env_file, get_mongodb_uri, get_jwt_secret_key
+from utils.health import ReadinessChecks, liveness, check_secrets
+from utils.compression import COMPRESSIBLE_TYPES, DEFAULT_MIN_SIZE, compress, negotiate_encoding
+from utils.jwt_cache import VerifiedTokenCache
+from utils.log import configure_logging, bind_log_context, clear_log_context, truncate
+from utils.modules import import_sibling
+from utils.service_client import OPERATIONS, ServiceCallError, ServiceClient
+from utils.timing import (current_timings, metrics_record, server_timing_enabled, server_timing_header, span,
+                          start_timings, stop_timings)
+
+configure_logging("inventory")
+logger = logging.getLogger(__name__)
+
+load_env_file(current_dir)
+
+app = Quart(__name__)
+
+FRONTEND_ORIGIN = 'https://d1k7vf5yu4148q.cloudfront.net'
+LOCAL_DEV_ORIGIN = 'http://localhost:5000'
+ALLOWED_ORIGINS = [FRONTEND_ORIGIN, LOCAL_DEV_ORIGIN]
+CORS_HEADERS = {
+    'Access-Control-Allow-Credentials': 'true',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token',
+    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET,PUT,DELETE'
+}
+
+PREDICTION_MODE = os.environ.get("RECIPE_PREDICTION_MODE", "sync").lower()
+MONGO_POOL_SIZE = int(os.environ.get("MONGO_POOL_SIZE", 100))
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE))
+TIMING_METRICS = os.environ.get("TIMING_METRICS", "json").lower()
+SERVER_TIMING = server_timing_enabled()
+DB_RETRY_AFTER = 30
+
+
+def _build_cors_response(body, status_code=200):
+    """Same body, status and headers as handler.py's helper"""
+    return jsonify(body), status_code, dict(CORS_HEADERS)
+
+
+# --- Database (connected on first use, like the WSGI handler's LazyResource) ---
+
+_db = None
+_db_failed_at = None
+_db_lock = asyncio.Lock()
+
+
+async def get_db():
+    """Returns the AsyncInventoryDatabase, or None if it could not be connected"""
+    global _db, _db_failed_at
+    if _db is not None:
+        return _db
+    async with _db_lock:
+        if _db is None:
+            if _db_failed_at is not None and time.monotonic() - _db_failed_at < DB_RETRY_AFTER:
+                return None
+            try:
+                async_database = import_sibling(__file__, "async_database")
+                # The URI may come from Secrets Manager; keep that blocking call off the event loop
+                uri = await asyncio.to_thread(get_mongodb_uri)
+                _db = await async_database.AsyncInventoryDatabase.connect(uri, MONGO_POOL_SIZE)
+                _db_failed_at = None
+            except Exception as e:
+                logger.error("Failed to initialize AsyncInventoryDatabase: %s", e)
+                _db_failed_at = time.monotonic()
+    return _db
+
+
+# --- JWT (same tokens, claims and error bodies as flask_jwt_extended) ---
+
+_token_cache = VerifiedTokenCache()
+
+
+class _AuthError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _verify_token():
+    """Return the identity of the request's access token, checking its signature once per token"""
+    import jwt as pyjwt
+
+    header = request.headers.get("Authorization")
+    if not header:
+        raise _AuthError(401, "Missing Authorization Header")
+    parts = header.split()
+    if len(parts) != 2 or parts[0] != "Bearer":
+        raise _AuthError(422, "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'")
+
+    with span("jwt"):
+        digest = _token_cache.digest(parts[1])
+        claims = _token_cache.get(digest)
+        if claims is None:
+            try:
+                claims = pyjwt.decode(parts[1], get_jwt_secret_key(), algorithms=["HS256"])
+            except pyjwt.ExpiredSignatureError:
+                raise _AuthError(401, "Token has expired")
+            except pyjwt.InvalidTokenError as e:
+                raise _AuthError(422, str(e))
+            if claims.get("type", "access") != "access":
+                raise _AuthError(422, "Only non-refresh tokens are allowed")
+            _token_cache.put(digest, claims)
+    bind_log_context(user_id=claims.get("sub"))
+    return claims.get("sub")
+
+
+def jwt_required(view):
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        try:
+            g.jwt_identity = _verify_token()
+        except _AuthError as e:
+            return jsonify({"msg": e.message}), e.status_code
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+def get_jwt_identity():
+    return g.jwt_identity
+
+
+# --- Recipe service calls ---
+
+class AsyncRecipeClient:
+    """Recipe service calls without blocking the loop: native HTTP, or a worker thread for other transports"""
+
+    def __init__(self, client):
+        self.client = client
+        self._http = None
+
+    @property
+    def enabled(self):
+        return self.client.enabled
+
+    async def call(self, operation, payload):
+        transport = self.client.transport
+        if transport.name != "http":
+            # The span is recorded by ServiceClient.call; the thread shares this request's context
+            return await asyncio.to_thread(self.client.call, operation, payload)
+
+        import httpx  # Installed with the groq client
+
+        if self._http is None:
+            connect_timeout, read_timeout = transport.timeout
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                                           limits=httpx.Limits(max_connections=int(os.environ.get("HTTP_POOL_SIZE", 100))))
+        method, path = OPERATIONS["recipe"][operation]["http"]
+        with span("upstream.recipe"):
+            try:
+                response = await self._http.request(method, transport.base_url + path, json=payload)
+            except httpx.HTTPError as e:
+                raise ServiceCallError(f"{method} {path} failed: {e}") from e
+        try:
+            return response.json()
+        except ValueError as e:
+            raise ServiceCallError(f"{method} {path} returned {response.status_code} without JSON") from e
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+
+
+_recipe_client = None
+_background_tasks = set()
+
+
+def get_recipe_client():
+    global _recipe_client
+    if _recipe_client is None:
+        _recipe_client = AsyncRecipeClient(ServiceClient.from_env("recipe"))
+    return _recipe_client
+
+
+async def _predict_food_info(recipe_client, item_name, category, predicted_expiry):
+    """Returns the predicted (category, expiry), or the given defaults if the prediction failed"""
+    try:
+        result = await recipe_client.call("predict_food_info", {"item_name": item_name})
+    except ServiceCallError as e:
+        logger.error("Recipe service prediction call failed: %s", e)
+        return category, predicted_expiry
+
+    logger.info("Recipe service prediction response: %s", truncate(result))
+    if isinstance(result, dict) and result.get("success"):
+        return result.get("category", category), result.get("expiry", predicted_expiry)
+    error_message = result.get('message', 'Unknown error from recipe service') if isinstance(result, dict) else 'Invalid response format from recipe service'
+    logger.warning("Recipe service indicated failure: %s", error_message)
+    return category, predicted_expiry
+
+
+async def _predict_and_apply(recipe_client, db, user_id, item_id, item_name):
+    """Async predictions: store the predicted category/expiry on the already saved item"""
+    try:
+        result = await recipe_client.call("predict_food_info", {"item_name": item_name})
+        if not (isinstance(result, dict) and result.get("success")):
+            logger.warning("Async prediction for item %s failed: %s", item_id, truncate(result))
+            return
+        await db.update_item_prediction(user_id, item_id, result.get("category", "Unknown"), result.get("expiry", "N/A"))
+        logger.info("Stored async prediction for item %s", item_id)
+    except Exception as e:
+        logger.error("Async prediction for item %s failed: %s", item_id, e)
+
+
+# --- Request hooks (async counterparts of the Flask hooks in utils.log, utils.timing and utils.compression) ---
+
+@app.before_request
+async def _before_request():
+    start_timings()
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    bind_log_context(request_id=request.headers.get("X-Request-Id") or uuid.uuid4().hex,
+                     route=route, method=request.method)
+    # CORS preflight, answered like Flask-CORS does
+    if request.method == "OPTIONS" and "Access-Control-Request-Method" in request.headers:
+        return "", 200
+
+
+async def _compress(response):
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return
+    data = await response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return
+    with span("compress"):
+        compressed = compress(data, encoding)
+    if len(compressed) < len(data):
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+
+
+@app.after_request
+async def _after_request(response):
+    origin = request.headers.get("Origin")
+    if origin in ALLOWED_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.vary.add("Origin")
+        if request.method == "OPTIONS":
+            response.headers.setdefault("Access-Control-Allow-Methods", CORS_HEADERS["Access-Control-Allow-Methods"])
+            response.headers.setdefault("Access-Control-Allow-Headers",
+                                        request.headers.get("Access-Control-Request-Headers", "Content-Type,Authorization"))
+
+    if COMPRESS_MIN_SIZE > 0:
+        await _compress(response)
+
+    timings = current_timings()
+    if timings is not None:
+        total_ms = timings.total_ms()
+        if SERVER_TIMING:
+            response.headers["Server-Timing"] = server_timing_header(timings, total_ms)
+        if TIMING_METRICS != "off":
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            record = metrics_record("inventory", route, request.method, response.status_code, timings, total_ms,
+                                    TIMING_METRICS)
+            sys.stdout.write(json.dumps(record) + "\n")
+    return response
+
+
+@app.teardown_request
+async def _teardown_request(exc=None):
+    stop_timings()
+    clear_log_context()
+
+
+@app.before_serving
+async def _startup():
+    global _loop
+    _loop = asyncio.get_running_loop()
+    # Load the signing key and connect now, off the loop, rather than on the first requests
+    await asyncio.to_thread(get_jwt_secret_key)
+    await get_db()
+
+
+@app.after_serving
+async def _shutdown():
+    if _recipe_client is not None:
+        await _recipe_client.close()
+    if _db is not None:
+        await _db.close()
+
+
+# --- Routes (same paths, bodies and status codes as handler.py) ---
+
+@app.route('/inventory/items', methods=['GET'])
+@jwt_required
+async def get_items():
+    db = await get_db()
+    if db is None:
+        return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
+    try:
+        items, error = await db.get_user_items(get_jwt_identity())
+        if error:
+            return _build_cors_response({"success": False, "message": error}, 500)
+        return _build_cors_response({"success": True, "items": items}, 200)
+    except Exception as e:
+        logger.error("Error fetching items: %s", e)
+        return _build_cors_response({"success": False, "message": "Failed to fetch items"}, 500)
+
+
+@app.route('/inventory/items', methods=['POST'])
+@jwt_required
+async def add_item():
+    db = await get_db()
+    if db is None:
+        return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
+    try:
+        user_id = get_jwt_identity()
+        data = await request.get_json()
+        item_name = data.get("item_name")
+        if not item_name:
+            return _build_cors_response({"success": False, "message": "Item name is required"}, 400)
+
+        category = "Unknown"
+        predicted_expiry = "N/A"
+        recipe_client = get_recipe_client()
+        predict_async = False
+        if not recipe_client.enabled:
+            logger.warning("Recipe service not configured (RECIPE_LAMBDA_NAME, RECIPE_SERVICE_URL or RECIPE_TRANSPORT). Skipping AI prediction.")
+        elif PREDICTION_MODE == "async":
+            predict_async = True  # Requested after the item is saved
+        else:
+            category, predicted_expiry = await _predict_food_info(recipe_client, item_name, category, predicted_expiry)
+
+        item, error = await db.add_item(user_id, item_name, category, predicted_expiry)
+        if error:
+            return _build_cors_response({"success": False, "message": error}, 500)
+
+        if predict_async:
+            # Respond straight away; the task updates the stored item when the prediction arrives
+            task = asyncio.create_task(_predict_and_apply(recipe_client, db, user_id, item["_id"], item_name))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+        return _build_cors_response({"success": True, "item": item}, 201)
+    except Exception as e:
+        logger.exception("Error adding item: %s", e)
+        return _build_cors_response({"success": False, "message": "Failed to add item"}, 500)
+
+
+@app.route('/inventory/items/<item_id>', methods=['DELETE'])
+@jwt_required
+async def delete_item(item_id):
+    db = await get_db()
+    if db is None:
+        return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
+    try:
+        user_id = get_jwt_identity()
+        result = await db.delete_item(user_id, item_id)
+        if result.deleted_count == 1:
+            logger.info("Successfully deleted item %s for user %s", item_id, user_id)
+            return _build_cors_response({"success": True, "message": "Item deleted"}, 200)
+        logger.warning("Item %s not found or not owned by user %s", item_id, user_id)
+        return _build_cors_response({"success": False, "message": "Item not found or deletion forbidden"}, 404)
+    except Exception as e:
+        logger.exception("Error deleting item %s: %s", item_id, e)
+        return _build_cors_response({"success": False, "message": "Failed to delete item"}, 500)
+
+
+# --- Health (utils/health.py: cached readiness, refreshed in worker threads) ---
+
+_loop = None  # The serving event loop, which the readiness thread pings MongoDB on
+
+
+def _check_mongo():
+    async def ping():
+        db = await get_db()
+        if db is None:
+            raise RuntimeError("database unavailable")
+        await db.ping()
+    asyncio.run_coroutine_threadsafe(ping(), _loop).result()
+
+
+readiness = ReadinessChecks("inventory", [
+    ("secrets", lambda: check_secrets({"jwt_secret_key": get_jwt_secret_key, "MONGODB_URI": get_mongodb_uri}), True),
+    ("mongodb", _check_mongo, True),
+])
+
+
+@app.route('/inventory/health/live', methods=['GET', 'OPTIONS'])
+async def liveness_check():
+    return _build_cors_response(liveness("inventory"), 200)
+
+
+@app.route('/inventory/health', methods=['GET', 'OPTIONS'])
+@app.route('/inventory/health/ready', methods=['GET', 'OPTIONS'])
+async def health_check():
+    # The first report runs the checks, which wait on the loop for the ping; never block the loop on them
+    body, status_code = await asyncio.to_thread(readiness.response)
+    return _build_cors_response(body, status_code)
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('SERVICE_PORT', 3001)))
@@ -0,0 +1,137 @@
+"""
+asyncio counterpart of InventoryDatabase for the ASGI variant (asgi.py).
+
+Uses PyMongo's native AsyncMongoClient (PyMongo 4.10+) when available, and
+otherwise Motor. Documents, queries and indexes match database.py, so both
+variants can serve the same collection side by side.
+"""
+import inspect
+import logging
+import os
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Add parent directory to the path so we can import the utils package
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from utils.db_backend import is_mock_uri
+from utils.modules import import_sibling
+from utils.timing import span
+
+# Same expires_on as the WSGI variant writes
+expiry_date = import_sibling(__file__, "database").expiry_date
+
+try:
+    from pymongo import AsyncMongoClient as AsyncMongoClientClass
+except ImportError:  # PyMongo < 4.10
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClientClass
+    except ImportError:  # Optional dependency
+        AsyncMongoClientClass = None
+
+
+class AsyncInventoryDatabase:
+    def __init__(self, db_uri, max_pool_size=100):
+        if not db_uri:
+            raise ValueError("MongoDB URI is required")
+        if is_mock_uri(db_uri):
+            raise ValueError("The async inventory service needs a real MongoDB URI; the mock database is synchronous")
+        if AsyncMongoClientClass is None:
+            raise RuntimeError("The async inventory service needs PyMongo 4.10+ or Motor (pip install -r requirements-asgi.txt)")
+        self.client = AsyncMongoClientClass(db_uri, serverSelectionTimeoutMS=5000, maxPoolSize=max_pool_size)
+        self.db = self.client.get_database()
+        self.items = self.db.items
+
+    @classmethod
+    async def connect(cls, db_uri, max_pool_size=100):
+        """Create the client, check the connection and ensure the indexes"""
+        database = cls(db_uri, max_pool_size)
+        try:
+            await database.client.admin.command('ping')
+            await database._ensure_indexes()
+            logger.info("Successfully connected to MongoDB for InventoryService (async)")
+        except Exception as e:
+            logger.error("Failed to connect to MongoDB for InventoryService (async): %s", e)
+            await database.close()
+            raise
+        return database
+
+    async def _ensure_indexes(self):
+        await self.items.create_index([("user_id", 1)])
+        await self.items.create_index([("name", 1)])
+        await self.items.create_index([("user_id", 1), ("expires_on", 1)])
+
+    async def add_item(self, user_id, item_name, category, predicted_expiry):
+        """Add a new item to the inventory. Returns (item, error)."""
+        try:
+            now = datetime.now()
+            item = {
+                "user_id": user_id,
+                "item_name": item_name,
+                "category": category,
+                "predicted_expiry": predicted_expiry,
+                "added_on": now.strftime("%Y-%m-%d %H:%M")
+            }
+            expires_on = expiry_date(predicted_expiry, now)
+            if expires_on:
+                item["expires_on"] = expires_on
+            with span("db.add_item"):
+                result = await self.items.insert_one(item)
+            item["_id"] = str(result.inserted_id)
+            return item, None
+        except Exception as e:
+            logger.error("Error adding item: %s", e)
+            return None, str(e)
+
+    async def get_user_items(self, user_id):
+        """Get all items for a specific user. Returns (items, error)."""
+        try:
+            with span("db.get_user_items"):
+                items = await self.items.find({"user_id": user_id}).to_list(length=None)
+            for item in items:
+                item['_id'] = str(item['_id'])
+            return items, None
+        except Exception as e:
+            logger.error("Error getting user items: %s", e)
+            return None, str(e)
+
+    async def update_item_prediction(self, user_id, item_id, category, predicted_expiry):
+        """Store the AI-predicted category/expiry of an item that was saved before the prediction arrived"""
+        try:
+            fields = {"category": category, "predicted_expiry": predicted_expiry}
+            expires_on = expiry_date(predicted_expiry, datetime.now())
+            if expires_on:
+                fields["expires_on"] = expires_on
+            with span("db.update_item_prediction"):
+                return await self.items.update_one(
+                    {"_id": ObjectId(item_id), "user_id": user_id},
+                    {"$set": fields}
+                )
+        except Exception as e:
+            logger.error("Error updating item prediction: %s", e)
+            raise
+
+    async def delete_item(self, user_id, item_id):
+        """Delete a specific item"""
+        try:
+            with span("db.delete_item"):
+                return await self.items.delete_one({"_id": ObjectId(item_id), "user_id": user_id})
+        except Exception as e:
+            logger.error("Error deleting item: %s", e)
+            raise
+
+    async def ping(self):
+        await self.client.admin.command('ping')
+
+    async def close(self):
+        """Close the client (a coroutine on PyMongo's async client, a plain call on Motor's)"""
+        try:
+            result = self.client.close()
+            if inspect.isawaitable(result):
+                await result
+            logger.info("MongoDB connection closed")
+        except Exception as e:
+            logger.error("Error closing MongoDB connection: %s", e)
@@ -1,17 +1,18 @@
-from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import re
 import sys
 from dotenv import load_dotenv
 import logging
 from bson import ObjectId
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Add parent directory to the path so we can import the utils package
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from utils.db_backend import create_client
+from utils.timing import timed
 
 # Try loading from .env file first (local development)
 env_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -19,25 +20,21 @@ if os.path.exists(env_path):
     load_dotenv(dotenv_path=env_path)
     logger.info("Loaded environment variables from .env file")
 
-# Remove or comment out the module-level MONGODB_URI fetching logic
-# MONGODB_URI = os.environ.get('MONGODB_URI')
-# if not MONGODB_URI:
-#    logger.warning("MONGODB_URI environment variable not set - using mock database")
-#    MONGODB_URI = "mock://grocery_assistant"
-#
-# if MONGODB_URI.startswith('mock://'):
-#    try:
-#        from services.utils.mock_db import MockMongoClient
-#        logger.info("Using mock MongoDB for local development")
-#        MongoClientClass = MockMongoClient
-#    except ImportError:
-#        logger.warning("Could not import mock_db, falling back to real MongoDB")
-#        MongoClientClass = MongoClient
-# else:
-#    MongoClientClass = MongoClient
+# "5-7 days", "2 weeks", "1 to 2 months": a number (or range) and a unit
+_SHELF_LIFE = re.compile(r"(\d+(?:\.\d+)?)(?:\s*(?:-|–|to)\s*\d+(?:\.\d+)?)?\s*(day|week|month|year)s?", re.IGNORECASE)
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
 
-# Define MongoClientClass directly here for clarity
-MongoClientClass = MongoClient
+def shelf_life_days(predicted_expiry):
+    """The shortest shelf life a predicted expiry mentions, in days ("3-5 days, or 2 months frozen" -> 3), or None"""
+    if not isinstance(predicted_expiry, str):
+        return None
+    days = [float(number) * _UNIT_DAYS[unit.lower()] for number, unit in _SHELF_LIFE.findall(predicted_expiry)]
+    return int(min(days)) if days else None
+
+def expiry_date(predicted_expiry, added):
+    """Date ("YYYY-MM-DD") an item added at `added` expires by its predicted expiry, or None if that has no duration"""
+    days = shelf_life_days(predicted_expiry)
+    return (added + timedelta(days=days)).strftime("%Y-%m-%d") if days is not None else None
 
 class InventoryDatabase:
     # Add db_uri parameter to __init__
@@ -47,39 +44,47 @@ class InventoryDatabase:
 
         # Use the passed db_uri here
         try:
-            # Assume real MongoClient if real URI is passed
-            self.client = MongoClientClass(db_uri, serverSelectionTimeoutMS=5000)
+            # MongoClient, or the mock database for mock://, mock+sqlite:// and memory:// URIs
+            self.client = create_client(db_uri, serverSelectionTimeoutMS=5000)
             self.client.admin.command('ping') # Test connection
             logger.info("Successfully connected to MongoDB for InventoryService")
             self.db = self.client.get_database() # Get DB from URI
             self.items = self.db.items
             self._ensure_indexes()
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB for InventoryService: {str(e)}")
+            logger.error("Failed to connect to MongoDB for InventoryService: %s", e)
             raise
 
     def _ensure_indexes(self):
         """Ensure necessary indexes exist."""
         self.items.create_index([("user_id", 1)])
         self.items.create_index([("name", 1)])
+        # Expiry alert scans: expires_on ranges, walked in user_id order (expiry_alerts.py)
+        self.items.create_index([("user_id", 1), ("expires_on", 1)])
 
+    @timed("db.add_item")
     def add_item(self, user_id, item_name, category, predicted_expiry):
         """Add a new item to the inventory. Returns (item, error)."""
         try:
+            now = datetime.now()
             item = {
                 "user_id": user_id,
                 "item_name": item_name,
                 "category": category,
                 "predicted_expiry": predicted_expiry,
-                "added_on": datetime.now().strftime("%Y-%m-%d %H:%M")
+                "added_on": now.strftime("%Y-%m-%d %H:%M")
             }
+            expires_on = expiry_date(predicted_expiry, now)
+            if expires_on:
+                item["expires_on"] = expires_on
             result = self.items.insert_one(item)
             item["_id"] = str(result.inserted_id)
             return item, None # Return item and None error on success
         except Exception as e:
-            logger.error(f"Error adding item: {str(e)}")
+            logger.error("Error adding item: %s", e)
             return None, str(e) # Return None item and error string on failure
     
+    @timed("db.get_user_items")
     def get_user_items(self, user_id):
         """Get all items for a specific user. Returns (items, error)."""
         try:
@@ -88,9 +93,27 @@ class InventoryDatabase:
                 item['_id'] = str(item['_id'])
             return items, None # Return items and None for error on success
         except Exception as e:
-            logger.error(f"Error getting user items: {str(e)}")
+            logger.error("Error getting user items: %s", e)
             return None, str(e) # Return None for items and the error message on failure
     
+    @timed("db.update_item_prediction")
+    def update_item_prediction(self, user_id, item_id, category, predicted_expiry):
+        """Store the AI-predicted category/expiry of an item that was saved before the prediction arrived"""
+        try:
+            fields = {"category": category, "predicted_expiry": predicted_expiry}
+            # The item was saved moments ago, so its shelf life runs from now
+            expires_on = expiry_date(predicted_expiry, datetime.now())
+            if expires_on:
+                fields["expires_on"] = expires_on
+            return self.items.update_one(
+                {"_id": ObjectId(item_id), "user_id": user_id},
+                {"$set": fields}
+            )
+        except Exception as e:
+            logger.error("Error updating item prediction: %s", e)
+            raise
+
+    @timed("db.delete_item")
     def delete_item(self, user_id, item_id):
         """Delete a specific item"""
         try:
@@ -99,7 +122,7 @@ class InventoryDatabase:
                 "user_id": user_id
             })
         except Exception as e:
-            logger.error(f"Error deleting item: {str(e)}")
+            logger.error("Error deleting item: %s", e)
             raise
     
     def close(self):
@@ -108,4 +131,4 @@ class InventoryDatabase:
             self.client.close()
             logger.info("MongoDB connection closed")
         except Exception as e:
-            logger.error(f"Error closing MongoDB connection: {str(e)}")
\ No newline at end of file
+            logger.error("Error closing MongoDB connection: %s", e)
\ No newline at end of file
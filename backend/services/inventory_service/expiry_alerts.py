@@ -0,0 +1,255 @@
+"""
+Batch expiry alerts: one digest per user of the items that expire within N days.
+
+The scan is a single pass over the items whose expires_on falls in the
+window, in (user_id, expires_on) order on the matching index, fetched in
+cursor batches of EXPIRY_SCAN_BATCH_SIZE (default 500). Only the current
+user's items are held, at most MAX_DIGEST_ITEMS of them, so memory does not
+grow with the collection or the number of users.
+
+Digests go to a sink:
+    file:<path>   JSON lines appended to a file (the default locally)
+    stdout        JSON lines on standard output
+    log           one log record per digest (the default on Lambda)
+
+Progress is checkpointed in the job_checkpoints collection every
+EXPIRY_CHECKPOINT_EVERY users (default 100), after flushing the sink: the last
+user_id whose digest was written. A run that stops (Lambda timeout, crash,
+Ctrl-C) resumes after it, so a user may get a digest twice but never misses
+one. Runs are keyed by date and window: tomorrow's starts from scratch, and a
+finished run is not repeated.
+
+Usage (from the backend directory):
+    python services/inventory_service/expiry_alerts.py [--days 3] [--sink file:expiry_alerts.jsonl]
+        [--date 2024-05-01] [--restart] [--backfill]
+Lambda: expiry_alerts.lambda_handler on a schedule, event {"days": 3}; a
+run that nears the timeout stops between users, and the next invocation resumes it.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# Add parent directory (backend) to sys.path for local execution
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_root = os.path.dirname(os.path.dirname(current_dir))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from utils.config import load_env_file, get_mongodb_uri
+from utils.lazy import LazyResource
+from utils.log import configure_logging
+from utils.modules import import_sibling
+
+configure_logging("inventory")
+logger = logging.getLogger(__name__)
+
+load_env_file(current_dir)
+
+DEFAULT_DAYS = 3
+BATCH_SIZE = int(os.environ.get("EXPIRY_SCAN_BATCH_SIZE", 500))
+CHECKPOINT_EVERY = int(os.environ.get("EXPIRY_CHECKPOINT_EVERY", 100))
+MAX_DIGEST_ITEMS = 50
+# Left over for the last checkpoint before the Lambda times out
+SAFETY_MARGIN_MS = 10000
+
+PROJECTION = {"_id": 1, "user_id": 1, "item_name": 1, "category": 1, "expires_on": 1}
+
+
+# --- Sinks ---
+
+class FileSink:
+    """JSON lines appended to a local file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a")
+
+    def write(self, digest):
+        self._file.write(json.dumps(digest) + "\n")
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class StdoutSink:
+    def write(self, digest):
+        sys.stdout.write(json.dumps(digest) + "\n")
+
+    def flush(self):
+        sys.stdout.flush()
+
+    def close(self):
+        pass
+
+
+class LogSink:
+    """One log record per digest (CloudWatch on Lambda), for a subscription to pick up"""
+
+    def write(self, digest):
+        logger.info("Expiry digest for user %s: %s items", digest["user_id"], digest["total"],
+                    extra={"digest": digest})
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_sink(spec):
+    """A sink from "file:<path>", "stdout" or "log" """
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    if spec == "stdout":
+        return StdoutSink()
+    if spec == "log":
+        return LogSink()
+    raise ValueError(f"Unknown sink {spec!r}; use file:<path>, stdout or log")
+
+
+# --- Scan ---
+
+def scan(items, checkpoints, sink, days=DEFAULT_DAYS, today=None, restart=False, should_stop=lambda: False):
+    """
+    Write a digest per user with items expiring between `today` and `days`
+    later to `sink`, resuming the day's run from its checkpoint. Returns a summary.
+    """
+    today = today or date.today()
+    window = {"from": today.isoformat(), "to": (today + timedelta(days=days)).isoformat()}
+    run_id = f"expiry_alerts:{window['from']}:{days}"
+    state = None if restart else checkpoints.find_one({"_id": run_id})
+    summary = {"run_id": run_id, "window": window, "digests": 0, "resumed_after": None, "complete": False}
+    if state is not None:
+        if state.get("complete"):
+            return {**summary, "digests": state.get("digests", 0), "complete": True, "skipped": "already complete"}
+        summary["resumed_after"] = state.get("last_user_id")
+    total = state.get("digests", 0) if state is not None else 0
+    last_user_id = summary["resumed_after"]
+
+    def checkpoint(complete=False):
+        sink.flush()
+        checkpoints.update_one(
+            {"_id": run_id},
+            {"$set": {"last_user_id": last_user_id, "digests": total, "complete": complete,
+                      "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}},
+            upsert=True)
+
+    query = {"expires_on": {"$gte": window["from"], "$lte": window["to"]}}
+    if last_user_id is not None:
+        query["user_id"] = {"$gt": last_user_id}
+    cursor = items.find(query, PROJECTION).sort([("user_id", 1), ("expires_on", 1)]).batch_size(BATCH_SIZE)
+
+    digest = None
+    stopped = complete = False
+    try:
+        for item in cursor:
+            if digest is not None and item["user_id"] != digest["user_id"]:
+                sink.write(digest)
+                summary["digests"] += 1
+                total += 1
+                last_user_id = digest["user_id"]
+                digest = None
+                if summary["digests"] % CHECKPOINT_EVERY == 0:
+                    checkpoint()
+                if should_stop():
+                    stopped = True
+                    break
+            if digest is None:
+                digest = {"user_id": item["user_id"], "window": window, "total": 0, "items": []}
+            digest["total"] += 1
+            if len(digest["items"]) < MAX_DIGEST_ITEMS:
+                digest["items"].append({"item_id": str(item["_id"]), "item_name": item.get("item_name"),
+                                        "category": item.get("category"), "expires_on": item["expires_on"]})
+        if digest is not None and not stopped:
+            sink.write(digest)
+            summary["digests"] += 1
+            total += 1
+            last_user_id = digest["user_id"]
+        complete = not stopped
+    finally:
+        cursor.close()
+        checkpoint(complete)  # After an error too, so a rerun resumes from the last digest written
+    summary["complete"] = complete
+    summary["last_user_id"] = last_user_id
+    return summary
+
+
+def backfill(items):
+    """Set expires_on on items saved before it was stored (a one-off migration; items that have it are skipped)"""
+    expiry_date = import_sibling(__file__, "database").expiry_date
+    updated = 0
+    cursor = items.find({}, {"_id": 1, "predicted_expiry": 1, "added_on": 1, "expires_on": 1}).batch_size(BATCH_SIZE)
+    for item in cursor:
+        if "expires_on" in item:
+            continue
+        try:
+            added = datetime.strptime(item.get("added_on", ""), "%Y-%m-%d %H:%M")
+        except ValueError:
+            continue
+        expires_on = expiry_date(item.get("predicted_expiry"), added)
+        if expires_on:
+            items.update_one({"_id": item["_id"]}, {"$set": {"expires_on": expires_on}})
+            updated += 1
+    return updated
+
+
+def _create_db():
+    database = import_sibling(__file__, "database")
+    return database.InventoryDatabase(get_mongodb_uri())
+
+# Kept across invocations of a warm Lambda
+_db = LazyResource(_create_db, "InventoryDatabase")
+
+
+def lambda_handler(event, context):
+    """Scheduled invocation: scan, stopping between users when the Lambda is about to time out"""
+    event = event if isinstance(event, dict) else {}
+    db = _db.get()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    sink = make_sink(event.get("sink") or os.environ.get("EXPIRY_ALERT_SINK", "log"))
+    should_stop = lambda: False
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        should_stop = lambda: context.get_remaining_time_in_millis() < SAFETY_MARGIN_MS
+    try:
+        summary = scan(db.items, db.db.job_checkpoints, sink, days=int(event.get("days", DEFAULT_DAYS)),
+                       restart=bool(event.get("restart")), should_stop=should_stop)
+    finally:
+        sink.close()
+    logger.info("Expiry alert scan: %s digests, complete: %s", summary["digests"], summary["complete"],
+                extra={"summary": summary})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="alert on items expiring within this many days")
+    parser.add_argument("--sink", default=os.environ.get("EXPIRY_ALERT_SINK", "file:expiry_alerts.jsonl"),
+                        help="file:<path>, stdout or log")
+    parser.add_argument("--date", type=date.fromisoformat, help="scan as of this date (default today)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of today's run")
+    parser.add_argument("--backfill", action="store_true",
+                        help="first set expires_on on items saved before it was stored")
+    args = parser.parse_args()
+
+    db = _create_db()
+    if args.backfill:
+        logger.info("Backfilled expires_on on %s items", backfill(db.items))
+    sink = make_sink(args.sink)
+    try:
+        summary = scan(db.items, db.db.job_checkpoints, sink, days=args.days, today=args.date, restart=args.restart)
+    finally:
+        sink.close()
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,9 @@ import json
 import os
 import sys
 import logging
-import secrets
-import boto3 # Import boto3
-from botocore.exceptions import ClientError # Import ClientError
 from flask import Flask, request, jsonify
 from flask_cors import CORS, cross_origin
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, verify_jwt_in_request
-from werkzeug.datastructures import Headers
-from werkzeug.test import EnvironBuilder
-from dotenv import load_dotenv
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 import traceback
 
 # Add parent directory (backend) to sys.path for local execution
@@ -20,27 +14,34 @@ backend_root = os.path.dirname(parent_dir) # Go up two levels
 if backend_root not in sys.path:
     sys.path.insert(0, backend_root)
 
-# Import the shared utility
-from utils.secrets import get_secret_value
+# Import the shared utilities (secrets, DB and clients are resolved lazily on first use)
+from utils.config import load_env_file, get_mongodb_uri, get_jwt_secret_key, configure_jwt_keys
+from utils.lazy import LazyResource
+from utils.modules import import_sibling
+from utils.log import configure_logging, init_request_logging, log_event, truncate
+from utils.lambda_adapter import is_api_gateway_event, handle_api_gateway_event
+from utils.compression import init_compression
+from utils.timing import init_request_timing
+from utils.warmup import is_warmup_event, run_warmup, prime_jwt, prime_mongo, prime_request
+from utils.health import ReadinessChecks, liveness, check_secrets
+from utils.jwt_cache import CachingJWTManager
+from utils.service_client import ServiceClient, ServiceCallError
 
 # --- Top Level Log --- 
-print("--- Loading inventory_service/handler.py ---", flush=True)
-logging.basicConfig(level=logging.INFO) # Ensure basicConfig is called early
+configure_logging("inventory") # Structured JSON logs (LOG_FORMAT=text for plain output)
 logger = logging.getLogger(__name__) # Use __name__ for logger
 logger.info("--- Logger initialized for inventory_service ---")
 
 # Try loading from .env file first (local development)
-env_path = os.path.join(os.path.dirname(__file__), '.env')
-logger.info(f"Checking for .env file at: {env_path}")
-if os.path.exists(env_path):
-    load_dotenv(dotenv_path=env_path)
-    logger.info("Loaded environment variables from .env file")
-else:
-    logger.warning(".env file not found, relying on system environment variables.")
+load_env_file(current_dir)
 
 # Initialize Flask app
 logger.info("Initializing Flask app...")
 app = Flask(__name__)
+init_request_logging(app, sample_rates={"/inventory/health": 0.05, "/inventory/health/live": 0.05,
+                                        "/inventory/health/ready": 0.05}) # Health checks are polled; log a sample
+init_request_timing(app, "inventory") # Per-phase metrics (EMF on Lambda); Server-Timing header only with SERVER_TIMING=1
+init_compression(app) # gzip/brotli for large JSON responses when the client accepts it
 logger.info("Flask app initialized.")
 
 # Define allowed origins
@@ -71,69 +72,68 @@ def _build_cors_response(body, status_code=200):
     return jsonify(body), status_code, headers
 
 # --- Secure JWT Configuration (If needed for this service) ---
-# Replicate JWT key loading logic from auth_service if inventory routes are protected
-logger.info("Starting JWT Configuration...")
-SECRETS_ARN = os.environ.get('SECRETS_ARN')
-JWT_SECRET_KEY = None
-
-if SECRETS_ARN:
-    logger.info(f"SECRETS_ARN is set. Attempting to load JWT key from Secrets Manager: {SECRETS_ARN}")
-    JWT_SECRET_KEY = get_secret_value(SECRETS_ARN, "jwt_secret_key")
-    if JWT_SECRET_KEY:
-        logger.info("Successfully loaded jwt_secret_key from Secrets Manager.")
-    else:
-        logger.error(f"Failed to load 'jwt_secret_key' from secret {SECRETS_ARN}. Check secret content and permissions.")
-else:
-    logger.warning("SECRETS_ARN environment variable not set. Loading JWT_SECRET_KEY from environment.")
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
-
-if not JWT_SECRET_KEY:
-    JWT_SECRET_KEY = "default_dev_secret_key_CHANGE_ME"
-    logger.warning("JWT_SECRET_KEY not found. USING DEFAULT KEY!")
-
-logger.info(f"Applying JWT_SECRET_KEY to Flask config.")
-app.config["JWT_SECRET_KEY"] = JWT_SECRET_KEY
-jwt = JWTManager(app)
+# The signing key is loaded from Secrets Manager (or the environment) on the first token check
+jwt = CachingJWTManager(app) # Caches verified tokens so repeat requests skip signature checks
+configure_jwt_keys(jwt)
 logger.info("JWT configuration finished.")
 # --- End Secure JWT Configuration ---
 
-# Import database module
-logger.info("Importing InventoryDatabase...")
-from database import InventoryDatabase
-logger.info("InventoryDatabase imported.")
-
-# Prepare Database URI (Same logic as auth_service)
-mongo_uri = None
-if SECRETS_ARN:
-    logger.info(f"Attempting to load MONGODB_URI from Secrets Manager: {SECRETS_ARN}")
-    mongo_uri = get_secret_value(SECRETS_ARN, "MONGODB_URI")
-    if mongo_uri:
-        logger.info("Successfully loaded MONGODB_URI from Secrets Manager.")
+def _create_db():
+    # pymongo is only imported once the database is first needed
+    database = import_sibling(__file__, "database")
+    return database.InventoryDatabase(get_mongodb_uri())
+
+# Database connection, created on the first request that needs it
+_db = LazyResource(_create_db, "InventoryDatabase")
+
+def get_db():
+    """Returns the InventoryDatabase, or None if it could not be initialized"""
+    return _db.get()
+
+def _create_recipe_client():
+    # Inventory -> recipe calls: direct Lambda invoke when deployed, HTTP or in-process locally
+    client = ServiceClient.from_env("recipe")
+    if PREDICTION_MODE == "async" and client.enabled and client.transport.name == "lambda":
+        logger.warning("RECIPE_PREDICTION_MODE=async needs a transport that returns results; predicting synchronously over Lambda")
+    return client
+
+_recipe_client = LazyResource(_create_recipe_client, "recipe service client")
+
+# Deep health checks, cached and refreshed in the background, so polling /inventory/health costs no DB round trips
+readiness = ReadinessChecks("inventory", [
+    ("secrets", lambda: check_secrets({"jwt_secret_key": get_jwt_secret_key, "MONGODB_URI": get_mongodb_uri}), True),
+    ("mongodb", lambda: prime_mongo(get_db), True),
+])
+
+# sync: wait for the prediction before saving the item; async: save first, fill the prediction in afterwards
+PREDICTION_MODE = os.environ.get("RECIPE_PREDICTION_MODE", "sync").lower()
+
+def _predict_food_info(recipe_client, item_name, category, predicted_expiry):
+    """Returns the predicted (category, expiry), or the given defaults if the prediction failed"""
+    try:
+        result = recipe_client.call("predict_food_info", {"item_name": item_name})
+    except ServiceCallError as e:
+        logger.error("Recipe service prediction call failed: %s", e)
+        return category, predicted_expiry
+
+    logger.info("Recipe service prediction response: %s", truncate(result))
+    # The recipe service returns a dict like {"success": True, "category": "...", "expiry": "..."}
+    if isinstance(result, dict) and result.get("success"):
+        category = result.get("category", category)
+        predicted_expiry = result.get("expiry", predicted_expiry)
+        logger.info("Using predicted values - Category: %s, Expiry: %s", category, predicted_expiry)
     else:
-        logger.error(f"Failed to load 'MONGODB_URI' from secret {SECRETS_ARN}. Falling back to env var.")
-        mongo_uri = os.environ.get('MONGODB_URI') 
-
-if not mongo_uri:
-    logger.warning(f"{'Could not load MONGODB_URI from Secrets Manager.' if SECRETS_ARN else 'SECRETS_ARN not set.'} Loading MONGODB_URI from environment.")
-    mongo_uri = os.environ.get('MONGODB_URI')
-
-if not mongo_uri:
-    mongo_uri = 'mock://grocery_assistant' # Fallback if all else fails
-    logger.warning("MONGODB_URI not found. USING MOCK DATABASE.")
-
-logger.info(f"Final MongoDB URI to be used: {mongo_uri}")
-
-# Initialize database connection
-db = None
-try:
-    logger.info("Attempting to initialize InventoryDatabase...")
-    # Pass the fetched mongo_uri to the constructor
-    db = InventoryDatabase(mongo_uri)
-    logger.info("InventoryDatabase initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize InventoryDatabase: {str(e)}")
-    logger.error(traceback.format_exc())
-    # db remains None
+        error_message = result.get('message', 'Unknown error from recipe service') if isinstance(result, dict) else 'Invalid response format from recipe service'
+        logger.warning("Recipe service indicated failure: %s", error_message)
+    return category, predicted_expiry
+
+def _apply_prediction(db, user_id, item_id, result):
+    """Callback for async predictions: store the predicted category/expiry on the saved item"""
+    if not (isinstance(result, dict) and result.get("success")):
+        logger.warning("Async prediction for item %s failed: %s", item_id, truncate(result))
+        return
+    db.update_item_prediction(user_id, item_id, result.get("category", "Unknown"), result.get("expiry", "N/A"))
+    logger.info("Stored async prediction for item %s", item_id)
 
 logger.info("Defining routes...")
 
@@ -142,6 +142,7 @@ logger.info("Defining routes...")
 @app.route('/inventory/items', methods=['GET'])
 @jwt_required()
 def get_items():
+    db = get_db()
     if db is None:
         return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
     try:
@@ -151,12 +152,13 @@ def get_items():
              return _build_cors_response({"success": False, "message": error}, 500)
         return _build_cors_response({"success": True, "items": items}, 200)
     except Exception as e:
-        logger.error(f"Error fetching items: {str(e)}")
+        logger.error("Error fetching items: %s", e)
         return _build_cors_response({"success": False, "message": "Failed to fetch items"}, 500)
 
 @app.route('/inventory/items', methods=['POST'])
 @jwt_required()
 def add_item():
+    db = get_db()
     if db is None:
         return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
     try:
@@ -172,65 +174,14 @@ def add_item():
         category = "Unknown" # Default category
         predicted_expiry = "N/A" # Default expiry
 
-        # Get the Recipe Service Lambda function name from environment variables
-        recipe_lambda_name = os.environ.get("RECIPE_LAMBDA_NAME")
-
-        if recipe_lambda_name:
-            try:
-                logger.info(f"Attempting direct invocation of Lambda: {recipe_lambda_name}")
-                lambda_client = boto3.client('lambda')
-
-                # Prepare the payload for the recipe service's predict_food_info endpoint
-                # Mimic the structure expected by the recipe service's handler for this route
-                # This structure might need adjustment based on how recipe service parses the event
-                # Assuming it expects a JSON body within the event
-                invocation_payload = {
-                    # We don't need the full API Gateway event structure here,
-                    # just the data the target function needs.
-                    # Let's assume recipe service's predict_food_info parses request.get_json()
-                    "body": json.dumps({"item_name": item_name})
-                    # Add other fields if the recipe service expects them (e.g., httpMethod, path)
-                    # "httpMethod": "POST",
-                    # "path": "/recipes/predict_food_info" # Or whatever path triggers prediction
-                }
-
-                response = lambda_client.invoke(
-                    FunctionName=recipe_lambda_name,
-                    InvocationType='RequestResponse', # Synchronous invocation
-                    Payload=json.dumps(invocation_payload)
-                )
-
-                # Check if the invocation itself was successful
-                if response.get('StatusCode') == 200 and not response.get('FunctionError'):
-                    # Decode the payload returned by the target Lambda
-                    response_payload_bytes = response['Payload'].read()
-                    response_payload = json.loads(response_payload_bytes.decode('utf-8'))
-                    logger.info(f"Lambda invocation response payload: {response_payload}")
-
-                    # Now, parse the *response payload* from the invoked Lambda.
-                    # This payload should be the JSON body returned by the recipe service's endpoint.
-                    # We assume the recipe service returns a dict like {"success": True, "category": "...", "expiry": "..."}
-                    if isinstance(response_payload, dict) and response_payload.get("success"):
-                        category = response_payload.get("category", category)
-                        predicted_expiry = response_payload.get("expiry", predicted_expiry)
-                        logger.info(f"Using values from Lambda invocation - Category: {category}, Expiry: {predicted_expiry}")
-                    else:
-                        # Log if the invoked function's response indicated failure
-                        error_message = response_payload.get('message', 'Unknown error from recipe service') if isinstance(response_payload, dict) else 'Invalid response format from recipe service'
-                        logger.warning(f"Invoked recipe Lambda indicated failure: {error_message}")
-
-                else:
-                    # Log if the invocation itself failed (e.g., function error, timeout)
-                    error_details = response.get('Payload').read().decode('utf-8') if 'Payload' in response else 'No payload'
-                    logger.error(f"Lambda invocation failed. Status: {response.get('StatusCode')}, Error: {response.get('FunctionError')}, Details: {error_details}")
-
-            except ClientError as e:
-                logger.error(f"Boto3 ClientError calling recipe Lambda: {e}")
-            except Exception as e:
-                logger.error(f"Unexpected error during Lambda invocation: {str(e)}")
-                logger.error(traceback.format_exc())
+        recipe_client = _recipe_client.get()
+        predict_async = False
+        if recipe_client is None or not recipe_client.enabled:
+            logger.warning("Recipe service not configured (RECIPE_LAMBDA_NAME, RECIPE_SERVICE_URL or RECIPE_TRANSPORT). Skipping AI prediction.")
+        elif PREDICTION_MODE == "async" and recipe_client.transport.name != "lambda":
+            predict_async = True # Requested after the item is saved
         else:
-            logger.warning("RECIPE_LAMBDA_NAME environment variable not set. Skipping AI prediction.")
+            category, predicted_expiry = _predict_food_info(recipe_client, item_name, category, predicted_expiry)
         # --- End AI Prediction Call ---
 
         # Add item to DB using potentially AI-updated category/expiry
@@ -239,23 +190,30 @@ def add_item():
             # Handle potential DB error from add_item if its signature changed
             # Assuming add_item now returns (item, error) like get_user_items
             return _build_cors_response({"success": False, "message": error}, 500)
-            
+
+        if predict_async:
+            # Respond straight away; the stored item is updated when the prediction arrives
+            item_id = item["_id"]
+            recipe_client.send("predict_food_info", {"item_name": item_name},
+                               callback=lambda result: _apply_prediction(db, user_id, item_id, result))
+
         # Assuming add_item returns the added item dict on success    
         return _build_cors_response({"success": True, "item": item}, 201) # 201 Created status
 
     except Exception as e:
-        logger.error(f"Error adding item: {str(e)}")
+        logger.error("Error adding item: %s", e)
         logger.error(traceback.format_exc())
         return _build_cors_response({"success": False, "message": "Failed to add item"}, 500)
 
 @app.route('/inventory/items/<item_id>', methods=['DELETE'])
 @jwt_required()
 def delete_item(item_id):
+    db = get_db()
     if db is None:
         return _build_cors_response({"success": False, "message": "Database connection failed"}, 500)
     try:
         user_id = get_jwt_identity()
-        logger.info(f"Delete item request for item {item_id}, user: {user_id}") # Added logging
+        logger.info("Delete item request for item %s, user: %s", item_id, user_id) # Added logging
         
         # delete_item returns a DeleteResult object
         result = db.delete_item(user_id, item_id)
@@ -264,101 +222,65 @@ def delete_item(item_id):
              return _build_cors_response({"success": False, "message": "Database error during delete"}, 500)
              
         if result.deleted_count == 1:
-            logger.info(f"Successfully deleted item {item_id} for user {user_id}")
+            logger.info("Successfully deleted item %s for user %s", item_id, user_id)
             return _build_cors_response({"success": True, "message": "Item deleted"}, 200)
         else:
-            logger.warning(f"Item {item_id} not found or not owned by user {user_id}")
+            logger.warning("Item %s not found or not owned by user %s", item_id, user_id)
             # Item not found or didn't belong to the user
             return _build_cors_response({"success": False, "message": "Item not found or deletion forbidden"}, 404) 
             
     except Exception as e:
         # Catch potential ObjectId conversion errors or other issues
-        logger.error(f"Error deleting item {item_id}: {str(e)}")
+        logger.error("Error deleting item %s: %s", item_id, e)
         logger.error(traceback.format_exc())
         return _build_cors_response({"success": False, "message": "Failed to delete item"}, 500)
         
+@app.route('/inventory/health/live', methods=['GET', 'OPTIONS'])
+@cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True)
+def liveness_check():
+    """Liveness: the process is up and routing requests (no I/O)"""
+    return _build_cors_response(liveness("inventory"), 200)
+
 @app.route('/inventory/health', methods=['GET', 'OPTIONS'])
+@app.route('/inventory/health/ready', methods=['GET', 'OPTIONS'])
 @cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True)
 def health_check():
-    """Health check endpoint"""
-    if request.method == 'OPTIONS':
-        # Handled by Flask-CORS / @cross_origin
-        pass
-
-    if db is None:
-        return _build_cors_response({"status": "unhealthy", "message": "Database connection failed"}, 500)
-    
-    try:
-        # Try a lightweight DB operation to test connection
-        db.items.find_one({}, {"_id": 1})
-        return _build_cors_response({"status": "healthy", "service": "inventory"}, 200)
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return _build_cors_response({"status": "unhealthy", "message": str(e)}, 500)
+    """Readiness: the cached deep checks (see utils/health.py), so polling costs no DB round trips"""
+    body, status_code = readiness.response()
+    return _build_cors_response(body, status_code)
+
+def _prime_recipe_client():
+    """Build the recipe service client (and its boto3 Lambda client, when invoking over Lambda)"""
+    recipe_client = _recipe_client.get()
+    if recipe_client is None or not recipe_client.enabled:
+        return {"skipped": "recipe service not configured"}
+    if recipe_client.transport.name == "lambda":
+        recipe_client.transport.client # Creates and caches the boto3 client
+    return {"transport": recipe_client.transport.name}
+
+def _warmup_steps():
+    """What a warmup invocation primes; local work first, so a slow network step cannot starve it"""
+    return [
+        ("jwt", lambda: prime_jwt(app)),
+        ("mongodb", lambda: prime_mongo(get_db)),
+        ("recipe_client", _prime_recipe_client),
+        ("request_path", lambda: prime_request(app, "/inventory/health")),
+    ]
 
 def lambda_handler(event, context):
     """
     AWS Lambda handler function that processes API Gateway events
     and routes them to the Flask application
     """
-    logger.info(f"Event: {json.dumps(event)}")
-
-    # Check if this is a warmup event
-    if event.get('source') == 'serverless-plugin-warmup':
-        logger.info('WarmUp - Lambda is warm!')
-        return {}
-
-    # Process HTTP API Gateway event
-    if 'httpMethod' in event:
-        # Set up the Flask environment from the API Gateway event
-        headers = event.get('headers', {}) or {}
-        query_params = event.get('queryStringParameters', {}) or {}
-        path_params = event.get('pathParameters', {}) or {}
-        body = event.get('body', '')
-        
-        path = event.get('path', '')
-        method = event.get('httpMethod', '')
-        
-        # Parse JSON body if it exists
-        if body and isinstance(body, str):
-            try:
-                body = json.loads(body)
-            except:
-                pass
-
-        # Create a Flask-compatible WSGI environment
-        builder = EnvironBuilder(
-            path=path,
-            method=method,
-            headers=Headers(headers),
-            data=json.dumps(body) if isinstance(body, dict) else body,
-            query_string=query_params
-        )
-        
-        env = builder.get_environ()
-        
-        # Add path parameters to the Flask request
-        if path_params:
-            for param, value in path_params.items():
-                path = path.replace(f"{{{param}}}", value)
-                
-        # Override the PATH_INFO
-        env['PATH_INFO'] = path
-        
-        # Create a Flask request with our environment
-        with app.request_context(env):
-            # Process the request through Flask
-            response = app.full_dispatch_request()
-            
-            # Convert Flask response to Lambda/API Gateway format
-            return {
-                "statusCode": response.status_code,
-                "headers": {
-                    "Content-Type": response.content_type,
-                    **dict(response.headers)
-                },
-                "body": response.get_data(as_text=True)
-            }
+    log_event(logger, event, context) # Summary at INFO; redacted event only at DEBUG
+
+    # Warmup event: prime connections and hot code paths instead of returning straight away
+    if is_warmup_event(event):
+        return run_warmup("inventory", _warmup_steps(), event, context)
+
+    # Process API Gateway proxy event (REST API v1, HTTP API / function URL v2)
+    if is_api_gateway_event(event):
+        return handle_api_gateway_event(app, event, context)
 
     # Handle other event types or return an error
     return {
@@ -369,4 +291,3 @@ def lambda_handler(event, context):
 
 # --- End of handler.py Log ---
 logger.info("--- Finished loading inventory_service/handler.py ---")
-print("--- Finished loading inventory_service/handler.py ---", flush=True)
\ No newline at end of file
@@ -4,12 +4,7 @@ import sys
 import logging
 from flask import Flask, request, jsonify
 from flask_cors import CORS, cross_origin
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, verify_jwt_in_request
-import requests
-from werkzeug.datastructures import Headers
-from werkzeug.test import EnvironBuilder
-from dotenv import load_dotenv
-from groq import Groq
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 import traceback
 
 # Add parent directory (backend) to sys.path for local execution
@@ -19,8 +14,16 @@ backend_root = os.path.dirname(parent_dir) # Go up two levels
 if backend_root not in sys.path:
     sys.path.insert(0, backend_root)
 
-# Import the shared utility
-from utils.secrets import get_secret_value
+# Import the shared utilities (secrets and clients are resolved lazily on first use)
+from utils.config import load_env_file, get_groq_api_key, get_jwt_secret_key, configure_jwt_keys
+from utils.lazy import LazyResource
+from utils.log import configure_logging, init_request_logging, log_event, truncate
+from utils.lambda_adapter import is_api_gateway_event, handle_api_gateway_event
+from utils.compression import init_compression
+from utils.timing import init_request_timing, span
+from utils.warmup import is_warmup_event, run_warmup, prime_jwt, prime_request, prime_http_session
+from utils.jwt_cache import CachingJWTManager
+from utils.health import ReadinessChecks, liveness, check_secrets
 
 # Define allowed origins
 FRONTEND_ORIGIN = 'https://d1k7vf5yu4148q.cloudfront.net'
@@ -28,8 +31,8 @@ LOCAL_DEV_ORIGIN = 'http://localhost:5000'
 ALLOWED_ORIGINS = [FRONTEND_ORIGIN, LOCAL_DEV_ORIGIN]
 
 # Configure logging
+configure_logging("recipe") # Structured JSON logs (LOG_FORMAT=text for plain output)
 logger = logging.getLogger(__name__) # Use __name__
-logger.setLevel(logging.INFO)
 
 # Helper function for building CORS-compliant responses
 def _build_cors_response(body, status_code=200):
@@ -43,63 +46,59 @@ def _build_cors_response(body, status_code=200):
     return response
 
 # Try loading from .env file first (local development)
-env_path = os.path.join(os.path.dirname(__file__), '.env')
-if os.path.exists(env_path):
-    load_dotenv(dotenv_path=env_path)
-    logger.info("Loaded environment variables from .env file")
-
-# Load API keys and JWT Key
-logger.info("Loading configuration...")
-SECRETS_ARN = os.environ.get('SECRETS_ARN')
-GROQ_API_KEY = None
-JWT_SECRET_KEY = None
-
-if SECRETS_ARN:
-    logger.info(f"SECRETS_ARN is set. Attempting to load keys from Secrets Manager: {SECRETS_ARN}")
-    GROQ_API_KEY = get_secret_value(SECRETS_ARN, "GROQ_API_KEY")
-    JWT_SECRET_KEY = get_secret_value(SECRETS_ARN, "jwt_secret_key") # Lowercase for secret key
-    
-    if GROQ_API_KEY: logger.info("Successfully loaded GROQ_API_KEY from Secrets Manager.")
-    else: logger.error(f"Failed to load 'GROQ_API_KEY' from secret {SECRETS_ARN}.")
-    
-    if JWT_SECRET_KEY: logger.info("Successfully loaded jwt_secret_key from Secrets Manager.")
-    else: logger.error(f"Failed to load 'jwt_secret_key' from secret {SECRETS_ARN}.")
-else:
-    logger.warning("SECRETS_ARN environment variable not set. Loading keys from environment (expected from .env locally).")
-    GROQ_API_KEY = os.environ.get("GROQ_API_KEY") # Uppercase for env var
-    JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY") # Uppercase for env var
-
-# Fallback/Defaults if not loaded from Secret or Env
-if not JWT_SECRET_KEY:
-    JWT_SECRET_KEY = "default_dev_secret_key_CHANGE_ME"
-    logger.warning("JWT_SECRET_KEY not found. USING DEFAULT KEY - CHANGE FOR PRODUCTION!")
-if not GROQ_API_KEY:
-    logger.warning("GROQ_API_KEY not found. Recipe generation/prediction might fail.")
+load_env_file(current_dir)
 
 GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 
+def _create_llm_session():
+    import requests  # Only imported on the prediction path
+
+    class TimedSession(requests.Session):
+        def request(self, *args, **kwargs):
+            with span("llm"): # Shows up in the per-route metrics (and Server-Timing, when enabled)
+                return super().request(*args, **kwargs)
+
+    session = TimedSession()
+    # One connection per concurrent request; server.py raises this to its thread count
+    pool_size = int(os.environ.get("HTTP_POOL_SIZE", 10))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Keep-alive HTTP session for prediction calls, so warm containers reuse the TLS connection to the LLM host
+_llm_session = LazyResource(_create_llm_session, "LLM HTTP session")
+
 # Initialize Flask app
 app = Flask(__name__)
+init_request_logging(app, sample_rates={"/recipes/health": 0.05, "/recipes/health/live": 0.05,
+                                        "/recipes/health/ready": 0.05}) # Health checks are polled; log a sample
+init_request_timing(app, "recipe") # Per-phase metrics (EMF on Lambda); Server-Timing header only with SERVER_TIMING=1
+init_compression(app) # gzip/brotli for large JSON responses when the client accepts it
 # Configure CORS explicitly for allowed origins and credentials
 CORS(app, origins=ALLOWED_ORIGINS, supports_credentials=True)
 
-# JWT configuration
-logger.info("Applying JWT_SECRET_KEY to Flask config.")
-app.config["JWT_SECRET_KEY"] = JWT_SECRET_KEY
+# JWT configuration; the signing key is loaded from Secrets Manager (or the environment) on first use
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 86400  # 24 hours
-jwt = JWTManager(app)
+jwt = CachingJWTManager(app) # Caches verified tokens so repeat requests skip signature checks
+configure_jwt_keys(jwt)
+
+def _create_groq_client():
+    api_key = get_groq_api_key()
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY not found. Ensure GROQ_API_KEY is set.")
+    from groq import Groq  # Only imported when a recipe is first generated
+    return Groq(api_key=api_key)
 
-# Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
-if not groq_client:
-    logger.warning("Groq client could not be initialized. Ensure GROQ_API_KEY is set.")
+# Groq client, created on the first recipe generation request
+_groq_client = LazyResource(_create_groq_client, "Groq client")
 
 @app.route('/recipes/generate', methods=['GET'])
 @jwt_required()
 def generate_recipes():
     """Generate recipe based on inventory items from query parameters"""
     current_user_id = get_jwt_identity()
-    logger.info(f"Recipe generation requested by user: {current_user_id}")
+    logger.info("Recipe generation requested by user: %s", current_user_id)
 
     try:
         # Get item names from query parameters
@@ -109,56 +108,61 @@ def generate_recipes():
 
         # Split the comma-separated string into a list
         inventory_items = [item.strip() for item in items_query.split(',') if item.strip()]
-        logger.info(f"Generating recipe for items: {inventory_items}")
+        logger.info("Generating recipe for items: %s", inventory_items)
 
         if not inventory_items:
             return _build_cors_response({"success": False, "message": "No items provided for recipe generation"}, 400)
 
         # Ensure Groq client is initialized
+        groq_client = _groq_client.get()
         if groq_client is None:
             logger.error("Groq client is not initialized due to missing API key")
             return _build_cors_response({"success": False, "message": "Recipe service is not configured properly"}, 500)
 
         # Create chat completion request
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that generates simple recipes based on a list of ingredients. Format the recipe clearly using Markdown."
-                },
-                {
-                    "role": "user",
-                    "content": f"Generate a simple recipe using some or all of these ingredients: {', '.join(inventory_items)}. If you cannot make a reasonable recipe, say so."
-                }
-            ],
-            model="llama3-8b-8192",
-            temperature=0.7,
-            max_tokens=1024,
-            top_p=1,
-            stop=None,
-            stream=False,
-        )
+        with span("llm"):
+            chat_completion = groq_client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful assistant that generates simple recipes based on a list of ingredients. Format the recipe clearly using Markdown."
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Generate a simple recipe using some or all of these ingredients: {', '.join(inventory_items)}. If you cannot make a reasonable recipe, say so."
+                    }
+                ],
+                model="llama3-8b-8192",
+                temperature=0.7,
+                max_tokens=1024,
+                top_p=1,
+                stop=None,
+                stream=False,
+            )
 
         recipe_content = chat_completion.choices[0].message.content
-        logger.info(f"Generated recipe content (first 100 chars): {recipe_content[:100]}")
+        logger.info("Generated recipe (%s chars): %s", len(recipe_content), truncate(recipe_content, 100))
         
         return _build_cors_response({"success": True, "recipe": recipe_content})
 
     except Exception as e:
-        logger.error(f"Error generating recipe: {str(e)}")
+        logger.error("Error generating recipe: %s", e)
         logger.error(traceback.format_exc()) # Log the full traceback
         return _build_cors_response({"success": False, "message": f"Failed to generate recipe: {str(e)}"}, 500)
 
+@app.route('/recipes/health/live', methods=['GET', 'OPTIONS'])
+@cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True) # Use specific origins and allow credentials
+def liveness_check():
+    """Liveness: the process is up and routing requests (no I/O)"""
+    return _build_cors_response(liveness("recipe"))
+
 @app.route('/recipes/health', methods=['GET', 'OPTIONS'])
+@app.route('/recipes/health/ready', methods=['GET', 'OPTIONS'])
 @cross_origin(origins=ALLOWED_ORIGINS, supports_credentials=True) # Use specific origins and allow credentials
 def health_check():
-    """Health check endpoint for the frontend service health monitor"""
-    if request.method == 'OPTIONS':
-        # Handled by Flask-CORS and @cross_origin
-        # Just return a success response for the actual method if needed
-        pass 
-    # Simple health check, can be expanded (e.g., check Groq key)
-    return _build_cors_response({"status": "healthy", "service": "recipe"})
+    """Readiness, for the frontend service health monitor: the cached deep checks (see utils/health.py)"""
+    body, status_code = readiness.response()
+    return _build_cors_response(body, status_code)
 
 @app.route('/recipes/predict_food_info', methods=['POST', 'OPTIONS'])
 def predict_food_info():
@@ -173,12 +177,13 @@ def predict_food_info():
             return _build_cors_response({"success": False, "message": "Item name is required"}, 400)
             
         item_name = data.get('item_name')
-        logger.info(f"Predicting food info for: {item_name}")
+        logger.info("Predicting food info for: %s", item_name)
         
         # Use GROQ API to predict food category and expiry
-        if GROQ_API_KEY:
+        groq_api_key = get_groq_api_key()
+        if groq_api_key:
             try:
-                logger.info(f"Calling GROQ API for food prediction")
+                logger.info("Calling GROQ API for food prediction")
                 prompt = f"""For the food item '{item_name}', please provide:
 1. The food category (e.g., Produce, Dairy, Meat, Seafood, Bakery, Pantry, Frozen, Beverage)
 2. The typical shelf life/expiry information
@@ -189,11 +194,11 @@ Return ONLY the following JSON format with no additional text:
     "expiry": "Detailed expiry information"
 }}"""
                 
-                response = requests.post(
+                response = _llm_session.get().post(
                     GROQ_API_URL,
                     headers={
                         "Content-Type": "application/json",
-                        "Authorization": f"Bearer {GROQ_API_KEY}"
+                        "Authorization": f"Bearer {groq_api_key}"
                     },
                     json={
                         "model": "llama3-70b-8192",
@@ -210,7 +215,7 @@ Return ONLY the following JSON format with no additional text:
                     }
                 )
                 
-                logger.info(f"GROQ API response status: {response.status_code}")
+                logger.info("GROQ API response status: %s", response.status_code)
                 if response.status_code == 200:
                     ai_response = response.json()
                     content = ai_response.get("choices", [{}])[0].get("message", {}).get("content", "{}")
@@ -218,7 +223,7 @@ Return ONLY the following JSON format with no additional text:
                     try:
                         # Parse the JSON response
                         food_info = json.loads(content)
-                        logger.info(f"Food info predicted: {food_info}")
+                        logger.info("Food info predicted: %s", truncate(food_info))
                         
                         # Make sure it has the right fields
                         if not food_info.get("category") or not food_info.get("expiry"):
@@ -230,7 +235,7 @@ Return ONLY the following JSON format with no additional text:
                             "expiry": food_info["expiry"]
                         })
                     except (ValueError, json.JSONDecodeError) as e:
-                        logger.error(f"Error parsing food info response: {str(e)}, content: {content}")
+                        logger.error("Error parsing food info response: %s, content: %s", e, truncate(content))
                         return _build_cors_response({
                             "success": False, 
                             "message": "Failed to parse food information",
@@ -238,7 +243,7 @@ Return ONLY the following JSON format with no additional text:
                             "expiry": "Unknown"
                         }, 500) # Changed to 500 for server-side parsing error
                 else:
-                    logger.error(f"Error from GROQ API: {response.status_code}, {response.text}")
+                    logger.error("Error from GROQ API: %s, %s", response.status_code, truncate(response.text))
                     return _build_cors_response({
                         "success": False, 
                         "message": "Failed to predict food information",
@@ -246,7 +251,7 @@ Return ONLY the following JSON format with no additional text:
                         "expiry": "Unknown"
                     }, 502) # Use 502 for upstream error
             except Exception as e:
-                logger.error(f"Error calling GROQ API for food prediction: {str(e)}")
+                logger.error("Error calling GROQ API for food prediction: %s", e)
                 return _build_cors_response({
                     "success": False, 
                     "message": f"Failed to predict food information: {str(e)}",
@@ -264,7 +269,7 @@ Return ONLY the following JSON format with no additional text:
             }, 200) # Return 200 but indicate failure in payload
             
     except Exception as e:
-        logger.error(f"Error in predict_food_info: {str(e)}")
+        logger.error("Error in predict_food_info: %s", e)
         return _build_cors_response({
             "success": False,
             "message": f"Server error: {str(e)}",
@@ -274,13 +279,14 @@ Return ONLY the following JSON format with no additional text:
 
 # Direct function for prediction logic (used by direct invocation)
 def _handle_prediction(item_name):
-    logger.info(f"Handling direct prediction request for: {item_name}")
-    if not GROQ_API_KEY:
+    logger.info("Handling direct prediction request for: %s", item_name)
+    groq_api_key = get_groq_api_key()
+    if not groq_api_key:
         logger.error("GROQ_API_KEY not available for prediction.")
         return {"success": False, "message": "Recipe service not configured for prediction.", "category": "Unknown", "expiry": "N/A"}
 
     try:
-        logger.info(f"Calling GROQ API for food prediction (direct invocation)")
+        logger.info("Calling GROQ API for food prediction (direct invocation)")
         prompt = f"""For the food item '{item_name}', please provide:
 1. The food category (e.g., Produce, Dairy, Meat, Seafood, Bakery, Pantry, Frozen, Beverage)
 2. The typical shelf life/expiry information
@@ -291,11 +297,11 @@ Return ONLY the following JSON format with no additional text:
     "expiry": "Detailed expiry information"
 }}"""
 
-        response = requests.post(
+        response = _llm_session.get().post(
             GROQ_API_URL,
             headers={
                 "Content-Type": "application/json",
-                "Authorization": f"Bearer {GROQ_API_KEY}"
+                "Authorization": f"Bearer {groq_api_key}"
             },
             json={
                 "model": "llama3-70b-8192", # Or another suitable model
@@ -312,13 +318,13 @@ Return ONLY the following JSON format with no additional text:
             }
         )
 
-        logger.info(f"GROQ API response status (direct): {response.status_code}")
+        logger.info("GROQ API response status (direct): %s", response.status_code)
         if response.status_code == 200:
             ai_response = response.json()
             content = ai_response.get("choices", [{}])[0].get("message", {}).get("content", "{}")
             try:
                 food_info = json.loads(content)
-                logger.info(f"Food info predicted (direct): {food_info}")
+                logger.info("Food info predicted (direct): %s", truncate(food_info))
                 if not food_info.get("category") or not food_info.get("expiry"):
                     raise ValueError("Missing category or expiry in response")
                 return {
@@ -327,95 +333,79 @@ Return ONLY the following JSON format with no additional text:
                     "expiry": food_info["expiry"]
                 }
             except (ValueError, json.JSONDecodeError) as e:
-                logger.error(f"Error parsing food info response (direct): {str(e)}, content: {content}")
+                logger.error("Error parsing food info response (direct): %s, content: %s", e, truncate(content))
                 return {"success": False, "message": "Failed to parse food information", "category": "Unknown", "expiry": "N/A"}
         else:
-            logger.error(f"Error from GROQ API (direct): {response.status_code}, {response.text}")
+            logger.error("Error from GROQ API (direct): %s, %s", response.status_code, truncate(response.text))
             return {"success": False, "message": "Failed to predict food information", "category": "Unknown", "expiry": "N/A"}
     except Exception as e:
-        logger.error(f"Error during GROQ API call (direct): {str(e)}")
+        logger.error("Error during GROQ API call (direct): %s", e)
         logger.error(traceback.format_exc())
         return {"success": False, "message": "Internal error during prediction", "category": "Unknown", "expiry": "N/A"}
 
+def _prime_llm_session():
+    if not get_groq_api_key():
+        return {"skipped": "GROQ_API_KEY not set"}
+    return prime_http_session(_llm_session.get(), GROQ_API_URL)
+
+# Deep health checks, cached and refreshed in the background. Without the LLM (no key, or the host unreachable)
+# the service is "degraded", not "unhealthy": JWT checks still work and predictions fall back to defaults
+readiness = ReadinessChecks("recipe", [
+    ("secrets", lambda: check_secrets({"jwt_secret_key": get_jwt_secret_key}), True),
+    ("llm_key", lambda: check_secrets({"GROQ_API_KEY": get_groq_api_key}), False),
+    ("llm", _prime_llm_session, False),
+])
+
+def _prime_groq_client():
+    if _groq_client.get() is None:
+        raise RuntimeError("Groq client unavailable")
+
+def _warmup_steps():
+    """What a warmup invocation primes; local work first, so a slow network step cannot starve it"""
+    return [
+        ("jwt", lambda: prime_jwt(app)),
+        ("llm_session", _prime_llm_session),
+        ("groq_client", _prime_groq_client),
+        ("request_path", lambda: prime_request(app, "/recipes/health")),
+    ]
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler function that processes API Gateway events OR direct invocations
     and routes them appropriately.
     """
-    logger.info(f"Event: {json.dumps(event)}")
+    log_event(logger, event, context) # Summary at INFO; redacted event only at DEBUG
 
-    # Check if this is a direct invocation from another Lambda (e.g., for prediction)
+    # Warmup event: prime connections and hot code paths instead of returning straight away
+    if is_warmup_event(event):
+        return run_warmup("recipe", _warmup_steps(), event, context)
+
+    # Check if this is a direct invocation from another Lambda (e.g., for prediction);
+    # API Gateway v1 and HTTP API / function URL v2 events both carry a requestContext
     # We identify this by checking for keys typical of API Gateway events vs direct payload.
     # A more robust check might involve a specific key in the direct payload.
-    is_api_gateway_event = 'httpMethod' in event and 'requestContext' in event
-
-    if is_api_gateway_event:
+    if is_api_gateway_event(event) and 'requestContext' in event:
         logger.info("Processing as API Gateway event...")
-        # Set up the Flask environment from the API Gateway event
-        headers = event.get('headers', {}) or {}
-        query_params = event.get('queryStringParameters', {}) or {}
-        path_params = event.get('pathParameters', {}) or {}
-        body = event.get('body', '')
-
-        path = event.get('path', '')
-        method = event.get('httpMethod', '')
-
-        # Parse JSON body if it exists and is a string
-        parsed_body = body
-        if body and isinstance(body, str):
-            try:
-                parsed_body = json.loads(body)
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse body as JSON, treating as raw string.")
-                pass # Keep body as string if not valid JSON
-
-        # Create a Flask-compatible WSGI environment
-        builder = EnvironBuilder(
-            path=path,
-            method=method,
-            headers=Headers(headers),
-            data=json.dumps(parsed_body) if isinstance(parsed_body, dict) else parsed_body, # Re-encode if dict
-            query_string=query_params
-        )
-
-        env = builder.get_environ()
-
-        # Add path parameters to the Flask request context (used by Flask routes)
-        if path_params:
-            env['werkzeug.request'].path_params = path_params
-
-        # Create a Flask request context
-        with app.request_context(env):
-            # Process the request through Flask
-            try:
-                response = app.full_dispatch_request()
-                # Convert Flask response to Lambda/API Gateway format
-                response_body = response.get_data(as_text=True)
-                response_headers = dict(response.headers)
-
-                # Ensure Content-Type is present
-                if 'content-type' not in response_headers:
-                    response_headers['Content-Type'] = response.content_type or 'application/json'
-
-                return {
-                    "statusCode": response.status_code,
-                    "headers": response_headers,
-                    "body": response_body
-                }
-            except Exception as e:
-                logger.error(f"Error during Flask request dispatch: {e}")
-                logger.error(traceback.format_exc())
-                return {
-                    "statusCode": 500,
-                    "headers": {"Content-Type": "application/json"},
-                    "body": json.dumps({"success": False, "message": "Internal Server Error"})
-                }
+        try:
+            return handle_api_gateway_event(app, event, context)
+        except Exception as e:
+            logger.error("Error during Flask request dispatch: %s", e)
+            logger.error(traceback.format_exc())
+            return {
+                "statusCode": 500,
+                "headers": {"Content-Type": "application/json"},
+                "body": json.dumps({"success": False, "message": "Internal Server Error"})
+            }
     else:
         # Handle potential direct invocation for prediction
         # Assume the payload is the direct event body passed by the invoking Lambda
         logger.info("Processing as potential direct invocation...")
         try:
             # The invoking Lambda sends a dict with a 'body' key containing a JSON string
+            # (and, from utils.service_client, the name of the operation)
+            if isinstance(event, dict) and event.get('operation', 'predict_food_info') != 'predict_food_info':
+                logger.warning("Unsupported direct invocation operation: %s", event.get('operation'))
+                return {"success": False, "message": "Unsupported operation"}
             if isinstance(event, dict) and 'body' in event:
                 payload_body = json.loads(event['body'])
                 item_name = payload_body.get('item_name')
@@ -429,13 +419,13 @@ def lambda_handler(event, context):
                     logger.warning("Direct invocation payload missing 'item_name' in body.")
                     return {"success": False, "message": "Missing item_name in payload"}
             else:
-                logger.warning(f"Direct invocation payload format not recognized: {type(event)}")
+                logger.warning("Direct invocation payload format not recognized: %s", type(event))
                 return {"success": False, "message": "Unsupported direct invocation format"}
 
         except json.JSONDecodeError:
             logger.error("Failed to parse direct invocation event body as JSON")
             return {"success": False, "message": "Invalid JSON in direct invocation payload"}
         except Exception as e:
-            logger.error(f"Error processing direct invocation: {e}")
+            logger.error("Error processing direct invocation: %s", e)
             logger.error(traceback.format_exc())
             return {"success": False, "message": "Internal error handling direct invocation"}
\ No newline at end of file
@@ -1,110 +1,676 @@
 """
 Mock MongoDB for local development without real MongoDB connection
 """
+import base64
+import heapq
 import json
+import marshal
+import mmap
 import os
-import time
+import struct
+import threading
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, InvalidOperation, WriteError
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SQLITE_SCHEME = 'mock+sqlite://'
+MEMORY_SCHEME = 'memory://'
+
+# Journal size (bytes) after which a collection is compacted into its snapshot
+COMPACT_THRESHOLD = int(os.environ.get('MOCK_DB_COMPACT_BYTES', 1024 * 1024))
+
+# Format new snapshots are written in: 'json' (<name>.json) or 'binary' (<name>.snap, see BinarySnapshot)
+SNAPSHOT_FORMAT = os.environ.get('MOCK_DB_SNAPSHOT_FORMAT', 'json')
+
+class ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds back new readers"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+class FileLock:
+    """Exclusive lock on a file, held against every process that uses the same data directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after 10 seconds
+                    continue
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+def _file_id(path):
+    """(inode, device) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_dev
+
+class BinarySnapshot:
+    """
+    A <name>.snap snapshot, memory-mapped so that opening it reads only the
+    header and the metadata:
+
+        header    magic, seq, document count, offset of the offset table,
+                  offset of the metadata
+        records   per document, a flag byte and the marshalled document (flag 1:
+                  it held types marshal can't store, which are kept as extended JSON)
+        offsets   count + 1 record offsets, little-endian uint64
+        metadata  marshalled {'ids': [_id per record],
+                              'indexes': {fields: [index key per record]}}
+
+    The index keys let create_index build an index without decoding any
+    documents. marshal's format is tied to the Python version, which suits a
+    local cache like this one.
+    """
+
+    MAGIC = b'GAMOCK\x00\x01'
+    HEADER = struct.Struct('<8sQQQQ')
+    OFFSETS = struct.Struct('<QQ')
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.seq, self.count, self._offsets, metadata = self.HEADER.unpack_from(self._map)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a mock database snapshot")
+        metadata = marshal.loads(self._map[metadata:])
+        self.ids = metadata['ids']
+        self.index_keys = metadata['indexes']
+
+    def record(self, n):
+        """The encoded record of the n-th document"""
+        start, end = self.OFFSETS.unpack_from(self._map, self._offsets + 8 * n)
+        return self._map[start:end]
+
+    def document(self, n):
+        record = self.record(n)
+        doc = marshal.loads(record[1:])
+        if record[0]:
+            doc = _untag(doc)
+        return MockCollection._deserialize(doc)
+
+    @classmethod
+    def encode(cls, doc):
+        doc = MockCollection._serialize(doc)
+        try:
+            return b'\x00' + marshal.dumps(doc)
+        except ValueError:  # datetimes, ObjectId references
+            return b'\x01' + marshal.dumps(json.loads(_json_dumps(doc)))
+
+    @classmethod
+    def write(cls, path, seq, entries, snapshot=None, index_keys=None):
+        """
+        Write (_id, document) entries; a document may also be the record number
+        of a not yet decoded document in `snapshot`, whose record is copied as
+        is. index_keys: {fields: {_id: key}}.
+        """
+        with open(path, 'wb') as f:
+            f.write(bytes(cls.HEADER.size))
+            offsets = []
+            for _, doc in entries:
+                offsets.append(f.tell())
+                f.write(snapshot.record(doc) if type(doc) is int else cls.encode(doc))
+            offsets.append(f.tell())
+            offsets_at = f.tell()
+            f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+            ids = [doc_id for doc_id, _ in entries]
+            indexes = {}
+            for fields, keys in (index_keys or {}).items():
+                keys = [keys.get(doc_id) for doc_id in ids]
+                try:
+                    marshal.dumps(keys)
+                except ValueError:
+                    continue  # Keys create_index will have to work out from the documents
+                indexes[fields] = keys
+            metadata_at = f.tell()
+            f.write(marshal.dumps({'ids': ids, 'indexes': indexes}))
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, seq, len(entries), offsets_at, metadata_at))
+            f.flush()
+            os.fsync(f.fileno())
+
+class _Documents(dict):
+    """
+    _id -> document, where a document loaded from a BinarySnapshot is its
+    record number until it is first read. dict.items(docs) gives the raw values.
+    """
+
+    def __init__(self, snapshot=None):
+        super().__init__()
+        self.snapshot = snapshot
+
+    def _decoded(self, doc_id, doc):
+        if type(doc) is int:
+            doc = self.snapshot.document(doc)
+            dict.__setitem__(self, doc_id, doc)
+        return doc
+
+    def __getitem__(self, doc_id):
+        return self._decoded(doc_id, dict.__getitem__(self, doc_id))
+
+    def get(self, doc_id, default=None):
+        doc = dict.get(self, doc_id, _MISSING)
+        return default if doc is _MISSING else self._decoded(doc_id, doc)
+
+    def values(self):
+        return [self._decoded(doc_id, doc) for doc_id, doc in dict.items(self)]
+
+    def items(self):
+        return [(doc_id, self._decoded(doc_id, doc)) for doc_id, doc in dict.items(self)]
 
 class MockCollection:
-    def __init__(self, name, data_dir='./mock_data'):
+    """
+    In-memory collection persisted as a snapshot plus an append-only journal.
+
+    <name>.json is a snapshot of the documents as of journal sequence number
+    "seq". Every write appends one line to <name>.journal, so a write costs the
+    same however large the collection is. Loading replays the journal on top of
+    the snapshot. Once the journal passes compact_threshold bytes, it is rotated
+    to <name>.journal.old, and a background thread writes a new snapshot and
+    then removes the old journal. Snapshots are written to a temporary file and
+    renamed into place. Entries at or below the snapshot's seq are skipped on
+    replay, so a crash at any point loses at most a torn last journal line.
+
+    Several threads and processes can share a data directory. Within a process,
+    reads share a ReadWriteLock and writes hold it exclusively. Writes also hold
+    <name>.lock, so they are serialized across processes. Before each operation
+    the collection checks whether another process has changed the journal. If
+    it has only grown, the new entries are replayed; if it was replaced (by a
+    compaction), the collection reloads from disk. A collection with data_dir=None lives only in
+    memory.
+
+    With snapshot_format='binary' (or MOCK_DB_SNAPSHOT_FORMAT=binary) snapshots
+    are written as <name>.snap instead, a BinarySnapshot: loading maps the file
+    and reads only the _ids, and each document is decoded when a query first
+    reaches it. Whichever of <name>.json and <name>.snap is newer is loaded, so
+    switching formats just takes effect at the next snapshot.
+
+    Documents are kept in a dict keyed by _id (the unique _id index), and every
+    create_index builds a hash index that inserts and deletes keep up to date.
+    Queries that pin _id or all fields of an index with equality look up their
+    candidates instead of scanning the collection.
+
+    Stored documents are never changed in place (writes replace them), so
+    compaction can serialize a shallow copy of them outside the lock.
+    """
+
+    def __init__(self, name, data_dir='./mock_data', compact_threshold=None, snapshot_format=None):
         self.name = name
         self.data_dir = data_dir
-        self.data = []
+        self._docs = _Documents()  # _id -> document, in insertion order
+        self._indexes = {}  # Index name -> MockIndex
+        self.compact_threshold = compact_threshold or COMPACT_THRESHOLD
+        self.snapshot_format = snapshot_format or SNAPSHOT_FORMAT
+        self._rwlock = ReadWriteLock()
+        self._file_lock = nullcontext()
+        self._seq = 0  # Sequence number of the last journalled write
+        self._journal = None
+        self._journal_id = None  # (inode, device) of the journal file we have replayed
+        self._journal_offset = 0  # ...and how far into it
+        self._compaction = None
         self._load_data()
-        self._indexes = []
         
     def _ensure_dir(self):
         """Ensure the data directory exists"""
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
     
-    def _get_file_path(self):
-        """Get the file path for this collection"""
-        return os.path.join(self.data_dir, f"{self.name}.json")
-    
+    def _get_file_path(self, suffix='.json'):
+        """Get the file path for this collection's snapshot (suffix '.snap' for a binary one)"""
+        return os.path.join(self.data_dir, f"{self.name}{suffix}")
+
+    def _snapshot_path(self):
+        """The newer of the JSON and binary snapshots, or None if there is neither"""
+        paths = [path for path in (self._get_file_path(), self._get_file_path('.snap')) if os.path.exists(path)]
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def _get_journal_path(self, suffix=''):
+        """Get the file path for this collection's journal (suffix '.old' while it is being compacted)"""
+        return os.path.join(self.data_dir, f"{self.name}.journal{suffix}")
+
+    @staticmethod
+    def _serialize(doc):
+        """Convert MockObjectId to string for JSON serialization (other special types: see _json_default)"""
+        if isinstance(doc.get('_id'), MockObjectId):
+            doc = doc.copy()
+            doc['_id'] = str(doc['_id'])
+        return doc
+
+    @staticmethod
+    def _deserialize(doc):
+        """Convert string ObjectIds back to MockObjectId"""
+        if '_id' in doc and isinstance(doc['_id'], str):
+            doc['_id'] = MockObjectId(doc['_id'])
+        return doc
+
+    @contextmanager
+    def _reading(self):
+        """Hold the read lock, after catching up with other processes' writes"""
+        if self._stale():
+            with self._writing():
+                pass
+        with self._rwlock.read():
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """Hold the write lock and the file lock, caught up with other processes' writes"""
+        with self._rwlock.write(), self._file_lock:
+            if self._stale():
+                self._catch_up()
+            yield
+
+    def _stale(self):
+        """Whether another process has written to the journal since we last read it"""
+        if self.data_dir is None:
+            return False
+        try:
+            st = os.stat(self._get_journal_path())
+        except FileNotFoundError:
+            return True
+        return (st.st_ino, st.st_dev) != self._journal_id or st.st_size != self._journal_offset
+
     def _load_data(self):
-        """Load data from file"""
+        """Load the snapshot and the journal(s), finishing an interrupted compaction"""
+        if self.data_dir is None:
+            return
         self._ensure_dir()
-        file_path = self._get_file_path()
-        if os.path.exists(file_path):
+        self._file_lock = FileLock(os.path.join(self.data_dir, f"{self.name}.lock"))
+        with self._file_lock:
+            interrupted = self._reload()
+            converting = self._snapshot_path() not in (None, self._get_file_path(
+                '.snap' if self.snapshot_format == 'binary' else '.json'))
+            if interrupted or self._renumbered or converting:
+                # A compaction didn't finish, ids changed, or the snapshot is in the other format;
+                # fold everything into a new snapshot now
+                self._save_data()
+
+    def _reload(self):
+        """Rebuild the documents from the snapshot and journal(s); returns whether an old journal was replayed"""
+        self._docs, self._seq = _Documents(), 0
+        self._renumbered = False
+        for index in self._indexes.values():
+            index.entries.clear()
+        file_path = self._snapshot_path()
+        if file_path is not None and file_path.endswith('.snap'):
+            try:
+                snapshot = BinarySnapshot(file_path)
+                self._docs = _Documents(snapshot)
+                for n, doc_id in enumerate(snapshot.ids):
+                    dict.__setitem__(self._docs, doc_id, n)
+                self._seq = snapshot.seq
+                for index in self._indexes.values():
+                    self._build_index(index)
+            except Exception as e:
+                print(f"Error loading {file_path}: {e}")
+        elif file_path is not None:
             try:
                 with open(file_path, 'r') as f:
-                    # Convert string ObjectIds back to MockObjectId
-                    data = json.load(f)
-                    for item in data:
-                        if '_id' in item and isinstance(item['_id'], str):
-                            item['_id'] = MockObjectId(item['_id'])
-                    self.data = data
-            except:
-                self.data = []
-        else:
-            self.data = []
-    
+                    snapshot = json.load(f, object_hook=_json_object_hook)
+                if isinstance(snapshot, list):  # Written before the journal existed
+                    snapshot = {'seq': 0, 'documents': snapshot}
+                for doc in snapshot['documents']:
+                    self._load_document(self._deserialize(doc))
+                self._seq = snapshot['seq']
+            except Exception as e:
+                print(f"Error loading {file_path}: {e}")
+
+        old_journal = self._get_journal_path('.old')
+        replayed_old = os.path.exists(old_journal)
+        if replayed_old:
+            self._replay(old_journal)
+        self._replay(self._get_journal_path())
+        self._open_journal()
+        return replayed_old
+
+    def _catch_up(self):
+        """Replay what other processes appended, or reload if they replaced the journal"""
+        path = self._get_journal_path()
+        if _file_id(path) == self._journal_id:
+            offset = self._replay(path, self._journal_offset, contiguous=True)
+            if offset is not None:
+                self._journal_offset = offset
+                return
+        self._reload()
+
+    def _replay(self, path, offset=0, contiguous=False):
+        """
+        Apply the journal entries after `offset` that are newer than the
+        snapshot, truncating a torn last line. Returns the offset after the
+        last entry, or None if `contiguous` and an entry is out of sequence.
+        """
+        if not os.path.exists(path):
+            return offset
+        with open(path, 'rb+') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    entry = _json_loads(line) if line.endswith(b'\n') else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    # A write cut short by a crash; drop it so new entries start on a clean line
+                    f.truncate(offset)
+                    break
+                if contiguous and entry['seq'] != self._seq + 1:
+                    return None
+                offset += len(line)
+                if entry['seq'] > self._seq:
+                    self._apply(entry)
+                    self._seq = entry['seq']
+        return offset
+
+    def _apply(self, entry):
+        """Apply one journal entry to the in-memory documents"""
+        if entry['op'] == 'insert':
+            self._load_document(self._deserialize(entry['doc']))
+        elif entry['op'] == 'update':
+            doc = self._deserialize(entry['doc'])
+            old = self._docs.get(_index_value(doc['_id']))
+            if old is not None:
+                self._replace(old, doc)
+        elif entry['op'] == 'delete':
+            doc = self._docs.get(entry['_id'])
+            if doc is not None:
+                self._remove(doc)
+
+    def _load_document(self, doc):
+        """Add a stored document, renumbering it if its _id is taken (files from before ids were unique)"""
+        if _index_value(doc['_id']) in self._docs:
+            print(f"Duplicate _id {doc['_id']} in {self.name}; loading it as a new document")
+            doc['_id'] = MockObjectId()
+            self._renumbered = True
+        self._add(doc)
+
+    def _open_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+        path = self._get_journal_path()
+        self._journal = open(path, 'a')
+        self._journal_id = _file_id(path)
+        self._journal_offset = os.path.getsize(path)
+
+    def _append(self, *entries):
+        """Record writes at the end of the journal, one line each (callers hold the write lock)"""
+        if self.data_dir is None:
+            self._seq += len(entries)
+            return
+        try:
+            lines = ''.join(_json_dumps({'seq': self._seq + n, **entry}) + '\n'
+                            for n, entry in enumerate(entries, 1))
+            self._journal.write(lines)
+            self._journal.flush()
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return
+        self._seq += len(entries)
+        self._journal_offset = self._journal.tell()
+        if self._journal_offset >= self.compact_threshold:
+            self._start_compaction()
+
+    def _start_compaction(self):
+        """Rotate the journal and write a new snapshot in the background (callers hold the write lock)"""
+        old_journal = self._get_journal_path('.old')
+        if os.path.exists(old_journal):
+            return  # A compaction is running here or in another process; let the journal grow until it's done
+        self._journal.close()
+        os.replace(self._get_journal_path(), old_journal)
+        self._journal = None
+        self._open_journal()
+        self._compaction = threading.Thread(
+            target=self._compact, args=(self._snapshot_args(), old_journal, _file_id(old_journal)),
+            name=f"mock-db-compact-{self.name}", daemon=True)
+        self._compaction.start()
+
+    def _compact(self, snapshot_args, old_journal, old_journal_id):
+        """Write a snapshot from _snapshot_args(), then swap it in for the journal it supersedes"""
+        try:
+            tmp_path, path = self._write_snapshot(*snapshot_args)
+            with self._rwlock.write(), self._file_lock:
+                if _file_id(old_journal) != old_journal_id:
+                    # Another process loaded meanwhile and folded the old journal into a newer snapshot
+                    os.remove(tmp_path)
+                    return
+                self._install_snapshot(tmp_path, path)
+                os.remove(old_journal)
+        except Exception as e:
+            print(f"Error compacting {self.name}: {e}")
+
+    def _snapshot_args(self):
+        """
+        What _write_snapshot needs, copied under the lock: the (_id, document)
+        entries, undecoded ones as record numbers into the current binary
+        snapshot, and for a binary snapshot the index keys.
+        """
+        index_keys = None
+        if self.snapshot_format == 'binary':
+            index_keys = {index.fields: {doc_id: key for key, bucket in index.entries.items() for doc_id in bucket}
+                          for index in self._indexes.values()}
+        return list(dict.items(self._docs)), self._seq, self._docs.snapshot, index_keys
+
+    def _write_snapshot(self, entries, seq, snapshot=None, index_keys=None):
+        """Write a snapshot to a temporary file; returns its path and the path to rename it to"""
+        path = self._get_file_path('.snap' if self.snapshot_format == 'binary' else '.json')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.snapshot_format == 'binary':
+            BinarySnapshot.write(tmp_path, seq, entries, snapshot, index_keys)
+            return tmp_path, path
+        documents = [snapshot.document(doc) if type(doc) is int else doc for _, doc in entries]
+        with open(tmp_path, 'w') as f:
+            json.dump({'seq': seq, 'documents': [self._serialize(doc) for doc in documents]}, f, indent=2,
+                      default=_json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path, path
+
+    def _install_snapshot(self, tmp_path, path):
+        """Rename a new snapshot into place, removing one in the other format"""
+        os.replace(tmp_path, path)
+        other = self._get_file_path('.json' if path.endswith('.snap') else '.snap')
+        if os.path.exists(other):
+            os.remove(other)
+
     def _save_data(self):
-        """Save data to file"""
-        self._ensure_dir()
-        file_path = self._get_file_path()
+        """Write a full snapshot now and start an empty journal (callers hold the file lock)"""
         try:
-            # Convert MockObjectId to string for JSON serialization
-            serializable_data = []
-            for item in self.data:
-                item_copy = item.copy()
-                if '_id' in item_copy and isinstance(item_copy['_id'], MockObjectId):
-                    item_copy['_id'] = str(item_copy['_id'])
-                serializable_data.append(item_copy)
-                
-            with open(file_path, 'w') as f:
-                json.dump(serializable_data, f, indent=2)
+            self._install_snapshot(*self._write_snapshot(*self._snapshot_args()))
+            # A new file rather than a truncated one, so other processes see that it was replaced
+            tmp_path = f"{self._get_journal_path()}.{os.getpid()}.tmp"
+            open(tmp_path, 'w').close()
+            os.replace(tmp_path, self._get_journal_path())
+            if os.path.exists(self._get_journal_path('.old')):
+                os.remove(self._get_journal_path('.old'))
         except Exception as e:
             print(f"Error saving data: {e}")
+        self._open_journal()
+
+    def close(self):
+        """Finish any running compaction and close the journal"""
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+        with self._rwlock.write():
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if isinstance(self._file_lock, FileLock):
+                self._file_lock.close()
     
     def create_index(self, keys, **kwargs):
-        """Mock index creation"""
-        unique = kwargs.get('unique', False)
-        index = {'keys': keys, 'unique': unique}
-        self._indexes.append(index)
-        return index
+        """Build a hash index over the given fields (a no-op if it already exists)"""
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = kwargs.get('name') or '_'.join(f"{field}_{direction}" for field, direction in keys)
+        with self._writing():
+            if name not in self._indexes:
+                index = MockIndex(tuple(field for field, _ in keys), kwargs.get('unique', False))
+                self._build_index(index)
+                self._indexes[name] = index
+        return name
+
+    def _build_index(self, index):
+        """Index every document, taking the keys of undecoded ones from the binary snapshot if it has them"""
+        snapshot = self._docs.snapshot
+        keys = snapshot.index_keys.get(index.fields) if snapshot is not None else None
+        for doc_id, doc in list(dict.items(self._docs)):
+            if type(doc) is int and keys is not None:
+                key = keys[doc]
+            else:
+                key = index.key(self._docs._decoded(doc_id, doc))
+            if index.unique and index.lookup(key):
+                raise DuplicateKeyError(f"Duplicate key error: {', '.join(index.fields)} must be unique")
+            index.add_key(doc_id, key)
     
-    def _check_indexes(self, doc):
-        """Check if document violates any unique indexes"""
-        for index in self._indexes:
-            if not index.get('unique'):
+    def _check_indexes(self, doc, replacing=None):
+        """Check if document violates the _id index or any unique index (ignoring the one it replaces)"""
+        if replacing is None and _index_value(doc['_id']) in self._docs:
+            raise DuplicateKeyError("Duplicate key error: _id must be unique")
+        for index in self._indexes.values():
+            if index.unique and any(doc_id != replacing for doc_id in index.lookup(index.key(doc))):
+                raise DuplicateKeyError(f"Duplicate key error: {', '.join(index.fields)} must be unique")
+
+    def _add(self, doc):
+        doc_id = _index_value(doc['_id'])
+        self._docs[doc_id] = doc
+        for index in self._indexes.values():
+            index.add(doc_id, doc)
+
+    def _remove(self, doc):
+        doc_id = _index_value(doc['_id'])
+        del self._docs[doc_id]
+        for index in self._indexes.values():
+            index.remove(doc_id, doc)
+
+    def _replace(self, old, new):
+        """Swap in the updated copy of a document, keeping its place in the collection"""
+        doc_id = _index_value(old['_id'])
+        for index in self._indexes.values():
+            index.remove(doc_id, old)
+        self._docs[doc_id] = new
+        for index in self._indexes.values():
+            index.add(doc_id, new)
+
+    def _candidates(self, query):
+        """The documents that can match `query`: from the _id or smallest usable index, else all of them"""
+        equalities = {}
+        for key, value in query.items():
+            if key.startswith('$'):
                 continue
-                
-            for key_tuple in index.get('keys', []):
-                field = key_tuple[0]
-                if field in doc:
-                    # Check for uniqueness
-                    value = doc[field]
-                    for existing_doc in self.data:
-                        if existing_doc.get('_id') == doc.get('_id'):
-                            continue  # Skip current document
-                        if existing_doc.get(field) == value:
-                            raise ValueError(f"Duplicate key error: {field} must be unique")
-    
+            if isinstance(value, dict):
+                if list(value) != ['$eq']:
+                    continue
+                value = value['$eq']
+            equalities[key] = value
+
+        if '_id' in equalities:
+            try:
+                doc = self._docs.get(_index_value(equalities['_id']))
+            except TypeError:
+                doc = None
+            return [doc] if doc is not None else []
+
+        buckets = []
+        for index in self._indexes.values():
+            key = index.key(equalities)
+            if key is not None:
+                buckets.append(index.lookup(key))
+        if buckets:
+            return [self._docs[doc_id] for doc_id in min(buckets, key=len)]
+        return self._docs.values()
+
     def find_one(self, query=None, projection=None):
         """Find one document matching the query"""
         query = query or {}
         
-        for doc in self.data:
-            if self._matches(doc, query):
-                if projection:
+        with self._reading():
+            for doc in self._candidates(query):
+                if self._matches(doc, query):
+                    # Return a copy, like a real driver, so callers can't change the stored document
                     return self._apply_projection(doc, projection)
-                return doc
         return None
     
-    def find(self, query=None):
+    def find(self, query=None, projection=None):
         """Find all documents matching the query"""
         query = query or {}
-        results = []
         
-        for doc in self.data:
-            if self._matches(doc, query):
-                results.append(doc)
+        with self._reading():
+            results = [doc for doc in self._candidates(query) if self._matches(doc, query)]
         
-        return MockCursor(results)
+        return MockCursor(results, projection)
+
+    def count_documents(self, query, skip=0, limit=0):
+        """Count the documents matching the query"""
+        with self._reading():
+            if not query:
+                count = len(self._docs)
+            else:
+                count = sum(1 for doc in self._candidates(query) if self._matches(doc, query))
+        count = max(count - skip, 0)
+        return min(count, limit) if limit else count
     
     def insert_one(self, document):
         """Insert one document"""
@@ -115,25 +681,114 @@ class MockCollection:
         if '_id' not in doc:
             doc['_id'] = MockObjectId()
             
-        # Check indexes
-        self._check_indexes(doc)
-        
-        self.data.append(doc)
-        self._save_data()
+        with self._writing():
+            # Check indexes
+            self._check_indexes(doc)
+
+            self._add(doc)
+            self._append({'op': 'insert', 'doc': self._serialize(doc)})
         
         return MockInsertOneResult(doc['_id'])
+
+    def insert_many(self, documents, ordered=True):
+        """Insert documents in order; with ordered=False, carry on past duplicates"""
+        docs = [document.copy() for document in documents]
+        inserted, errors = [], []
+        with self._writing():
+            for i, doc in enumerate(docs):
+                if '_id' not in doc:
+                    doc['_id'] = MockObjectId()
+                try:
+                    self._check_indexes(doc)
+                except DuplicateKeyError as e:
+                    errors.append({'index': i, 'code': 11000, 'errmsg': str(e), 'op': doc})
+                    if ordered:
+                        break
+                    continue
+                self._add(doc)
+                inserted.append(doc)
+            self._append(*({'op': 'insert', 'doc': self._serialize(doc)} for doc in inserted))
+
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return MockInsertManyResult([doc['_id'] for doc in inserted])
+
+    def update_one(self, query, update, upsert=False):
+        """Apply a $set/$inc update to the first document matching the query"""
+        return self._update(query, update, upsert, multi=False)
+
+    def update_many(self, query, update, upsert=False):
+        """Apply a $set/$inc update to every document matching the query"""
+        return self._update(query, update, upsert, multi=True)
+
+    def _update(self, query, update, upsert, multi):
+        _check_update(update)
+        matched, changed = 0, []
+        with self._writing():
+            try:
+                for doc in self._candidates(query):
+                    if not self._matches(doc, query):
+                        continue
+                    matched += 1
+                    new = _apply_update(doc, update)
+                    if new != doc:
+                        self._check_indexes(new, replacing=_index_value(doc['_id']))
+                        self._replace(doc, new)
+                        changed.append(new)
+                    if not multi:
+                        break
+            finally:
+                # Like MongoDB, a duplicate key part-way through keeps the documents already updated;
+                # journal them before the error propagates so a reload sees the same state
+                self._append(*({'op': 'update', 'doc': self._serialize(doc)} for doc in changed))
+
+            upserted_id = None
+            if not matched and upsert:
+                # Start from the query's equality conditions, like MongoDB
+                doc = {key: value for key, value in query.items()
+                       if not key.startswith('$') and not isinstance(value, dict)}
+                doc = _apply_update(doc, update)
+                doc.setdefault('_id', MockObjectId())
+                self._check_indexes(doc)
+                self._add(doc)
+                self._append({'op': 'insert', 'doc': self._serialize(doc)})
+                upserted_id = doc['_id']
+        return MockUpdateResult(matched, len(changed), upserted_id)
+
+    def delete_many(self, query):
+        """Delete all documents matching the query"""
+        with self._writing():
+            deleted = [doc for doc in self._candidates(query) if self._matches(doc, query)]
+            for doc in deleted:
+                self._remove(doc)
+            self._append(*({'op': 'delete', '_id': _index_value(doc['_id'])} for doc in deleted))
+        return MockDeleteResult(len(deleted))
+
+    def aggregate(self, pipeline):
+        """Run a pipeline of $match, $group, $sort, $skip and $limit stages"""
+        pipeline = list(pipeline)
+        with self._reading():
+            if pipeline and '$match' in pipeline[0]:
+                # A leading $match can use the indexes
+                query = pipeline.pop(0)['$match']
+                docs = [doc for doc in self._candidates(query) if self._matches(doc, query)]
+            else:
+                docs = list(self._docs.values())
+        return MockCursor(_run_pipeline(docs, pipeline))
     
     def delete_one(self, query):
         """Delete one document matching the query"""
-        for i, doc in enumerate(self.data):
-            if self._matches(doc, query):
-                del self.data[i]
-                self._save_data()
-                return MockDeleteResult(1)
+        with self._writing():
+            for doc in self._candidates(query):
+                if self._matches(doc, query):
+                    self._remove(doc)
+                    self._append({'op': 'delete', '_id': _index_value(doc['_id'])})
+                    return MockDeleteResult(1)
         
         return MockDeleteResult(0)
     
-    def _matches(self, doc, query):
+    @staticmethod
+    def _matches(doc, query):
         """Check if document matches the query"""
         for key, value in query.items():
             if key == '$or':
@@ -144,7 +799,7 @@ class MockCollection:
                 # At least one condition in $or must match
                 or_result = False
                 for condition in value:
-                    if self._matches(doc, condition):
+                    if MockCollection._matches(doc, condition):
                         or_result = True
                         break
                         
@@ -157,7 +812,7 @@ class MockCollection:
                     
                 # All conditions in $and must match
                 for condition in value:
-                    if not self._matches(doc, condition):
+                    if not MockCollection._matches(doc, condition):
                         return False
             else:
                 # Direct comparison
@@ -184,52 +839,298 @@ class MockCollection:
                     
         return True
     
-    def _apply_projection(self, doc, projection):
-        """Apply projection to document"""
+    @staticmethod
+    def _apply_projection(doc, projection):
+        """Apply projection to a copy of the document (like MongoDB, _id is kept unless excluded)"""
         if not projection:
-            return doc
+            return doc.copy()
+        if isinstance(projection, (list, tuple)):
+            projection = {field: 1 for field in projection}
             
-        result = {}
-        include_mode = True
-        
-        # Determine if we're in include or exclude mode
-        for field, include in projection.items():
-            if include == 1:
-                include_mode = True
-                break
-            elif include == 0:
-                include_mode = False
-                break
+        # Include mode if any field other than _id is included (or _id is all there is)
+        include_mode = any(include for field, include in projection.items() if field != '_id') or \
+            all(projection.values())
         
         if include_mode:
             # Include mode: only include specified fields
+            result = {}
+            if projection.get('_id', 1) and '_id' in doc:
+                result['_id'] = doc['_id']
             for field, include in projection.items():
-                if include == 1 and field in doc:
+                if include and field != '_id' and field in doc:
                     result[field] = doc[field]
+            return result
+
+        # Exclude mode: include all fields except specified ones
+        return {field: value for field, value in doc.items() if projection.get(field, 1)}
+
+def _get_path(doc, path):
+    """Value at a dotted path, or _MISSING"""
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _set_path(doc, path, value):
+    """Set a dotted path, copying the embedded documents on the way (stored documents are shared)"""
+    *parents, last = path.split('.')
+    for part in parents:
+        child = doc.get(part)
+        doc[part] = child = dict(child) if isinstance(child, dict) else {}
+        doc = child
+    doc[last] = value
+
+_MISSING = object()
+UPDATE_OPERATORS = ('$set', '$inc')
+
+def _check_update(update):
+    if not update or not all(op.startswith('$') for op in update):
+        raise ValueError("update only works with $ operators")
+    for op in update:
+        if op not in UPDATE_OPERATORS:
+            raise NotImplementedError(f"Update operator {op} not implemented in mock")
+
+def _apply_update(doc, update):
+    """Return a copy of the document with a $set/$inc update applied"""
+    new = doc.copy()
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if path == '_id' and (op == '$inc' or value != doc.get('_id', value)):
+                raise WriteError("Performing an update on the path '_id' would modify the immutable field '_id'", 66)
+            if op == '$inc':
+                current = _get_path(new, path)
+                if current is _MISSING:
+                    current = 0
+                if not isinstance(current, (int, float)) or not isinstance(value, (int, float)):
+                    raise WriteError(f"Cannot apply $inc to a value of non-numeric type ({path})", 14)
+                value = current + value
+            _set_path(new, path, value)
+    return new
+
+def _sort_key(value):
+    # Missing fields and None sort first, as in MongoDB
+    return (0,) if value is _MISSING or value is None else (1, value)
+
+def _sort_documents(docs, keys, limit=None):
+    """Sort documents by [(path, direction), ...], keeping only the first `limit` if given"""
+    if limit and len(keys) == 1:
+        path, direction = keys[0]
+        select = heapq.nsmallest if direction == 1 else heapq.nlargest
+        return select(limit, docs, key=lambda doc: _sort_key(_get_path(doc, path)))
+    docs = list(docs)
+    for path, direction in reversed(keys):  # Stable sorts, least significant key first
+        docs.sort(key=lambda doc: _sort_key(_get_path(doc, path)), reverse=direction == -1)
+    return docs[:limit] if limit else docs
+
+def _expression(doc, expression):
+    """Evaluate a $group expression: "$path", a literal, or a document of expressions"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = _get_path(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        return {key: _expression(doc, value) for key, value in expression.items()}
+    return expression
+
+def _run_pipeline(docs, pipeline):
+    """Run $match, $group, $sort, $skip and $limit stages over a list of documents"""
+    for i, stage in enumerate(pipeline):
+        (name, spec), = stage.items()
+        if name == '$match':
+            docs = [doc for doc in docs if MockCollection._matches(doc, spec)]
+        elif name == '$group':
+            docs = _group(docs, spec)
+        elif name == '$sort':
+            # Followed by $limit, keep only the first documents instead of sorting them all
+            following = pipeline[i + 1] if i + 1 < len(pipeline) else {}
+            docs = _sort_documents(docs, list(spec.items()), following.get('$limit'))
+        elif name == '$skip':
+            docs = docs[spec:]
+        elif name == '$limit':
+            docs = docs[:spec]
         else:
-            # Exclude mode: include all fields except specified ones
-            for field, value in doc.items():
-                if field not in projection or projection[field] != 0:
-                    result[field] = value
-                    
-        return result
+            raise NotImplementedError(f"Aggregation stage {name} not implemented in mock")
+    return docs
+
+def _group(docs, spec):
+    """$group with $sum, $avg, $min, $max, $first, $last, $push and $addToSet accumulators"""
+    accumulators = {field: next(iter(acc.items())) for field, acc in spec.items() if field != '_id'}
+    groups = {}
+    for doc in docs:
+        key = _expression(doc, spec['_id'])
+        group_key = json.dumps(key, sort_keys=True, default=str)
+        group = groups.get(group_key)
+        if group is None:
+            group = groups[group_key] = {'_id': key, **{field: [] for field in accumulators}}
+        for field, (op, expression) in accumulators.items():
+            group[field].append(_expression(doc, expression))
+
+    results = []
+    for group in groups.values():
+        result = {'_id': group['_id']}
+        for field, (op, _) in accumulators.items():
+            values = group[field]
+            numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+            present = [value for value in values if value is not None]
+            if op == '$sum':
+                result[field] = sum(numbers)
+            elif op == '$avg':
+                result[field] = sum(numbers) / len(numbers) if numbers else None
+            elif op == '$min':
+                result[field] = min(present) if present else None
+            elif op == '$max':
+                result[field] = max(present) if present else None
+            elif op == '$first':
+                result[field] = values[0]
+            elif op == '$last':
+                result[field] = values[-1]
+            elif op == '$push':
+                result[field] = values
+            elif op == '$addToSet':
+                result[field] = list({json.dumps(value, sort_keys=True, default=str): value
+                                      for value in values}.values())
+            else:
+                raise NotImplementedError(f"Accumulator {op} not implemented in mock")
+        results.append(result)
+    return results
+
+def _json_default(value):
+    """Encode the BSON types documents hold (bcrypt hashes, datetimes, ObjectId references) as extended JSON"""
+    if isinstance(value, bytes):
+        return {'$binary': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    if isinstance(value, (MockObjectId, ObjectId)):
+        return {'$oid': str(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _json_object_hook(obj):
+    """Decode the extended JSON written by _json_default"""
+    if len(obj) == 1:
+        if '$binary' in obj:
+            return base64.b64decode(obj['$binary'])
+        if '$date' in obj:
+            return datetime.fromisoformat(obj['$date'])
+        if '$oid' in obj:
+            return MockObjectId(obj['$oid'])
+    return obj
+
+def _json_dumps(value, **kwargs):
+    return json.dumps(value, default=_json_default, **kwargs)
+
+def _json_loads(text):
+    return json.loads(text, object_hook=_json_object_hook)
+
+def _untag(value):
+    """Decode extended JSON that has already been parsed (see BinarySnapshot.encode)"""
+    if isinstance(value, dict):
+        return _json_object_hook({key: _untag(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_untag(item) for item in value]
+    return value
+
+def _index_value(value):
+    """Hashable form of a value for index keys (ObjectIds by their hex string); TypeError if unhashable"""
+    if isinstance(value, (MockObjectId, ObjectId)):
+        return str(value)
+    hash(value)
+    return value
+
+class MockIndex:
+    """Hash index over one or more fields: key -> {_id: None}, an insertion-ordered set of _ids"""
+
+    def __init__(self, fields, unique=False):
+        self.fields = fields
+        self.unique = unique
+        self.entries = {}
+
+    def key(self, values):
+        """Index key of a document or of a query's equality values (None if a field is missing)"""
+        try:
+            return tuple(_index_value(values[field]) for field in self.fields)
+        except (KeyError, TypeError):
+            return None
+
+    def lookup(self, key):
+        return self.entries.get(key, {}) if key is not None else {}
+
+    def add(self, doc_id, doc):
+        self.add_key(doc_id, self.key(doc))
+
+    def add_key(self, doc_id, key):
+        if key is not None:
+            self.entries.setdefault(key, {})[doc_id] = None
+
+    def remove(self, doc_id, doc):
+        key = self.key(doc)
+        bucket = self.entries.get(key)
+        if bucket is not None:
+            bucket.pop(doc_id, None)
+            if not bucket:
+                del self.entries[key]
 
 class MockCursor:
-    def __init__(self, results):
+    """
+    Cursor over the matching stored documents. sort, skip and limit are
+    applied, and documents copied and projected, when iteration starts.
+    """
+
+    def __init__(self, results, projection=None):
         self.results = results
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._iterator = None
+
+    def _check_not_started(self):
+        if self._iterator is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def sort(self, key_or_list, direction=1):
+        self._check_not_started()
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, skip):
+        self._check_not_started()
+        self._skip = skip
+        return self
+
+    def limit(self, limit):
+        self._check_not_started()
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def _documents(self):
+        docs = self.results
+        if self._sort:
+            docs = _sort_documents(docs, self._sort, self._skip + self._limit if self._limit else None)
+        docs = docs[self._skip:self._skip + self._limit] if self._limit else docs[self._skip:]
+        return (MockCollection._apply_projection(doc, self._projection) for doc in docs)
         
     def __iter__(self):
-        return iter(self.results)
+        return self
         
     def __next__(self):
-        return next(self.results)
+        if self._iterator is None:
+            self._iterator = self._documents()
+        return next(self._iterator)
+
+    def close(self):
+        self._iterator = iter(())
 
 class MockObjectId:
     def __init__(self, oid=None):
         if oid:
             self.oid = oid
         else:
-            self.oid = hex(int(time.time() * 1000))[2:]
+            # Unique across processes, like a real ObjectId
+            self.oid = str(ObjectId())
             
     def __str__(self):
         return self.oid
@@ -237,10 +1138,13 @@ class MockObjectId:
     def __eq__(self, other):
         if isinstance(other, MockObjectId):
             return self.oid == other.oid
-        elif isinstance(other, str):
-            return self.oid == other
+        elif isinstance(other, (str, ObjectId)):
+            return self.oid == str(other)
         return False
 
+    def __hash__(self):
+        return hash(self.oid)
+
 class MockDeleteResult:
     def __init__(self, deleted_count):
         self.deleted_count = deleted_count
@@ -249,34 +1153,66 @@ class MockInsertOneResult:
     def __init__(self, inserted_id):
         self.inserted_id = inserted_id
 
+class MockInsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+class MockUpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
 class MockDatabase:
     def __init__(self, name, data_dir='./mock_data'):
         self.name = name
         self.data_dir = data_dir
         self.collections = {}
+        self._lock = threading.Lock()
         
     def __getattr__(self, name):
-        if name not in self.collections:
-            self.collections[name] = MockCollection(name, self.data_dir)
+        if name.startswith('__'):
+            raise AttributeError(name)
+        with self._lock:
+            if name not in self.collections:
+                self.collections[name] = MockCollection(name, self.data_dir)
         return self.collections[name]
         
     def get_collection(self, name):
         return getattr(self, name)
 
+    def close(self):
+        for collection in self.collections.values():
+            collection.close()
+
 class MockMongoClient:
+    """
+    Client for mock:// URIs (JSON files under backend/mock_data),
+    mock+sqlite:///path URIs (one SQLite file; see mock_sqlite.py) and
+    memory:// URIs (in memory only, private to the client).
+    """
+
     def __init__(self, uri=None, **kwargs):
         self.uri = uri
         self.data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'mock_data')
-        self.db = MockDatabase('grocery_assistant', self.data_dir)
+        if uri and uri.startswith(SQLITE_SCHEME):
+            from .mock_sqlite import SQLiteDatabase, sqlite_path
+            self.db = SQLiteDatabase('grocery_assistant', sqlite_path(uri, self.data_dir))
+        elif uri and uri.startswith(MEMORY_SCHEME):
+            self.data_dir = None
+            self.db = MockDatabase('grocery_assistant', None)
+        else:
+            self.db = MockDatabase('grocery_assistant', self.data_dir)
         
     def get_database(self, name=None):
         return self.db
         
+    @property
     def admin(self):
         return MockAdminDB()
         
     def close(self):
-        pass
+        self.db.close()
 
 class MockAdminDB:
     def command(self, command, *args, **kwargs):
@@ -284,10 +1220,7 @@ class MockAdminDB:
             return {'ok': 1.0}
         raise NotImplementedError(f"Command {command} not implemented in mock")
 
-# Example usage in your code:
-# from utils.mock_db import MockMongoClient
-# MONGODB_URI = os.environ.get('MONGODB_URI')
-# if MONGODB_URI and MONGODB_URI.startswith('mock://'):
-#     client = MockMongoClient()
-# else:
-#     client = MongoClient(MONGODB_URI) 
\ No newline at end of file
+# Services get a client through utils.db_backend.create_client, which uses
+# MockMongoClient for mock://, mock+sqlite:// and memory:// URIs:
+# from utils.db_backend import create_client
+# client = create_client(os.environ.get('MONGODB_URI', 'mock://grocery_assistant'))
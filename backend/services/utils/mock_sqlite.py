@@ -0,0 +1,403 @@
+"""
+SQLite storage engine for the mock MongoDB (URIs like mock+sqlite:///path).
+
+The JSON-file mock keeps every document in RAM. This engine keeps them on
+disk instead, one table per collection with one JSON document per row, so it
+can hold datasets of hundreds of thousands of items:
+
+- create_index adds a virtual generated column per indexed field
+  (json_extract of the document) and a SQL index over those columns
+- filters are translated to SQL over the generated columns (or json_extract
+  for unindexed fields). Parts that can't be translated are checked in
+  Python on the rows SQL returns, with the same rules as the JSON-file mock
+- cursor sort/skip/limit and count_documents run in SQL whenever the whole
+  filter was translated
+
+Writes are transactions in WAL mode, so several threads and processes can
+share one database file.
+
+URIs follow SQLAlchemy: mock+sqlite:///relative/path.db,
+mock+sqlite:////absolute/path.db, mock+sqlite:///:memory: (private to the
+process), and mock+sqlite:// for mock_data/grocery_assistant.sqlite3.
+"""
+import itertools
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .mock_db import (SQLITE_SCHEME, MockCollection, MockCursor, MockDeleteResult,
+                      MockInsertManyResult, MockInsertOneResult, MockObjectId, MockUpdateResult,
+                      _apply_update, _check_update, _index_value, _json_dumps, _json_loads, _run_pipeline)
+
+# Mongo comparison operators with a direct SQL equivalent
+SQL_OPERATORS = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+_memory_databases = itertools.count()
+
+
+def sqlite_path(uri, data_dir):
+    """Database file for a mock+sqlite:// URI"""
+    path = uri[len(SQLITE_SCHEME):]
+    if not path:
+        return os.path.join(data_dir, 'grocery_assistant.sqlite3')
+    return path[1:]  # Drop the "/" separating the (empty) host from the path
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _json_path(field):
+    """SQL literal of the JSON path of a (dotted) field, e.g. '$."meta"."x"'"""
+    path = '$' + ''.join('."' + part.replace('"', '\\"') + '"' for part in field.split('.'))
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _sql_value(value):
+    """A filter operand as SQLite sees the stored JSON value, or None if it has no SQL equivalent"""
+    if isinstance(value, (MockObjectId, ObjectId)):
+        return str(value)
+    if isinstance(value, (str, int, float)):  # bool is an int, like json_extract's true/false
+        return value
+    return None
+
+
+class SQLiteCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.table = _quote(name)
+        self._columns = set()  # Fields with a generated column
+        with database._write() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (id UNIQUE NOT NULL, doc TEXT NOT NULL)")
+            for row in conn.execute(f"PRAGMA table_xinfo({self.table})"):
+                if row[1].startswith('f:'):
+                    self._columns.add(row[1][2:])
+
+    # --- Storage ---
+
+    @staticmethod
+    def _dump(doc):
+        return _json_dumps(MockCollection._serialize(doc))
+
+    @staticmethod
+    def _load(text):
+        return MockCollection._deserialize(_json_loads(text))
+
+    def _column(self, field):
+        """SQL expression for a field: its generated column if it is indexed, else json_extract"""
+        if field == '_id':
+            return 'id'
+        if field in self._columns:
+            return _quote('f:' + field)
+        return f"json_extract(doc, {_json_path(field)})"
+
+    def create_index(self, keys, **kwargs):
+        """Create a SQL index over generated columns for the given fields"""
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = kwargs.get('name') or '_'.join(f"{field}_{direction}" for field, direction in keys)
+        with self.database._write() as conn:
+            for field, _ in keys:
+                if field != '_id' and field not in self._columns:
+                    conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {_quote('f:' + field)} "
+                                 f"GENERATED ALWAYS AS (json_extract(doc, {_json_path(field)})) VIRTUAL")
+                    self._columns.add(field)
+            columns = ', '.join(f"{self._column(field)} {'DESC' if direction == -1 else 'ASC'}"
+                                for field, direction in keys)
+            unique = 'UNIQUE ' if kwargs.get('unique', False) else ''
+            try:
+                conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS {_quote(self.name + '.' + name)} "
+                             f"ON {self.table} ({columns})")
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(f"Duplicate key error: {e}")
+        return name
+
+    # --- Filters ---
+
+    def _translate(self, query):
+        """
+        Translate a filter to a SQL condition that every matching document
+        meets. Returns (sql, params, exact); exact is False if the condition is
+        looser than the filter and rows still need checking in Python.
+        """
+        clauses, params, exact = [], [], True
+        for key, value in query.items():
+            if key in ('$and', '$or'):
+                if not isinstance(value, list) or not value:
+                    clauses.append('0')
+                    continue
+                parts = [self._translate(condition) for condition in value]
+                joiner = ' AND ' if key == '$and' else ' OR '
+                clauses.append('(' + joiner.join(part[0] for part in parts) + ')')
+                params.extend(param for part in parts for param in part[1])
+                exact = exact and all(part[2] for part in parts)
+                continue
+            if key.startswith('$'):
+                exact = False
+                continue
+
+            column = self._column(key)
+            operators = value.items() if isinstance(value, dict) else [('$eq', value)]
+            present = False
+            for op, operand in operators:
+                param = _sql_value(operand)
+                if op in SQL_OPERATORS and param is not None:
+                    clauses.append(f"{column} {SQL_OPERATORS[op]} ?")
+                    params.append(param)
+                    present = True
+                else:
+                    exact = False
+            if not present:
+                # Like the JSON-file mock, a condition on a field only matches documents that have it
+                clauses.append(f"json_type(doc, {_json_path(key)}) IS NOT NULL" if key != '_id' else '1')
+        return ' AND '.join(clauses) or '1', params, exact
+
+    def _select(self, query, columns='doc', order=None, limit=None, skip=0):
+        """Run a SELECT for the filter; returns (rows, exact). order/limit/skip only apply if exact."""
+        where, params, exact = self._translate(query or {})
+        sql = f"SELECT {columns} FROM {self.table} WHERE {where}"
+        if exact:
+            sql += ' ORDER BY ' + ', '.join(
+                [f"{self._column(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in order or []]
+                + ['rowid'])
+            if limit or skip:
+                sql += ' LIMIT ? OFFSET ?'
+                params = params + [limit or -1, skip]
+        with self.database._read() as conn:
+            return conn.execute(sql, params).fetchall(), exact
+
+    def _find_docs(self, query):
+        """All stored documents matching the filter, in insertion order"""
+        rows, exact = self._select(query)
+        docs = [self._load(row[0]) for row in rows]
+        return docs if exact else [doc for doc in docs if MockCollection._matches(doc, query or {})]
+
+    # --- Reads ---
+
+    def find_one(self, query=None, projection=None):
+        """Find one document matching the query"""
+        rows, exact = self._select(query, limit=1)
+        for row in rows:
+            doc = self._load(row[0])
+            if exact or MockCollection._matches(doc, query or {}):
+                return MockCollection._apply_projection(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None):
+        """Find all documents matching the query"""
+        return SQLiteCursor(self, query or {}, projection)
+
+    def count_documents(self, query, skip=0, limit=0):
+        """Count the documents matching the query"""
+        where, params, exact = self._translate(query)
+        if not exact:
+            count = max(len(self._find_docs(query)) - skip, 0)
+            return min(count, limit) if limit else count
+        sql = f"SELECT COUNT(*) FROM (SELECT 1 FROM {self.table} WHERE {where} LIMIT ? OFFSET ?)"
+        with self.database._read() as conn:
+            return conn.execute(sql, params + [limit or -1, skip]).fetchone()[0]
+
+    def aggregate(self, pipeline):
+        """Run a pipeline of $match, $group, $sort, $skip and $limit stages"""
+        pipeline = list(pipeline)
+        # A leading $match runs in SQL
+        query = pipeline.pop(0)['$match'] if pipeline and '$match' in pipeline[0] else {}
+        return MockCursor(_run_pipeline(self._find_docs(query), pipeline))
+
+    # --- Writes ---
+
+    def insert_one(self, document):
+        """Insert one document"""
+        doc = document.copy()
+        if '_id' not in doc:
+            doc['_id'] = MockObjectId()
+        try:
+            with self.database._write() as conn:
+                conn.execute(f"INSERT INTO {self.table} (id, doc) VALUES (?, ?)",
+                             (_index_value(doc['_id']), self._dump(doc)))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"Duplicate key error: {e}")
+        return MockInsertOneResult(doc['_id'])
+
+    def insert_many(self, documents, ordered=True):
+        """Insert documents in order; with ordered=False, carry on past duplicates"""
+        inserted, errors = [], []
+        with self.database._write() as conn:
+            for i, document in enumerate(documents):
+                doc = document.copy()
+                doc.setdefault('_id', MockObjectId())
+                try:
+                    conn.execute(f"INSERT INTO {self.table} (id, doc) VALUES (?, ?)",
+                                 (_index_value(doc['_id']), self._dump(doc)))
+                except sqlite3.IntegrityError as e:
+                    errors.append({'index': i, 'code': 11000, 'errmsg': f"Duplicate key error: {e}", 'op': doc})
+                    if ordered:
+                        break
+                    continue
+                inserted.append(doc['_id'])
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return MockInsertManyResult(inserted)
+
+    def update_one(self, query, update, upsert=False):
+        """Apply a $set/$inc update to the first document matching the query"""
+        return self._update(query, update, upsert, multi=False)
+
+    def update_many(self, query, update, upsert=False):
+        """Apply a $set/$inc update to every document matching the query"""
+        return self._update(query, update, upsert, multi=True)
+
+    def _update(self, query, update, upsert, multi):
+        _check_update(update)
+        matched = modified = 0
+        upserted_id = None
+        with self.database._write() as conn:
+            where, params, exact = self._translate(query)
+            rows = conn.execute(f"SELECT rowid, doc FROM {self.table} WHERE {where} ORDER BY rowid", params)
+            for rowid, text in rows.fetchall():
+                doc = self._load(text)
+                if not exact and not MockCollection._matches(doc, query):
+                    continue
+                matched += 1
+                new = _apply_update(doc, update)
+                if new != doc:
+                    try:
+                        conn.execute(f"UPDATE {self.table} SET doc = ? WHERE rowid = ?", (self._dump(new), rowid))
+                    except sqlite3.IntegrityError as e:
+                        raise DuplicateKeyError(f"Duplicate key error: {e}")
+                    modified += 1
+                if not multi:
+                    break
+
+            if not matched and upsert:
+                # Start from the query's equality conditions, like MongoDB
+                doc = {key: value for key, value in query.items()
+                       if not key.startswith('$') and not isinstance(value, dict)}
+                doc = _apply_update(doc, update)
+                doc.setdefault('_id', MockObjectId())
+                try:
+                    conn.execute(f"INSERT INTO {self.table} (id, doc) VALUES (?, ?)",
+                                 (_index_value(doc['_id']), self._dump(doc)))
+                except sqlite3.IntegrityError as e:
+                    raise DuplicateKeyError(f"Duplicate key error: {e}")
+                upserted_id = doc['_id']
+        return MockUpdateResult(matched, modified, upserted_id)
+
+    def delete_one(self, query):
+        """Delete one document matching the query"""
+        return self._delete(query, multi=False)
+
+    def delete_many(self, query):
+        """Delete all documents matching the query"""
+        return self._delete(query, multi=True)
+
+    def _delete(self, query, multi):
+        with self.database._write() as conn:
+            where, params, exact = self._translate(query)
+            if exact and multi:
+                return MockDeleteResult(conn.execute(f"DELETE FROM {self.table} WHERE {where}", params).rowcount)
+            rowids = []
+            for rowid, text in conn.execute(f"SELECT rowid, doc FROM {self.table} WHERE {where} ORDER BY rowid",
+                                            params).fetchall():
+                if exact or MockCollection._matches(self._load(text), query):
+                    rowids.append((rowid,))
+                    if not multi:
+                        break
+            conn.executemany(f"DELETE FROM {self.table} WHERE rowid = ?", rowids)
+        return MockDeleteResult(len(rowids))
+
+    def close(self):
+        pass
+
+
+class SQLiteCursor(MockCursor):
+    """Cursor whose sort, skip and limit run in SQL when the whole filter could be translated"""
+
+    def __init__(self, collection, query, projection=None):
+        super().__init__(None, projection)
+        self._collection = collection
+        self._query = query
+
+    def _documents(self):
+        rows, exact = self._collection._select(self._query, order=self._sort, limit=self._limit, skip=self._skip)
+        if not exact:
+            self.results = [doc for doc in map(self._collection._load, (row[0] for row in rows))
+                            if MockCollection._matches(doc, self._query)]
+            return super()._documents()
+        return (MockCollection._apply_projection(self._collection._load(row[0]), self._projection) for row in rows)
+
+
+class SQLiteDatabase:
+    """One SQLite file; one connection per thread"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.collections = {}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.RLock()
+        if path == ':memory:':
+            # A shared-cache in-memory database, kept alive by self._anchor; its
+            # connections can't wait on each other's locks, so serialize them here
+            self._target = f"file:mock-sqlite-{os.getpid()}-{next(_memory_databases)}?mode=memory&cache=shared"
+            self._reads_locked = True
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._target = path
+            self._reads_locked = False
+        self._anchor = self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._target, uri=self._target.startswith('file:'), timeout=30,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _read(self):
+        with self._lock if self._reads_locked else nullcontext():
+            yield self._connect()
+
+    @contextmanager
+    def _write(self):
+        """A write transaction (BEGIN IMMEDIATE, so concurrent writers queue instead of deadlocking)"""
+        conn = self._connect()
+        with self._lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    def get_collection(self, name):
+        with self._lock:
+            if name not in self.collections:
+                self.collections[name] = SQLiteCollection(self, name)
+        return self.collections[name]
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,66 @@
+"""
+Shared setup for the backend tests: the three services loaded in one process
+against a fresh in-memory mock database (MONGODB_URI=memory://..., see
+utils/db_backend.py), with the LLM calls answered locally.
+
+Run from the backend directory:
+    python -m pytest -q
+"""
+import os
+import sys
+import uuid
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+# Before any service module reads its configuration
+os.environ["MONGODB_URI"] = f"memory://tests-{uuid.uuid4().hex[:8]}"
+os.environ.pop("SECRETS_ARN", None)
+os.environ.pop("SERVER_TIMING", None)
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ["GROQ_API_KEY"] = "test-key"
+os.environ["COMPRESS_MIN_SIZE"] = "0"  # Plain JSON bodies to assert on
+for name in ("RECIPE_LAMBDA_NAME", "RECIPE_SERVICE_URL", "RECIPE_TRANSPORT"):
+    os.environ.pop(name, None)  # Inventory skips the prediction call
+
+import pytest  # noqa: E402
+
+from benchmarks.llm_stub import RECIPE, start_llm_stub  # noqa: E402
+from utils.modules import load_module_from  # noqa: E402
+
+_llm_server, _llm_base_url = start_llm_stub()
+os.environ["GROQ_API_URL"] = _llm_base_url + "/openai/v1/chat/completions"
+
+SERVICES = {
+    "auth": "services/auth_service",
+    "inventory": "services/inventory_service",
+    "recipe": "services/recipe_service",
+}
+
+
+class FakeGroqClient:
+    """Stands in for groq.Groq: chat.completions.create() returns the stub recipe"""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = type("Message", (), {"content": RECIPE})()
+        choice = type("Choice", (), {"message": message})()
+        return type("ChatCompletion", (), {"choices": [choice]})()
+
+
+def load_handler(service):
+    path = os.path.join(backend_root, SERVICES[service], "handler.py")
+    return load_module_from(path, f"{service}_service_handler")
+
+
+@pytest.fixture(scope="session")
+def handlers():
+    loaded = {service: load_handler(service) for service in SERVICES}
+    loaded["recipe"]._groq_client._value = FakeGroqClient()
+    return loaded
@@ -0,0 +1,126 @@
+"""
+Expiry alerts: the resumable per-user scan on each mock backend, and the
+free-text shelf-life parsing that dates items.
+"""
+import os
+from datetime import date, datetime
+
+import pytest
+
+from conftest import backend_root
+from services.utils.mock_db import MockDatabase
+from utils.db_backend import create_client
+from utils.modules import import_sibling
+
+inventory_dir = os.path.join(backend_root, "services", "inventory_service")
+expiry_alerts = import_sibling(os.path.join(inventory_dir, "handler.py"), "expiry_alerts")
+database = import_sibling(os.path.join(inventory_dir, "handler.py"), "database")
+
+TODAY = date(2024, 5, 1)
+USERS = [f"user-{n:02}" for n in range(12)]
+
+
+class ListSink:
+    def __init__(self, fail_after=None):
+        self.digests = []
+        self.fail_after = fail_after
+
+    def write(self, digest):
+        if self.fail_after is not None and len(self.digests) >= self.fail_after:
+            raise RuntimeError("sink unavailable")
+        self.digests.append(digest)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(params=["mock", "mock+sqlite", "memory"])
+def db(request, tmp_path):
+    """The items and job_checkpoints collections on one backend, seeded for TODAY"""
+    if request.param == "mock":
+        # What mock:// opens, in a directory of the test's own rather than backend/mock_data
+        client = None
+        db = MockDatabase("grocery_assistant", str(tmp_path))
+    else:
+        uri = f"mock+sqlite:///{tmp_path / 'expiry.db'}" if request.param == "mock+sqlite" else "memory://expiry"
+        client = create_client(uri)
+        db = client.get_database()
+    db.items.create_index([("user_id", 1), ("expires_on", 1)])
+    for n, user_id in enumerate(USERS):
+        db.items.insert_many([
+            {"user_id": user_id, "item_name": "Milk", "expires_on": f"2024-05-0{1 + n % 3}"},
+            {"user_id": user_id, "item_name": "Rice", "expires_on": "2025-01-01"},  # Outside the window
+        ])
+    db.items.insert_one({"user_id": "user-99", "item_name": "Old bread", "expires_on": "2024-04-20"})
+    yield db
+    if client is not None:
+        client.close()
+
+
+def scan(db, sink, **kwargs):
+    return expiry_alerts.scan(db.items, db.job_checkpoints, sink, days=3, today=TODAY, **kwargs)
+
+
+def test_stopped_scan_resumes_without_missing_or_repeating_users(db):
+    first = ListSink()
+    summary = scan(db, first, should_stop=lambda: len(first.digests) >= 5)
+    assert not summary["complete"] and summary["digests"] == 5
+    assert summary["last_user_id"] == USERS[4]
+
+    second = ListSink()
+    summary = scan(db, second)
+    assert summary["complete"] and summary["resumed_after"] == USERS[4]
+
+    digests = first.digests + second.digests
+    assert [digest["user_id"] for digest in digests] == USERS
+    assert all(digest["total"] == 1 and digest["items"][0]["item_name"] == "Milk" for digest in digests)
+
+    rerun = scan(db, ListSink())
+    assert rerun["skipped"] == "already complete" and rerun["digests"] == len(USERS)
+
+
+def test_failed_scan_resumes_after_the_last_checkpoint(db, monkeypatch):
+    monkeypatch.setattr(expiry_alerts, "CHECKPOINT_EVERY", 3)
+    first = ListSink(fail_after=7)
+    with pytest.raises(RuntimeError):
+        scan(db, first)
+
+    second = ListSink()
+    assert scan(db, second)["complete"]
+    # Digests after the last checkpoint may be sent again, but none is skipped
+    delivered = [digest["user_id"] for digest in first.digests + second.digests]
+    assert set(delivered) == set(USERS)
+    assert [digest["user_id"] for digest in second.digests] == USERS[len(first.digests):]
+
+
+def test_restart_ignores_the_checkpoint(db):
+    scan(db, ListSink())
+    sink = ListSink()
+    assert scan(db, sink, restart=True)["complete"]
+    assert [digest["user_id"] for digest in sink.digests] == USERS
+
+
+@pytest.mark.parametrize("predicted_expiry, days", [
+    ("3-5 days, or 2 months frozen", 3),
+    ("Keeps 5-7 days refrigerated in a sealed container", 5),
+    ("1 week", 7),
+    ("2 to 3 weeks", 14),
+    ("6 months", 180),
+    ("1.5 years unopened", 547),
+    ("10 DAYS", 10),
+    ("N/A", None),
+    ("Use by the printed date", None),
+    ("", None),
+    (None, None),
+])
+def test_shelf_life_days(predicted_expiry, days):
+    assert database.shelf_life_days(predicted_expiry) == days
+
+
+def test_expiry_date():
+    added = datetime(2024, 5, 1, 12, 0)
+    assert database.expiry_date("3-5 days", added) == "2024-05-04"
+    assert database.expiry_date("N/A", added) is None
@@ -0,0 +1,196 @@
+"""
+The captured sample events in tests/events/ through each service's
+lambda_handler, once per payload format:
+
+- rest_v1:      REST API proxy integration (payload 1.0)
+- http_api_v2:  HTTP API on a named stage (payload 2.0)
+- function_url: Lambda function URL (payload 2.0, base64 bodies)
+
+Every format must build the same request (method, path, query, body, client
+IP, auth and cookie headers) and get the same status and body back, in the
+response shape of its format. "{{access_token}}" in the samples is replaced
+with a token for a user of the test's own, so no test depends on another's data.
+"""
+import base64
+import copy
+import json
+import os
+import uuid
+
+import pytest
+
+from conftest import RECIPE
+from utils.lambda_adapter import build_environ
+
+events_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "events")
+
+FORMATS = ("rest_v1", "http_api_v2", "function_url")
+SAMPLE_ITEM_ID = "6710f3a2c9e77b4d1a2b3c4d"
+
+
+def load_events(service, fmt, access_token=""):
+    with open(os.path.join(events_dir, service, f"{fmt}.json")) as f:
+        return json.loads(f.read().replace("{{access_token}}", access_token))
+
+
+def with_json_body(event, body):
+    """The event with its JSON body replaced, encoded the way the format sends it"""
+    event = copy.deepcopy(event)
+    raw = json.dumps(body)
+    event["body"] = base64.b64encode(raw.encode()).decode() if event.get("isBase64Encoded") else raw
+    for headers in (event.get("headers") or {}, event.get("multiValueHeaders") or {}):
+        for name in headers:
+            if name.lower() == "content-length":
+                headers[name] = [str(len(raw))] if isinstance(headers[name], list) else str(len(raw))
+    return event
+
+
+def invoke(handler, fmt, event):
+    """lambda_handler's (status, JSON body), after checking the response has its format's shape"""
+    response = handler.lambda_handler(copy.deepcopy(event), None)
+    assert isinstance(response.get("statusCode"), int) and "body" in response
+    if fmt == "rest_v1":
+        assert "cookies" not in response, "payload 1.0 response carries a v2 cookies array"
+    else:
+        assert "multiValueHeaders" not in response, "payload 2.0 response carries multiValueHeaders"
+    body = response["body"]
+    if response.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode()
+    return response["statusCode"], json.loads(body)
+
+
+def request_signature(event):
+    """The parts of the WSGI environ that must not depend on the payload format"""
+    environ = build_environ(copy.deepcopy(event))
+    return {
+        "method": environ["REQUEST_METHOD"],
+        "path": environ["PATH_INFO"],
+        "query": environ["QUERY_STRING"],
+        "body": environ["wsgi.input"].getvalue().decode("utf-8"),
+        "remote_addr": environ["REMOTE_ADDR"],
+        "content_type": environ.get("CONTENT_TYPE"),
+        "authorization": environ.get("HTTP_AUTHORIZATION"),
+        "cookie": environ.get("HTTP_COOKIE"),
+    }
+
+
+def access_token(handler, user_id):
+    from flask_jwt_extended import create_access_token
+    with handler.app.app_context():
+        return create_access_token(identity=user_id)
+
+
+@pytest.fixture
+def user_id():
+    return uuid.uuid4().hex[:24]
+
+
+@pytest.mark.parametrize("service", ["auth", "inventory", "recipe"])
+def test_formats_build_the_same_request(service):
+    events = {fmt: load_events(service, fmt, "token") for fmt in FORMATS}
+    for name in events["rest_v1"]:
+        expected = request_signature(events["rest_v1"][name])
+        for fmt in FORMATS[1:]:
+            assert request_signature(events[fmt][name]) == expected, f"{service} {name} differs in {fmt}"
+
+
+def test_login_cookies_joined_like_a_cookie_header():
+    for fmt in FORMATS:
+        assert request_signature(load_events("auth", fmt)["login"])["cookie"] == "theme=dark; session_hint=returning"
+
+
+def test_repeated_cookie_headers_joined_like_a_cookie_header():
+    event = load_events("auth", "rest_v1")["login"]
+    event["multiValueHeaders"]["Cookie"] = ["theme=dark", "session_hint=returning"]
+    event["multiValueHeaders"]["Accept-Language"] = ["en-US", "en;q=0.9"]
+    environ = build_environ(event)
+    assert environ["HTTP_COOKIE"] == "theme=dark; session_hint=returning"
+    assert environ["HTTP_ACCEPT_LANGUAGE"] == "en-US,en;q=0.9"
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+@pytest.mark.parametrize("service, checks", [
+    ("auth", {"secrets": "ok", "mongodb": "ok"}),
+    ("inventory", {"secrets": "ok", "mongodb": "ok"}),
+    ("recipe", {"secrets": "ok", "llm_key": "ok", "llm": "ok"}),
+])
+def test_health(handlers, service, checks, fmt):
+    status, body = invoke(handlers[service], fmt, load_events(service, fmt)["health"])
+    assert status == 200
+    assert body == {"status": "healthy", "service": service, "checks": checks}
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_register_then_login(handlers, fmt):
+    events = load_events("auth", fmt)
+    username = f"maria.{uuid.uuid4().hex[:8]}"
+    credentials = {"username": username, "password": "C0rrect-Horse-9"}
+    user = {"username": username, "email": f"{username}@example.com"}
+
+    status, body = invoke(handlers["auth"], fmt, with_json_body(events["register"], {**credentials, "email": user["email"]}))
+    assert status == 200
+    assert body["success"] is True and body["message"] == "Registration successful"
+    assert body["user"] == user and body["token"]
+
+    status, body = invoke(handlers["auth"], fmt, with_json_body(events["register"], {**credentials, "email": user["email"]}))
+    assert status == 400 and body["success"] is False
+
+    status, body = invoke(handlers["auth"], fmt, with_json_body(events["login"], credentials))
+    assert status == 200
+    assert body["success"] is True and body["message"] == "Login successful"
+    assert body["user"] == user and body["token"]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_inventory_add_list_delete(handlers, user_id, fmt):
+    inventory = handlers["inventory"]
+    events = load_events("inventory", fmt, access_token(inventory, user_id))
+
+    status, body = invoke(inventory, fmt, events["list_items"])
+    assert (status, body) == (200, {"success": True, "items": []})
+
+    status, body = invoke(inventory, fmt, events["add_item"])
+    assert status == 201 and body["success"] is True
+    item = body["item"]
+    assert item["item_name"] == "Greek Yogurt" and item["user_id"] == user_id
+
+    status, body = invoke(inventory, fmt, events["list_items"])
+    assert status == 200 and [listed["_id"] for listed in body["items"]] == [item["_id"]]
+
+    delete = json.loads(json.dumps(events["delete_item"]).replace(SAMPLE_ITEM_ID, item["_id"]))
+    status, body = invoke(inventory, fmt, delete)
+    assert (status, body) == (200, {"success": True, "message": "Item deleted"})
+
+    status, body = invoke(inventory, fmt, delete)
+    assert status == 404 and body["success"] is False
+
+    status, body = invoke(inventory, fmt, events["list_items"])
+    assert (status, body) == (200, {"success": True, "items": []})
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_predict_food_info(handlers, fmt):
+    status, body = invoke(handlers["recipe"], fmt, load_events("recipe", fmt)["predict"])
+    assert status == 200
+    assert body["success"] is True
+    assert body["category"] == "Produce" and body["expiry"].startswith("Keeps 5-7 days")
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_generate_recipe(handlers, user_id, fmt):
+    recipe = handlers["recipe"]
+    groq_client = recipe._groq_client.get()
+    status, body = invoke(recipe, fmt, load_events("recipe", fmt, access_token(recipe, user_id))["generate"])
+    assert (status, body) == (200, {"success": True, "recipe": RECIPE})
+    prompt = groq_client.calls[-1]["messages"][-1]["content"]
+    assert "Eggs, Baby Spinach, Feta Cheese" in prompt
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_generate_recipe_requires_token(handlers, fmt):
+    event = load_events("recipe", fmt)["generate"]
+    for headers in (event.get("headers") or {}, event.get("multiValueHeaders") or {}):
+        for name in [name for name in headers if name.lower() == "authorization"]:
+            del headers[name]
+    status, body = invoke(handlers["recipe"], fmt, event)
+    assert status == 401 and "recipe" not in body
@@ -0,0 +1,190 @@
+"""
+Login throttling: the per-IP and per-username token buckets, Retry-After,
+the in-memory and MongoDB bucket stores, and attaching the shared store once
+the database comes up. The end-to-end checks go through the auth service's
+lambda_handler with the sample login event, like test_lambda_events.py.
+"""
+import copy
+import json
+import os
+import uuid
+
+import pytest
+
+from conftest import backend_root
+from test_lambda_events import invoke, load_events, with_json_body
+from utils.modules import import_sibling
+
+throttle = import_sibling(os.path.join(backend_root, "services", "auth_service", "handler.py"), "throttle")
+
+
+def evaluate(expr, doc):
+    """The aggregation expressions MongoBucketStore's pipeline uses, against one document"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict) and len(expr) == 1 and next(iter(expr)).startswith("$"):
+        (op, args), = expr.items()
+        values = [evaluate(arg, doc) for arg in args]
+        if op == "$ifNull":
+            return values[0] if values[0] is not None else values[1]
+        if op == "$cond":
+            return values[1] if values[0] else values[2]
+        return {"$min": lambda a, b: min(a, b), "$add": lambda a, b: a + b, "$multiply": lambda a, b: a * b,
+                "$subtract": lambda a, b: a - b, "$gte": lambda a, b: a >= b}[op](*values)
+    return expr
+
+
+class FakeThrottleCollection:
+    """Just enough of a pymongo collection for MongoBucketStore: pipeline updates with upsert"""
+
+    def __init__(self, fail=False):
+        self.docs = {}
+        self.indexes = []
+        self.fail = fail
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+    def find_one_and_update(self, query, pipeline, upsert=False, return_document=None):
+        if self.fail:
+            raise ConnectionError("MongoDB unavailable")
+        doc = self.docs.get(query["_id"], {"_id": query["_id"]})
+        for stage in pipeline:
+            doc = {**doc, **{field: evaluate(expr, doc) for field, expr in stage["$set"].items()}}
+        self.docs[query["_id"]] = doc
+        return doc
+
+
+class FakeDatabase:
+    """What LoginThrottle reads from AuthDatabase: db.login_throttle"""
+
+    def __init__(self, collection):
+        self.db = type("Db", (), {"login_throttle": collection})()
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def store(request):
+    if request.param == "memory":
+        return throttle.MemoryBucketStore()
+    return throttle.MongoBucketStore(FakeThrottleCollection())
+
+
+def test_bucket_allows_burst_then_refills(store):
+    now = 1000.0
+    assert [store.consume("k", 3, 0.5, now=now)[0] for _ in range(3)] == [True] * 3
+    allowed, retry_after = store.consume("k", 3, 0.5, now=now)
+    assert not allowed and retry_after == pytest.approx(2.0)
+    assert store.consume("k", 3, 0.5, now=now + 2)[0]
+    assert not store.consume("k", 3, 0.5, now=now + 2)[0]
+    # Refills up to the burst size, no further
+    assert [store.consume("k", 3, 0.5, now=now + 1000)[0] for _ in range(4)] == [True] * 3 + [False]
+
+
+def test_memory_store_is_bounded():
+    store = throttle.MemoryBucketStore(max_keys=100)
+    for n in range(1000):
+        store.consume(f"user:{n}", 5, 1.0)
+    assert len(store._buckets) == 100
+
+
+def test_mongo_store_expires_idle_buckets():
+    collection = FakeThrottleCollection()
+    throttle.MongoBucketStore(collection)
+    assert collection.indexes == [("expires_at", {"expireAfterSeconds": 0})]
+
+
+def test_check_takes_from_ip_and_user_buckets():
+    login_throttle = throttle.LoginThrottle(ip_burst=5, ip_rate=1.0, user_burst=3, user_rate=1 / 30)
+    assert [login_throttle.check("203.0.113.7", "maria")[0] for _ in range(3)] == [True] * 3
+    assert login_throttle.check("203.0.113.7", "maria") == (False, 30)
+    # Other usernames from the same IP drain the IP bucket (4 attempts taken so far)
+    assert login_throttle.check("203.0.113.7", "li")[0]
+    assert login_throttle.check("203.0.113.7", "sam") == (False, 1)
+    assert login_throttle.check("198.51.100.2", "sam")[0]
+    assert login_throttle.rejected == 2
+
+
+def test_store_errors_fall_back_to_memory():
+    login_throttle = throttle.LoginThrottle(store=throttle.MongoBucketStore(FakeThrottleCollection(fail=True)),
+                                            ip_burst=5, user_burst=3)
+    assert [login_throttle.check("203.0.113.7", "maria")[0] for _ in range(4)] == [True] * 3 + [False]
+
+
+def test_shared_store_attached_when_database_comes_up(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, "monotonic", lambda: now[0])
+    monkeypatch.setenv("LOGIN_THROTTLE_STORE", "mongo")
+    database = {"db": None}
+    calls = []
+
+    def get_db():
+        calls.append(now[0])
+        return database["db"]
+
+    login_throttle = throttle.LoginThrottle.from_env(get_db)
+    assert login_throttle.store is login_throttle.local_store
+    login_throttle.check("203.0.113.7", "maria")
+    assert len(calls) == 1  # Not retried on every attempt
+
+    collection = FakeThrottleCollection()
+    database["db"] = FakeDatabase(collection)
+    now[0] += throttle.ATTACH_RETRY_SECONDS
+    login_throttle.check("203.0.113.7", "maria")
+    assert isinstance(login_throttle.store, throttle.MongoBucketStore)
+    assert set(collection.docs) == {"ip:203.0.113.7", "user:maria"}
+
+    now[0] += throttle.ATTACH_RETRY_SECONDS
+    login_throttle.check("203.0.113.7", "maria")
+    assert len(calls) == 2
+
+
+def test_memory_store_by_default(monkeypatch):
+    monkeypatch.delenv("LOGIN_THROTTLE_STORE", raising=False)
+    login_throttle = throttle.LoginThrottle.from_env(lambda: pytest.fail("database not needed"))
+    login_throttle.check("203.0.113.7", "maria")
+    assert login_throttle.store is login_throttle.local_store
+
+
+# --- Through the auth service ---
+
+@pytest.fixture
+def auth(handlers, monkeypatch):
+    """The auth service with a fresh throttle: 5 attempts per IP, 3 per username"""
+    auth = handlers["auth"]
+    monkeypatch.setattr(auth._login_throttle, "_value",
+                        throttle.LoginThrottle(ip_burst=5, ip_rate=1 / 60, user_burst=3, user_rate=1 / 30))
+    return auth
+
+
+def login_event(source_ip, username, password="wrong-password"):
+    event = copy.deepcopy(load_events("auth", "rest_v1")["login"])
+    event["requestContext"]["identity"]["sourceIp"] = source_ip
+    return with_json_body(event, {"username": username, "password": password})
+
+
+def header(response, name):
+    """A header of a payload 1.0 response, which may carry it in headers or multiValueHeaders"""
+    values = (response.get("multiValueHeaders") or {}).get(name)
+    return values[0] if values else (response.get("headers") or {}).get(name)
+
+
+def test_fourth_bad_login_for_a_user_is_throttled(auth):
+    event = login_event("203.0.113.41", f"maria.{uuid.uuid4().hex[:8]}")
+    for _ in range(3):
+        status, body = invoke(auth, "rest_v1", event)
+        assert status == 401 and body["success"] is False
+    response = auth.lambda_handler(copy.deepcopy(event), None)
+    assert response["statusCode"] == 429
+    assert json.loads(response["body"]) == {"success": False, "message": "Too many login attempts, please try again later"}
+    assert header(response, "Retry-After") == "30"
+
+
+def test_ip_bucket_trips_after_five_attempts(auth):
+    source_ip = "203.0.113.42"
+    for _ in range(5):
+        status, _ = invoke(auth, "rest_v1", login_event(source_ip, f"user.{uuid.uuid4().hex[:8]}"))
+        assert status == 401
+    status, _ = invoke(auth, "rest_v1", login_event(source_ip, f"user.{uuid.uuid4().hex[:8]}"))
+    assert status == 429
+    status, _ = invoke(auth, "rest_v1", login_event("203.0.113.43", f"user.{uuid.uuid4().hex[:8]}"))
+    assert status == 401
@@ -0,0 +1,128 @@
+"""
+MockCollection persistence and indexes: the journal replayed on reload,
+compaction, catching up with another handle on the same directory, unique
+indexes and updates. Every test gets its own data directory.
+"""
+import os
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from services.utils.mock_db import MockCollection
+
+
+@pytest.fixture(params=["json", "binary"])
+def snapshot_format(request):
+    return request.param
+
+
+def open_users(data_dir, snapshot_format="json", **kwargs):
+    users = MockCollection("users", str(data_dir), snapshot_format=snapshot_format, **kwargs)
+    users.create_index([("email", 1)], unique=True)
+    return users
+
+
+def reopen(collection, snapshot_format="json", **kwargs):
+    collection.close()
+    return open_users(collection.data_dir, snapshot_format, **kwargs)
+
+
+def emails(collection):
+    return sorted((doc["name"], doc.get("email")) for doc in collection.find({}))
+
+
+def test_writes_survive_a_reload(tmp_path, snapshot_format):
+    users = open_users(tmp_path, snapshot_format)
+    users.insert_many([{"name": "a", "email": "a@x"}, {"name": "b", "email": "b@x"}, {"name": "c", "email": "c@x"}])
+    users.update_one({"name": "a"}, {"$set": {"email": "a@y"}})
+    users.delete_one({"name": "b"})
+
+    users = reopen(users, snapshot_format)
+    assert emails(users) == [("a", "a@y"), ("c", "c@x")]
+    assert users.find_one({"email": "a@y"})["name"] == "a"
+    users.close()
+
+
+def test_compaction_keeps_every_write(tmp_path, snapshot_format):
+    users = open_users(tmp_path, snapshot_format, compact_threshold=2048)
+    for n in range(200):
+        users.insert_one({"name": f"u{n:03}", "email": f"u{n}@x"})
+    users.update_many({}, {"$inc": {"logins": 1}})
+
+    users = reopen(users, snapshot_format)
+    assert users.count_documents({}) == 200
+    assert users.count_documents({"logins": 1}) == 200
+    assert not os.path.exists(users._get_journal_path(".old"))
+    users.close()
+
+
+def test_torn_last_journal_line_is_dropped(tmp_path):
+    users = open_users(tmp_path)
+    users.insert_one({"name": "a", "email": "a@x"})
+    users.close()
+    with open(os.path.join(tmp_path, "users.journal"), "a") as f:
+        f.write('{"seq": 2, "op": "insert", "doc": {"name": "b"')
+
+    users = open_users(tmp_path)
+    assert emails(users) == [("a", "a@x")]
+    users.insert_one({"name": "c", "email": "c@x"})
+    users = reopen(users)
+    assert emails(users) == [("a", "a@x"), ("c", "c@x")]
+    users.close()
+
+
+def test_second_handle_catches_up(tmp_path):
+    writer, reader = open_users(tmp_path), open_users(tmp_path)
+    writer.insert_one({"name": "a", "email": "a@x"})
+    assert reader.find_one({"email": "a@x"})["name"] == "a"
+    reader.update_one({"name": "a"}, {"$set": {"email": "a@y"}})
+    assert writer.find_one({"name": "a"})["email"] == "a@y"
+    with pytest.raises(DuplicateKeyError):
+        writer.insert_one({"name": "b", "email": "a@y"})
+    writer.close()
+    reader.close()
+
+
+def test_unique_index(tmp_path):
+    users = open_users(tmp_path)
+    users.insert_one({"name": "a", "email": "a@x"})
+    with pytest.raises(DuplicateKeyError):
+        users.insert_one({"name": "b", "email": "a@x"})
+
+    with pytest.raises(BulkWriteError) as error:
+        users.insert_many([{"name": "c", "email": "c@x"}, {"name": "d", "email": "a@x"},
+                           {"name": "e", "email": "e@x"}], ordered=False)
+    assert error.value.details["nInserted"] == 2
+
+    users = reopen(users)
+    assert emails(users) == [("a", "a@x"), ("c", "c@x"), ("e", "e@x")]
+    users.close()
+
+
+def test_update_operators_and_upsert(tmp_path):
+    users = open_users(tmp_path)
+    users.insert_one({"name": "a", "email": "a@x", "stats": {"logins": 1}})
+    result = users.update_one({"name": "a"}, {"$inc": {"stats.logins": 2}, "$set": {"stats.last": "today"}})
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    result = users.update_one({"name": "z"}, {"$set": {"email": "z@x"}}, upsert=True)
+    assert result.upserted_id is not None
+
+    users = reopen(users)
+    assert users.find_one({"name": "a"})["stats"] == {"logins": 3, "last": "today"}
+    assert users.find_one({"email": "z@x"})["name"] == "z"
+    users.close()
+
+
+def test_update_many_duplicate_key_keeps_and_journals_earlier_changes(tmp_path):
+    users = open_users(tmp_path)
+    users.insert_many([{"name": "a", "email": "x"}, {"name": "b", "email": "y"}])
+
+    # Like MongoDB, documents updated before the duplicate stay updated
+    with pytest.raises(DuplicateKeyError):
+        users.update_many({}, {"$set": {"email": "z"}})
+    assert emails(users) == [("a", "z"), ("b", "y")]
+
+    users = reopen(users)
+    assert emails(users) == [("a", "z"), ("b", "y")]
+    assert users.find_one({"email": "z"})["name"] == "a"
+    users.close()
@@ -0,0 +1,50 @@
+"""SecretsProvider caching: hits, refresh after the TTL and remembered misses"""
+import pytest
+
+from utils.secrets import SecretsProvider
+
+
+class CountingProvider(SecretsProvider):
+    def __init__(self, results, **kwargs):
+        super().__init__(**kwargs)
+        self.results = list(results)
+        self.fetches = 0
+
+    def _fetch(self, secret_name):
+        self.fetches += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        SecretsProvider()
+
+
+def test_secret_fetched_once():
+    provider = CountingProvider([{"jwt_secret_key": "k"}])
+    assert [provider.get_secret("app") for _ in range(5)] == [{"jwt_secret_key": "k"}] * 5
+    assert provider.fetches == 1
+
+
+@pytest.mark.parametrize("failure", [None, RuntimeError("throttled")])
+def test_failed_fetch_not_retried_until_miss_ttl(monkeypatch, failure):
+    now = [1000.0]
+    monkeypatch.setattr("utils.secrets.time.monotonic", lambda: now[0])
+    provider = CountingProvider([failure, {"jwt_secret_key": "k"}], miss_ttl=60)
+
+    assert [provider.get_secret("app") for _ in range(5)] == [None] * 5
+    assert provider.fetches == 1
+
+    now[0] += 61
+    assert provider.get_secret("app") == {"jwt_secret_key": "k"}
+    assert provider.fetches == 2
+
+
+def test_invalidate_forgets_a_miss():
+    provider = CountingProvider([None, {"jwt_secret_key": "k"}])
+    assert provider.get_secret("app") is None
+    provider.invalidate("app")
+    assert provider.get_secret("app") == {"jwt_secret_key": "k"}
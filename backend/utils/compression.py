@@ -0,0 +1,115 @@
+"""
+Negotiated response compression for the Flask services.
+
+Large JSON bodies (full inventory lists, generated recipes) are gzip- or
+brotli-encoded when the client advertises support in Accept-Encoding. Brotli is
+only offered when the optional `brotli` package is installed. Small responses
+are sent as-is, since compressing them costs more than it saves.
+
+On Lambda the adapter returns any Content-Encoded body base64-encoded with
+isBase64Encoded set, so API Gateway hands the compressed bytes to the client.
+"""
+import gzip
+import logging
+import os
+
+from utils.timing import span
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/problem+json")
+
+
+def supported_encodings():
+    """Server preference order"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the content coding for an Accept-Encoding header value, or None for identity.
+
+    Honours q-values (q=0 refuses a coding) and "*"; ties go to the server preference.
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = qualities.get(coding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic for identical bodies
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def init_compression(app, min_size=None):
+    """
+    Compress eligible responses of a Flask app.
+
+    COMPRESS_MIN_SIZE (bytes) overrides the threshold; 0 disables compression.
+    """
+    from flask import request
+
+    if min_size is None:
+        min_size = int(os.environ.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE))
+    if min_size <= 0:
+        logger.info("Response compression disabled")
+        return
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+            return response
+
+        # The representation depends on Accept-Encoding whether or not this one is compressed
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        with span("compress"):
+            compressed = compress(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)  # Also updates Content-Length
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,79 @@
+"""
+Service configuration resolved on first use.
+
+Values come from AWS Secrets Manager when SECRETS_ARN is set (or a local
+SECRETS_FILE standing in for it) and from the environment otherwise (a
+service's .env file locally). Nothing is fetched at
+import time, so loading a handler does no network I/O.
+"""
+import logging
+import os
+
+from utils.secrets import get_secret_value
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JWT_SECRET_KEY = "default_dev_secret_key_CHANGE_ME"
+MOCK_MONGODB_URI = "mock://grocery_assistant"
+
+_warned = set()
+
+
+def load_env_file(service_dir):
+    """Load `<service_dir>/.env` if present (local development)"""
+    env_path = os.path.join(service_dir, '.env')
+    if not os.path.exists(env_path):
+        logger.warning(".env file not found, relying on system environment variables.")
+        return False
+    from dotenv import load_dotenv  # Only needed locally
+    load_dotenv(dotenv_path=env_path)
+    logger.info("Loaded environment variables from .env file")
+    return True
+
+
+def _secret_name():
+    # A local SECRETS_FILE can stand in for Secrets Manager without an ARN
+    return os.environ.get('SECRETS_ARN') or ('local' if os.environ.get('SECRETS_FILE') else None)
+
+
+def _warn_once(message):
+    if message not in _warned:
+        _warned.add(message)
+        logger.warning(message)
+
+
+def _resolve(secret_key, env_key, default=None):
+    """
+    Secrets are cached (and refreshed after their TTL) by the secrets provider,
+    so this is cheap to call on every use and picks up rotated values.
+    """
+    value = None
+    secret_name = _secret_name()
+    if secret_name:
+        value = get_secret_value(secret_name, secret_key)
+        if not value:
+            _warn_once(f"Failed to load '{secret_key}' from secret {secret_name}. Falling back to env var.")
+    if not value:
+        value = os.environ.get(env_key)
+    if not value and default is not None:
+        _warn_once(f"{env_key} not found in Secrets Manager or environment. Using default '{default}'.")
+        value = default
+    return value
+
+
+def get_jwt_secret_key():
+    return _resolve("jwt_secret_key", "JWT_SECRET_KEY", DEFAULT_JWT_SECRET_KEY)
+
+
+def get_mongodb_uri():
+    return _resolve("MONGODB_URI", "MONGODB_URI", MOCK_MONGODB_URI)
+
+
+def get_groq_api_key():
+    return _resolve("GROQ_API_KEY", "GROQ_API_KEY")
+
+
+def configure_jwt_keys(jwt):
+    """Have a JWTManager fetch its signing key on first encode/decode instead of at import"""
+    jwt.encode_key_loader(lambda identity: get_jwt_secret_key())
+    jwt.decode_key_loader(lambda jwt_header, jwt_data: get_jwt_secret_key())
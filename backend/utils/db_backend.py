@@ -0,0 +1,70 @@
+"""
+MongoDB client for a connection URI.
+
+- mongodb://, mongodb+srv://   pymongo's MongoClient
+- mock://<db>                  the JSON-file mock database (backend/mock_data)
+- mock+sqlite:///<path>        the mock database on a SQLite file
+- memory://<db>                the mock database in memory only: no disk I/O,
+                               and nothing outlives the client (tests, benchmarks)
+
+The mock lives in services/utils/mock_db.py, which is not packaged into the
+Lambdas, so it is only imported when a mock URI is used.
+
+When several services run in one process (server.py), share_clients() makes
+them get one client per URI, and with it one connection pool (or in-memory
+store).
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MOCK_SCHEMES = ("mock://", "mock+sqlite://", "memory://")
+
+_shared = None  # URI -> client, once share_clients() has been called
+_lock = threading.Lock()
+
+
+def is_mock_uri(uri):
+    return uri.startswith(MOCK_SCHEMES)
+
+
+def _client_class(uri):
+    if is_mock_uri(uri):
+        try:
+            from services.utils.mock_db import MockMongoClient
+        except ImportError as e:  # Not packaged into the Lambdas
+            raise RuntimeError(f"{uri.split('://', 1)[0]}:// needs the mock database "
+                               "(services/utils/mock_db.py), which only exists in local checkouts") from e
+        logger.info("Using the mock database for %s", uri.split("://", 1)[0])
+        return MockMongoClient
+    from pymongo import MongoClient
+    return MongoClient
+
+
+def create_client(uri, **kwargs):
+    """A client for `uri`; the mock ignores MongoClient options like serverSelectionTimeoutMS"""
+    if _shared is None:
+        return _client_class(uri)(uri, **kwargs)
+    with _lock:
+        client = _shared.get(uri)
+        if client is None:
+            client = _shared[uri] = _client_class(uri)(uri, **kwargs)
+        return client
+
+
+def share_clients():
+    """From now on hand out one client per URI, to every caller in this process"""
+    global _shared
+    with _lock:
+        if _shared is None:
+            _shared = {}
+
+
+def close_shared_clients():
+    with _lock:
+        clients = list((_shared or {}).values())
+        if _shared:
+            _shared.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,155 @@
+"""
+Liveness and readiness for the services' health endpoints.
+
+Liveness (<prefix>/health/live) answers from memory: the process is up and
+Flask is routing requests. It does no I/O, so it is safe to poll as often as
+a load balancer or the frontend likes.
+
+Readiness (<prefix>/health/ready, and <prefix>/health, which the frontend's
+ServiceHealth polls) runs each service's deep checks: MongoDB ping, LLM host
+reachable, secrets loaded. The results are cached for HEALTH_TTL_SECONDS
+(default 15). A stale report is still returned immediately while a background
+thread runs the checks again, so polling never waits on, or multiplies, the
+database and network round trips. Only the first request runs the checks
+inline, each within HEALTH_CHECK_TIMEOUT_MS (default 2000).
+
+The report aggregates the checks: "unhealthy" (503) if a critical check
+failed, "degraded" (200) if only a non-critical one did, else "healthy" (200).
+The endpoints are unauthenticated, so their body holds only the status, the
+service and "ok"/"fail" per check. Timings, errors and details (like a secret
+still on its development default) go to the log.
+"""
+import logging
+import os
+import threading
+import time
+
+from utils.config import DEFAULT_JWT_SECRET_KEY, MOCK_MONGODB_URI
+from utils.warmup import run_with_timeout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_TTL_SECONDS = 15
+DEFAULT_CHECK_TIMEOUT_MS = 2000
+
+STATUS_CODES = {"healthy": 200, "degraded": 200, "unhealthy": 503}
+
+_started = time.monotonic()
+
+
+def liveness(service) -> dict:
+    return {"status": "alive", "service": service, "uptime_s": round(time.monotonic() - _started, 1)}
+
+
+class ReadinessChecks:
+    """
+    A service's (name, callable, critical) readiness checks and their cached report.
+
+    A check passes unless it raises or overruns the timeout; like a warmup step,
+    its return value (if any) is included in the logged report as "detail".
+    """
+
+    def __init__(self, service, checks, ttl=None, timeout_ms=None):
+        self.service = service
+        self.checks = checks
+        self.ttl = ttl if ttl is not None else float(os.environ.get("HEALTH_TTL_SECONDS", DEFAULT_HEALTH_TTL_SECONDS))
+        self.timeout_ms = timeout_ms if timeout_ms is not None else float(
+            os.environ.get("HEALTH_CHECK_TIMEOUT_MS", DEFAULT_CHECK_TIMEOUT_MS))
+        self._cached = None  # (checked_at, report)
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def report(self) -> dict:
+        """The latest report, with its age; runs the checks inline only if there is none yet"""
+        entry = self._cached
+        if entry is None:
+            with self._lock:
+                entry = self._cached
+                if entry is None:
+                    entry = self._cached = (time.monotonic(), self._run())
+        checked_at, report = entry
+        age = time.monotonic() - checked_at
+        if age >= self.ttl:
+            self._refresh_in_background()
+        return {**report, "age_s": round(age, 1)}
+
+    def response(self) -> tuple:
+        """(public body, HTTP status code): the status and "ok"/"fail" per check, nothing else"""
+        report = self.report()
+        body = {
+            "status": report["status"],
+            "service": report["service"],
+            "checks": {name: "ok" if entry["status"] == "ok" else "fail" for name, entry in report["checks"].items()},
+        }
+        return body, STATUS_CODES[report["status"]]
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name=f"readiness-{self.service}", daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            self._cached = (time.monotonic(), self._run())
+        except Exception as e:  # Keep serving the last report
+            logger.error("Readiness refresh failed: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _run(self) -> dict:
+        checks = {}
+        failed_critical = failed_optional = False
+        for name, fn, critical in self.checks:
+            started = time.perf_counter()
+            finished, result, error = run_with_timeout(fn, self.timeout_ms / 1000)
+            entry = {"ms": round((time.perf_counter() - started) * 1000, 1), "critical": critical}
+            if not finished:
+                entry["status"] = "timeout"
+            elif error is not None:
+                entry["status"] = "failed"
+                entry["error"] = str(error)
+            else:
+                entry["status"] = "ok"
+                if result is not None:
+                    entry["detail"] = result
+            if entry["status"] != "ok":
+                if critical:
+                    failed_critical = True
+                else:
+                    failed_optional = True
+            checks[name] = entry
+
+        status = "unhealthy" if failed_critical else "degraded" if failed_optional else "healthy"
+        report = {"status": status, "service": self.service, "checks": checks}
+        if status != "healthy":
+            logger.warning("Readiness %s: %s", status,
+                           ", ".join(f"{name} {entry['status']}" for name, entry in checks.items()
+                                     if entry["status"] != "ok"), extra={"readiness": report})
+        else:
+            logger.debug("Readiness healthy", extra={"readiness": report})
+        return report
+
+
+# --- Checks shared by the services ---
+
+_warned_defaults = set()
+
+def check_secrets(required):
+    """Every {name: getter} resolves to a value (from Secrets Manager, or the environment locally)"""
+    values = {name: getter() for name, getter in required.items()}
+    missing = [name for name, value in values.items() if not value]
+    if missing:
+        raise RuntimeError(f"not configured: {', '.join(missing)}")
+    detail = {"loaded": list(values)}
+    defaults = [name for name, value in values.items() if value in (DEFAULT_JWT_SECRET_KEY, MOCK_MONGODB_URI)]
+    if defaults:
+        detail["development_defaults"] = defaults
+        new = [name for name in defaults if name not in _warned_defaults]
+        if new:
+            # Logged, never returned: a public hint that JWTs are signed with the default key lets anyone forge them
+            _warned_defaults.update(new)
+            logger.warning("Using development defaults for: %s", ", ".join(new))
+    return detail
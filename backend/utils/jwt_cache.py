@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from flask_jwt_extended import JWTManager
+from flask_jwt_extended.config import config
+
+from utils.log import bind_log_context
+from utils.timing import span
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already-verified JWTs.
+
+    Entries are keyed by the SHA-256 digest of the encoded token (the raw token is
+    never stored) and hold the decoded claims, which carry the identity (`sub`) and
+    expiry (`exp`). An entry is only served while the token itself is still valid,
+    so expiry is enforced exactly as PyJWT would enforce it.
+    """
+
+    def __init__(self, maxsize: int = 1024, max_age: int = 900, leeway: int = 0):
+        self.maxsize = maxsize
+        self.max_age = max_age  # Upper bound on how long a verification is trusted
+        self.leeway = leeway
+        self._entries = OrderedDict()  # digest -> (valid_until, claims)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def digest(encoded_token: str) -> bytes:
+        return hashlib.sha256(encoded_token.encode("utf-8")).digest()
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        """Return the cached claims, or None on a miss or if the token has expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            valid_until, claims = entry
+            # PyJWT rejects a token once exp <= now - leeway; never serve it past that point
+            if now >= valid_until:
+                del self._entries[digest]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+        return dict(claims)
+
+    def put(self, digest: bytes, claims: dict) -> None:
+        """Remember a verified token until its expiry (capped by max_age)"""
+        now = time.time()
+        valid_until = now + self.max_age
+        exp = claims.get("exp")
+        if exp is not None:
+            valid_until = min(valid_until, exp + self.leeway)
+        if valid_until <= now:
+            return
+        with self._lock:
+            self._entries[digest] = (valid_until, dict(claims))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit-rate counters for logging and health output"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class CachingJWTManager(JWTManager):
+    """
+    JWTManager that skips signature verification for tokens it has already verified.
+
+    flask_jwt_extended funnels every decode (`@jwt_required()`, `verify_jwt_in_request`,
+    `decode_token`) through `_decode_jwt_from_config`, so caching there keeps all of the
+    library's loaders, callbacks and error handlers intact. Requests carrying a CSRF
+    value or asking for expired tokens always take the full verification path.
+    """
+
+    def __init__(self, app=None, cache: Optional[VerifiedTokenCache] = None, **kwargs):
+        self.cache = cache or VerifiedTokenCache()
+        super().__init__(app, **kwargs)
+
+    def init_app(self, app, *args, **kwargs):
+        super().init_app(app, *args, **kwargs)
+        # Match the cache leeway to the one used for verification
+        leeway = app.config.get("JWT_DECODE_LEEWAY", 0)
+        self.cache.leeway = int(leeway.total_seconds()) if hasattr(leeway, "total_seconds") else int(leeway)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        with span("jwt"):
+            digest = self.cache.digest(encoded_token)
+            claims = self.cache.get(digest)
+            if claims is None:
+                # Full decode; raises (and is not cached) on bad signature, expiry, etc.
+                claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+                self.cache.put(digest, claims)
+        # Tag the rest of this request's log records with the caller
+        bind_log_context(user_id=claims.get(config.identity_claim_key))
+        return claims
@@ -0,0 +1,205 @@
+"""
+Shared API Gateway -> WSGI adapter for the service lambda_handlers.
+
+Builds the WSGI environ straight from the proxy event (no werkzeug.test
+EnvironBuilder, no JSON decode/re-encode of the body), runs the Flask app as a
+plain WSGI callable and maps the result back to a proxy response in one pass.
+
+Both proxy payload formats are handled natively:
+- 1.0: REST APIs (httpMethod, path, multiValueHeaders, ...)
+- 2.0: HTTP APIs and Lambda function URLs (rawPath, rawQueryString, cookies,
+  requestContext.http); the response uses the 2.0 shape with a cookies array
+"""
+import base64
+import io
+import sys
+from urllib.parse import urlencode
+
+# Response content types that can be returned to API Gateway as text
+TEXT_CONTENT_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/problem+json")
+
+
+def is_http_api_v2_event(event) -> bool:
+    """True for an HTTP API or function URL (payload format 2.0) event"""
+    return isinstance(event, dict) and event.get("version") == "2.0" and "http" in (event.get("requestContext") or {})
+
+
+def is_api_gateway_event(event) -> bool:
+    """True for a REST API (payload v1) or HTTP API / function URL (payload v2) proxy event"""
+    return isinstance(event, dict) and ("httpMethod" in event or is_http_api_v2_event(event))
+
+
+def event_method_and_path(event):
+    """(method, path) of a proxy event in either payload format, e.g. for logging"""
+    if "httpMethod" in event:
+        return event.get("httpMethod"), event.get("path")
+    http = (event.get("requestContext") or {}).get("http") or {}
+    return http.get("method"), event.get("rawPath") or http.get("path")
+
+
+def _event_body(event) -> bytes:
+    body = event.get("body")
+    if not body:
+        return b""
+    if event.get("isBase64Encoded"):
+        return base64.b64decode(body)
+    if isinstance(body, bytes):
+        return body
+    return body.encode("utf-8")
+
+
+def _query_string(event) -> str:
+    multi = event.get("multiValueQueryStringParameters")
+    if multi:
+        return urlencode(multi, doseq=True)
+    params = event.get("queryStringParameters")
+    if params:
+        return urlencode(params)
+    return ""
+
+
+def _wsgi_str(value: str) -> str:
+    """PEP 3333 "native strings": unicode text carried as latin-1 decoded bytes"""
+    return value.encode("utf-8").decode("latin-1")
+
+
+def _v1_request(event):
+    """(method, script_name, path, query_string, headers, source_ip) of a payload 1.0 event"""
+    multi_headers = event.get("multiValueHeaders")
+    if multi_headers:
+        # Repeated headers fold into one with ","; Cookie is the exception, its pairs are separated by "; "
+        headers = {key: ("; " if key.lower() == "cookie" else ",").join(values)
+                   for key, values in multi_headers.items() if values is not None}
+    else:
+        headers = event.get("headers") or {}
+
+    path = event.get("path") or "/"
+    for param, value in (event.get("pathParameters") or {}).items():
+        path = path.replace(f"{{{param}}}", value)
+
+    request_context = event.get("requestContext") or {}
+    source_ip = (request_context.get("identity") or {}).get("sourceIp") or "127.0.0.1"
+    return event.get("httpMethod", "GET"), "", path, _query_string(event), headers, source_ip
+
+
+def _v2_request(event):
+    """(method, script_name, path, query_string, headers, source_ip) of a payload 2.0 event"""
+    request_context = event.get("requestContext") or {}
+    http = request_context.get("http") or {}
+    headers = event.get("headers") or {}
+    cookies = event.get("cookies")
+    if cookies:
+        # v2 moves Cookie headers into their own array
+        headers = dict(headers)
+        headers["cookie"] = "; ".join(cookies)
+
+    # HTTP APIs with a named stage include it in rawPath; function URLs and $default do not
+    path = event.get("rawPath") or http.get("path") or "/"
+    script_name = ""
+    stage = request_context.get("stage")
+    if stage and stage != "$default" and path.startswith(f"/{stage}/"):
+        script_name, path = f"/{stage}", path[len(stage) + 1:]
+    return (http.get("method", "GET"), script_name, path, event.get("rawQueryString") or "",
+            headers, http.get("sourceIp") or "127.0.0.1")
+
+
+def build_environ(event, context=None) -> dict:
+    """Create a WSGI environ directly from an API Gateway / function URL proxy event"""
+    body = _event_body(event)
+    if "httpMethod" in event:
+        method, script_name, path, query_string, headers, source_ip = _v1_request(event)
+    else:
+        method, script_name, path, query_string, headers, source_ip = _v2_request(event)
+
+    environ = {
+        "REQUEST_METHOD": method.upper(),
+        "SCRIPT_NAME": _wsgi_str(script_name),
+        "PATH_INFO": _wsgi_str(path),
+        "QUERY_STRING": query_string,
+        "SERVER_NAME": "lambda",
+        "SERVER_PORT": "443",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": source_ip,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "https",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "lambda.event": event,
+        "lambda.context": context,
+    }
+
+    for key, value in headers.items():
+        name = key.upper().replace("-", "_")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            continue  # Always derived from the decoded body
+        elif name == "HOST":
+            environ["HTTP_HOST"] = environ["SERVER_NAME"] = value
+        else:
+            environ[f"HTTP_{name}"] = _wsgi_str(value) if isinstance(value, str) else str(value)
+            if name == "X_FORWARDED_PROTO":
+                environ["wsgi.url_scheme"] = value
+            elif name == "X_FORWARDED_PORT":
+                environ["SERVER_PORT"] = value
+    return environ
+
+
+def _is_text(content_type: str) -> bool:
+    return content_type.startswith(TEXT_CONTENT_TYPES)
+
+
+def build_response(status: str, response_headers, body: bytes, payload_version: str = "1.0") -> dict:
+    """Map a WSGI status line, header list and body to a proxy response in the given payload format"""
+    headers = {}
+    cookies = []
+    content_type = ""
+    for key, value in response_headers:
+        lower = key.lower()
+        if lower == "set-cookie":
+            cookies.append(value)
+            continue
+        # Other repeated headers collapse to the last value (e.g. CORS headers set twice)
+        headers[key] = value
+        if lower == "content-type":
+            content_type = value
+
+    result = {"statusCode": int(status.split(" ", 1)[0]), "headers": headers}
+    if cookies:
+        if payload_version == "2.0":
+            result["cookies"] = cookies
+        else:
+            # Repeated Set-Cookie headers only survive through multiValueHeaders
+            result["multiValueHeaders"] = {"Set-Cookie": cookies}
+
+    if _is_text(content_type) and not headers.get("Content-Encoding"):
+        result["body"] = body.decode("utf-8")
+        result["isBase64Encoded"] = False
+    else:
+        result["body"] = base64.b64encode(body).decode("ascii")
+        result["isBase64Encoded"] = True
+    return result
+
+
+def handle_api_gateway_event(app, event, context=None) -> dict:
+    """Run a WSGI app (e.g. a Flask app) for an API Gateway proxy event"""
+    environ = build_environ(event, context)
+    captured = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        captured["status"] = status
+        captured["headers"] = response_headers
+
+    chunks = app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    payload_version = "1.0" if "httpMethod" in event else "2.0"
+    return build_response(captured["status"], captured["headers"], body, payload_version)
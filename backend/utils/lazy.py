@@ -0,0 +1,53 @@
+import logging
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class LazyResource:
+    """
+    A client or connection that is created on first use instead of at import time.
+
+    If creation fails the error is logged and None is returned; another attempt is
+    made once `retry_after` seconds have passed, so one bad cold start does not
+    leave a warm container permanently without its database.
+    """
+
+    def __init__(self, factory, name, retry_after=30):
+        self.factory = factory
+        self.name = name
+        self.retry_after = retry_after
+        self._value = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self):
+        return self._value is not None
+
+    def get(self):
+        if self._value is not None:
+            return self._value
+        with self._lock:
+            if self._value is not None:
+                return self._value
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                return None
+            try:
+                logger.info("Initializing %s...", self.name)
+                self._value = self.factory()
+                self._failed_at = None
+                logger.info("%s initialized successfully.", self.name)
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                logger.error("Failed to initialize %s: %s", self.name, e)
+                logger.error(traceback.format_exc())
+            return self._value
+
+    def reset(self):
+        """Drop the cached value so the next get() creates it again"""
+        with self._lock:
+            self._value = None
+            self._failed_at = None
@@ -0,0 +1,240 @@
+"""
+Structured logging shared by the services.
+
+- JSON lines (LOG_FORMAT=text for plain local output), one object per record
+- Messages use %-style arguments, so nothing is formatted unless a record is emitted
+- Request-scoped context (request id, route, user id) is attached to every record
+- Per-route sampling of DEBUG/INFO records; warnings and errors are always kept
+- Helpers to redact credentials from headers/events and to truncate large payloads
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+import traceback
+import uuid
+
+from utils.lambda_adapter import is_api_gateway_event, event_method_and_path
+
+# Header names (lower case) whose values never reach the logs
+REDACTED_HEADERS = frozenset({
+    "authorization", "cookie", "set-cookie", "x-api-key", "x-amz-security-token", "proxy-authorization",
+})
+REDACTED = "[REDACTED]"
+
+_log_context = contextvars.ContextVar("log_context", default=None)
+
+_STANDARD_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get_log_context() -> dict:
+    return _log_context.get() or {}
+
+
+def bind_log_context(**fields):
+    """Add fields (e.g. user_id) to the current request's log context"""
+    context = dict(get_log_context())
+    context.update({key: value for key, value in fields.items() if value is not None})
+    _log_context.set(context)
+
+
+def clear_log_context():
+    _log_context.set(None)
+
+
+class ContextFilter(logging.Filter):
+    """Attaches the request context to records and drops unsampled low-level records"""
+
+    def filter(self, record):
+        context = get_log_context()
+        if context:
+            if record.levelno < logging.WARNING and not context.get("sampled", True):
+                return False
+            record.log_context = context
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders a record (message formatted lazily, plus context and `extra` fields) as one JSON line"""
+
+    def __init__(self, service=None):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if self.service:
+            entry["service"] = self.service
+        for key, value in getattr(record, "log_context", {}).items():
+            if key != "sampled":
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS and key != "log_context" and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain single-line output for local development, with the request context appended"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        context = {key: value for key, value in getattr(record, "log_context", {}).items() if key != "sampled"}
+        if context:
+            line += " " + " ".join(f"{key}={value}" for key, value in context.items())
+        return line
+
+
+_configured_service = None
+
+
+def configure_logging(service=None, level=None, fmt=None):
+    """
+    Install the structured formatter and context filter on the root logger.
+
+    On Lambda the runtime has already attached a handler to the root logger, so
+    that handler is reused instead of adding a second one.
+    LOG_LEVEL and LOG_FORMAT (json|text) override the defaults. The first service
+    to configure logging in a process owns it, so a service loaded in-process by
+    another one (see utils.service_client) does not relabel its records.
+    """
+    global _configured_service
+    if _configured_service is not None and service != _configured_service:
+        return
+    _configured_service = service
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "json")).lower()
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    formatter = TextFormatter() if fmt == "text" else JsonFormatter(service)
+    for handler in root.handlers:
+        handler.setFormatter(formatter)
+        if not any(isinstance(f, ContextFilter) for f in handler.filters):
+            handler.addFilter(ContextFilter())
+
+
+def _load_sample_rates():
+    """LOG_SAMPLE_RATES is JSON mapping a route rule (e.g. "/inventory/health") to a 0..1 rate"""
+    raw = os.environ.get("LOG_SAMPLE_RATES")
+    if not raw:
+        return {}
+    try:
+        return {route: float(rate) for route, rate in json.loads(raw).items()}
+    except (ValueError, AttributeError):
+        logging.getLogger(__name__).warning("Ignoring invalid LOG_SAMPLE_RATES: %s", raw)
+        return {}
+
+
+_sample_rates = {}
+
+
+def _is_sampled(route):
+    rate = _sample_rates.get(route, _sample_rates.get("default", 1.0))
+    return rate >= 1.0 or random.random() < rate
+
+
+def init_request_logging(app, sample_rates=None):
+    """
+    Bind a request id, route and sampling decision for every Flask request.
+
+    The request id comes from the Lambda context when running behind the adapter,
+    then from an X-Request-Id header, otherwise a new one is generated. The sampling
+    decision is made once per request, so a request is logged completely or not at all.
+    """
+    from flask import request
+
+    # Code defaults first, so LOG_SAMPLE_RATES can override them per deployment
+    _sample_rates.update(sample_rates or {})
+    _sample_rates.update(_load_sample_rates())
+
+    @app.before_request
+    def _bind_request_log_context():
+        context = get_log_context()
+        lambda_context = request.environ.get("lambda.context")
+        request_id = (context.get("request_id")
+                      or getattr(lambda_context, "aws_request_id", None)
+                      or request.headers.get("X-Request-Id")
+                      or uuid.uuid4().hex)
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        sampled = context["sampled"] if "sampled" in context else _is_sampled(route)
+        bind_log_context(request_id=request_id, route=route, method=request.method, sampled=sampled)
+
+    @app.teardown_request
+    def _clear_request_log_context(exc=None):
+        clear_log_context()
+
+
+def redact_headers(headers):
+    if not headers:
+        return headers
+    return {key: REDACTED if key.lower() in REDACTED_HEADERS else value for key, value in headers.items()}
+
+
+def redact_event(event):
+    """Copy of an API Gateway (v1 or v2) event with credentials and the body removed"""
+    if not isinstance(event, dict):
+        return event
+    redacted = dict(event)
+    if "headers" in redacted:
+        redacted["headers"] = redact_headers(redacted["headers"])
+    if redacted.get("multiValueHeaders"):
+        redacted["multiValueHeaders"] = {
+            key: [REDACTED] if key.lower() in REDACTED_HEADERS else value
+            for key, value in redacted["multiValueHeaders"].items()
+        }
+    if redacted.get("cookies"):
+        redacted["cookies"] = [REDACTED]
+    if redacted.get("body"):
+        redacted["body"] = f"<{len(redacted['body'])} bytes>"
+    return redacted
+
+
+def log_event(logger, event, context=None):
+    """
+    Log an incoming Lambda event: a one-line summary at INFO and the redacted
+    event at DEBUG, serialized only when DEBUG is enabled.
+    """
+    clear_log_context()
+    method = path = None
+    if is_api_gateway_event(event):
+        method, path = event_method_and_path(event)
+    bind_log_context(request_id=getattr(context, "aws_request_id", None), sampled=_is_sampled(path))
+    if not isinstance(event, dict):
+        logger.info("Event of type %s", type(event).__name__)
+        return
+    logger.info("Event %s %s", method or event.get("source") or "direct", path or "")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Event detail", extra={"event": redact_event(event)})
+
+
+class truncate:
+    """
+    Shortens large values (LLM output, upstream bodies) for logging. The value is
+    only converted and cut when the record is actually emitted.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit=200):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... <{len(text) - self.limit} more chars>"
@@ -0,0 +1,54 @@
+"""
+Importing a service's own modules when several services share one process.
+
+Every service has a handler.py, and auth and inventory both have a
+database.py. On Lambda each runs alone and plain imports are fine; in a
+single process (server.py, in-process service calls, benchmarks) only one of
+them can own the plain module name, so the others are given a name of their
+own, derived from their directory (e.g. "inventory_service_database").
+"""
+import importlib.util
+import os
+import sys
+import threading
+
+_lock = threading.RLock()
+
+
+def load_module_from(path, name):
+    """Import the file at `path` as module `name` (reusing it if already imported)"""
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            del sys.modules[name]
+            raise
+        return module
+
+
+def _same_file(module, path):
+    module_file = getattr(module, "__file__", None)
+    return module_file is not None and os.path.abspath(module_file) == path
+
+
+def import_sibling(anchor, module):
+    """
+    Import <module>.py from the directory of `anchor` (the caller's __file__).
+
+    The plain module name is used when it is free or already refers to that
+    file, so `import database` elsewhere sees the same module; otherwise the
+    module is imported as "<directory>_<module>".
+    """
+    directory = os.path.dirname(os.path.abspath(anchor))
+    path = os.path.join(directory, f"{module}.py")
+    with _lock:
+        existing = sys.modules.get(module)
+        if existing is None or _same_file(existing, path):
+            return load_module_from(path, module)
+        return load_module_from(path, f"{os.path.basename(directory)}_{module}")
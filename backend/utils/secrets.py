@@ -1,16 +1,230 @@
 import os
 import json
 import logging
-import boto3
+import threading
+import time
 import traceback
+from abc import ABC, abstractmethod
 from typing import Union
 
 logger = logging.getLogger(__name__)
 
+# How long a fetched secret is served before it is refreshed (in the background)
+DEFAULT_SECRETS_TTL_SECONDS = 3600
+# How long a failed fetch is remembered before the secret is tried again
+DEFAULT_SECRETS_MISS_TTL_SECONDS = 60
+
+
+class SecretsProvider(ABC):
+    """
+    Fetches each secret once, keeps the parsed JSON dict and refreshes it after a TTL.
+
+    A stale secret is still returned immediately while a background thread fetches
+    the new version, so rotation is picked up without putting a Secrets Manager
+    round trip on the request path. If a refresh fails the last good value is kept.
+    A secret that could not be loaded at all is not tried again for `miss_ttl`
+    seconds, so callers falling back to the environment don't each pay for (and
+    log) another failed fetch.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SECRETS_TTL_SECONDS, miss_ttl: float = DEFAULT_SECRETS_MISS_TTL_SECONDS):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._cache = {}  # secret_name -> (fetched_at, secret_dict)
+        self._misses = {}  # secret_name -> failed_at
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _fetch(self, secret_name: str) -> Union[dict, None]:
+        """Load and parse one secret from the backing store; None if it could not be loaded"""
+
+    def get_secret(self, secret_name: str) -> Union[dict, None]:
+        """Returns the whole secret as a dict, or None if it could not be loaded"""
+        entry = self._cache.get(secret_name)
+        if entry is None:
+            if self._missed_recently(secret_name):
+                return None
+            with self._lock:
+                entry = self._cache.get(secret_name)
+                if entry is None:
+                    if self._missed_recently(secret_name):
+                        return None
+                    secret_dict = self._fetch_or_none(secret_name)
+                    if secret_dict is None:
+                        self._misses[secret_name] = time.monotonic()
+                        logger.warning("Secret '%s' unavailable; not retrying for %ss.", secret_name, self.miss_ttl)
+                        return None
+                    self._misses.pop(secret_name, None)
+                    entry = (time.monotonic(), secret_dict)
+                    self._cache[secret_name] = entry
+        fetched_at, secret_dict = entry
+        if time.monotonic() - fetched_at >= self.ttl:
+            self._refresh_in_background(secret_name)
+        return secret_dict
+
+    def _fetch_or_none(self, secret_name: str) -> Union[dict, None]:
+        try:
+            return self._fetch(secret_name)
+        except Exception as e:
+            logger.error("Fetching secret '%s' failed: %s", secret_name, e)
+            return None
+
+    def _missed_recently(self, secret_name: str) -> bool:
+        failed_at = self._misses.get(secret_name)
+        return failed_at is not None and time.monotonic() - failed_at < self.miss_ttl
+
+    def _refresh_in_background(self, secret_name: str) -> None:
+        with self._lock:
+            if secret_name in self._refreshing:
+                return
+            self._refreshing.add(secret_name)
+        threading.Thread(target=self._refresh, args=(secret_name,), daemon=True).start()
+
+    def _refresh(self, secret_name: str) -> None:
+        try:
+            secret_dict = self._fetch_or_none(secret_name)
+            if secret_dict is not None:
+                self._cache[secret_name] = (time.monotonic(), secret_dict)
+                logger.info("Refreshed secret '%s'.", secret_name)
+            else:
+                logger.warning("Refresh of secret '%s' failed, keeping the cached value.", secret_name)
+        finally:
+            with self._lock:
+                self._refreshing.discard(secret_name)
+
+    def invalidate(self, secret_name: str = None) -> None:
+        """Forget one (or every) cached secret so the next access fetches it again"""
+        with self._lock:
+            if secret_name is None:
+                self._cache.clear()
+                self._misses.clear()
+            else:
+                self._cache.pop(secret_name, None)
+                self._misses.pop(secret_name, None)
+
+
+class AwsSecretsProvider(SecretsProvider):
+    """AWS Secrets Manager, with one client reused for the lifetime of the container"""
+
+    def __init__(self, region_name: str, ttl: float = DEFAULT_SECRETS_TTL_SECONDS,
+                 miss_ttl: float = DEFAULT_SECRETS_MISS_TTL_SECONDS):
+        super().__init__(ttl, miss_ttl)
+        self.region_name = region_name
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3  # Deferred so importing this module stays cheap on cold start
+            self._client = boto3.session.Session().client(service_name='secretsmanager', region_name=self.region_name)
+        return self._client
+
+    def _fetch(self, secret_name: str) -> Union[dict, None]:
+        client = self.client
+        logger.info("Attempting to retrieve secret '%s' from region '%s'", secret_name, self.region_name)
+        try:
+            get_secret_value_response = client.get_secret_value(SecretId=secret_name)
+
+            if 'SecretString' not in get_secret_value_response:
+                # Handle binary secrets if necessary
+                logger.warning("Secret '%s' is binary, not handled by this function.", secret_name)
+                return None
+            try:
+                secret_dict = json.loads(get_secret_value_response['SecretString'])
+            except json.JSONDecodeError:
+                logger.error("SecretString for '%s' is not valid JSON.", secret_name)
+                return None
+            logger.info("Successfully retrieved secret '%s'.", secret_name)
+            return secret_dict
+
+        except client.exceptions.ResourceNotFoundException:
+            logger.error("Secret '%s' not found in Secrets Manager.", secret_name)
+            return None
+        except client.exceptions.InvalidParameterException as e:
+            logger.error("Invalid parameter error retrieving secret '%s': %s", secret_name, e)
+            return None
+        except client.exceptions.InvalidRequestException as e:
+            logger.error("Invalid request error retrieving secret '%s': %s", secret_name, e)
+            return None
+        except client.exceptions.DecryptionFailure as e:
+            logger.error("Decryption failure retrieving secret '%s': %s", secret_name, e)
+            return None
+        except client.exceptions.InternalServiceError as e:
+            logger.error("Internal service error retrieving secret '%s': %s", secret_name, e)
+            return None
+        except Exception as e:
+            logger.error("An unexpected error occurred retrieving secret '%s': %s", secret_name, e)
+            logger.error(traceback.format_exc())
+            return None
+
+
+class FileSecretsProvider(SecretsProvider):
+    """
+    Local stand-in for Secrets Manager, for offline development and tests.
+
+    The file is either a single secret ({"jwt_secret_key": "...", "MONGODB_URI": "..."})
+    or a mapping of secret names/ARNs to secret objects. Edits are picked up after the TTL.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_SECRETS_TTL_SECONDS,
+                 miss_ttl: float = DEFAULT_SECRETS_MISS_TTL_SECONDS):
+        super().__init__(ttl, miss_ttl)
+        self.path = path
+
+    def _fetch(self, secret_name: str) -> Union[dict, None]:
+        try:
+            with open(self.path, 'r') as f:
+                secrets_file = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error("Could not read secrets file '%s': %s", self.path, e)
+            return None
+        if isinstance(secrets_file.get(secret_name), dict):
+            return secrets_file[secret_name]
+        return secrets_file
+
+
+_provider = None
+_provider_lock = threading.Lock()
+_missing_keys = set()
+
+
+def get_secrets_provider() -> Union[SecretsProvider, None]:
+    """
+    The container-wide provider: SECRETS_FILE selects the local file backend,
+    otherwise Secrets Manager in AWS_REGION. Returns None if neither is configured.
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                ttl = float(os.environ.get("SECRETS_TTL_SECONDS", DEFAULT_SECRETS_TTL_SECONDS))
+                miss_ttl = float(os.environ.get("SECRETS_MISS_TTL_SECONDS", DEFAULT_SECRETS_MISS_TTL_SECONDS))
+                secrets_file = os.environ.get("SECRETS_FILE")
+                region_name = os.environ.get("AWS_REGION")
+                if secrets_file:
+                    logger.info("Using local secrets file '%s'", secrets_file)
+                    _provider = FileSecretsProvider(secrets_file, ttl, miss_ttl)
+                elif region_name:
+                    _provider = AwsSecretsProvider(region_name, ttl, miss_ttl)
+                else:
+                    logger.error("AWS_REGION environment variable not set. Cannot fetch secret.")
+    return _provider
+
+
+def set_secrets_provider(provider: Union[SecretsProvider, None]) -> None:
+    """Replace the container-wide provider (e.g. with a FileSecretsProvider in tests)"""
+    global _provider
+    _provider = provider
+
+
 def get_secret_value(secret_name: str, secret_key: str) -> Union[str, None]:
     """
     Retrieves a specific key's value from a secret stored in AWS Secrets Manager.
 
+    The secret is fetched and parsed once per container and served from cache
+    for every key afterwards.
+
     Args:
         secret_name: The name or ARN of the secret in Secrets Manager.
         secret_key: The specific key within the secret JSON to retrieve.
@@ -18,56 +232,18 @@ def get_secret_value(secret_name: str, secret_key: str) -> Union[str, None]:
     Returns:
         The value of the secret_key if found, otherwise None.
     """
-    region_name = os.environ.get("AWS_REGION")
-    if not region_name:
-        logger.error("AWS_REGION environment variable not set. Cannot fetch secret.")
+    provider = get_secrets_provider()
+    if provider is None:
         return None
 
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
-
-    logger.info(f"Attempting to retrieve secret '{secret_name}' for key '{secret_key}' from region '{region_name}'")
-
-    try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-        
-        if 'SecretString' in get_secret_value_response:
-            secret_string = get_secret_value_response['SecretString']
-            try:
-                secret_dict = json.loads(secret_string)
-                key_value = secret_dict.get(secret_key)
-                if key_value:
-                    logger.info(f"Successfully retrieved key '{secret_key}' from secret '{secret_name}'.")
-                    return key_value
-                else:
-                    logger.error(f"Key '{secret_key}' not found within secret JSON for '{secret_name}'.")
-                    return None
-            except json.JSONDecodeError:
-                logger.error(f"SecretString for '{secret_name}' is not valid JSON.")
-                # Optionally, handle non-JSON secrets if needed, e.g., if the secret *is* the JWT key directly
-                # if secret_key == "jwt_secret_key": return secret_string 
-                return None
-        else:
-            # Handle binary secrets if necessary
-            logger.warning(f"Secret '{secret_name}' is binary, not handled by this function.")
-            return None
-            
-    except client.exceptions.ResourceNotFoundException:
-        logger.error(f"Secret '{secret_name}' not found in Secrets Manager.")
+    secret_dict = provider.get_secret(secret_name)
+    if secret_dict is None:
         return None
-    except client.exceptions.InvalidParameterException as e:
-        logger.error(f"Invalid parameter error retrieving secret '{secret_name}': {str(e)}")
-        return None
-    except client.exceptions.InvalidRequestException as e:
-         logger.error(f"Invalid request error retrieving secret '{secret_name}': {str(e)}")
-         return None
-    except client.exceptions.DecryptionFailure as e:
-        logger.error(f"Decryption failure retrieving secret '{secret_name}': {str(e)}")
-        return None
-    except client.exceptions.InternalServiceError as e:
-        logger.error(f"Internal service error retrieving secret '{secret_name}': {str(e)}")
+
+    key_value = secret_dict.get(secret_key)
+    if not key_value:
+        if (secret_name, secret_key) not in _missing_keys:  # Once, not on every lookup
+            _missing_keys.add((secret_name, secret_key))
+            logger.error("Key '%s' not found within secret JSON for '%s'.", secret_key, secret_name)
         return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred retrieving secret '{secret_name}': {str(e)}")
-        logger.error(traceback.format_exc())
-        return None 
\ No newline at end of file
+    return key_value
@@ -0,0 +1,293 @@
+"""
+Calls from one service to another (today: inventory -> recipe food prediction).
+
+The caller names an operation and passes a JSON-able payload; a transport
+decides how it travels:
+
+- LambdaTransport: direct Lambda invoke through a per-container cached boto3
+  client with short connect/read timeouts
+- HttpTransport: JSON over HTTP to the target's Flask routes (run-local.py)
+- InProcessTransport: calls the target service's function directly when both
+  services run in one process
+
+Every transport supports call() (wait for the result) and send()
+(fire-and-forget: an Event invoke on Lambda, a background thread otherwise).
+
+ServiceClient.from_env("recipe") picks the transport from RECIPE_TRANSPORT
+(lambda|http|inprocess|none). Without it, RECIPE_LAMBDA_NAME selects Lambda,
+then RECIPE_SERVICE_URL selects HTTP, otherwise calls are disabled.
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.modules import load_module_from
+from utils.timing import span
+
+logger = logging.getLogger(__name__)
+
+backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CONNECT_TIMEOUT = 1.0
+# Predictions wait on the LLM, so reads get a few seconds
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_MAX_ATTEMPTS = 2
+
+# How each operation is reached over HTTP and in-process.
+# Over Lambda the payload is wrapped as {"operation": ..., "body": "<json>"}.
+OPERATIONS = {
+    "recipe": {
+        "predict_food_info": {
+            "http": ("POST", "/recipes/predict_food_info"),
+            "function": "_handle_prediction",
+            "args": ("item_name",),
+        },
+    },
+}
+
+
+class ServiceCallError(Exception):
+    """The target service could not be reached or failed to produce a response"""
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def _submit(fn, callback=None):
+    """Run fn on the shared background pool; callback(result) is called on success"""
+    global _background
+    if _background is None:
+        with _background_lock:
+            if _background is None:
+                _background = ThreadPoolExecutor(max_workers=4, thread_name_prefix="service-send")
+
+    def run():
+        try:
+            result = fn()
+        except Exception as e:
+            logger.error("Background service call failed: %s", e)
+            return
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception as e:
+                logger.error("Background service call callback failed: %s", e)
+
+    return _background.submit(run)
+
+
+# --- Lambda ---
+
+_lambda_clients = {}
+_lambda_clients_lock = threading.Lock()
+
+
+def get_lambda_client(connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                      max_attempts=DEFAULT_MAX_ATTEMPTS, endpoint_url=None):
+    """One boto3 Lambda client per configuration, reused for the lifetime of the container"""
+    key = (connect_timeout, read_timeout, max_attempts, endpoint_url)
+    client = _lambda_clients.get(key)
+    if client is None:
+        with _lambda_clients_lock:
+            client = _lambda_clients.get(key)
+            if client is None:
+                import boto3  # Deferred so importing this module stays cheap on cold start
+                from botocore.config import Config
+
+                config = Config(
+                    connect_timeout=connect_timeout,
+                    read_timeout=read_timeout,
+                    retries={"max_attempts": max_attempts, "mode": "standard"},
+                    tcp_keepalive=True,
+                )
+                client = boto3.client("lambda", config=config, endpoint_url=endpoint_url)
+                _lambda_clients[key] = client
+    return client
+
+
+class LambdaTransport:
+    name = "lambda"
+
+    def __init__(self, function_name, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS, endpoint_url=None):
+        self.function_name = function_name
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+        self.endpoint_url = endpoint_url
+
+    @property
+    def client(self):
+        return get_lambda_client(self.connect_timeout, self.read_timeout, self.max_attempts, self.endpoint_url)
+
+    def _invoke(self, operation, payload, invocation_type):
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        # The target's lambda_handler reads the operation's payload from "body", like a proxy event
+        event = {"operation": operation, "body": json.dumps(payload)}
+        try:
+            return self.client.invoke(
+                FunctionName=self.function_name,
+                InvocationType=invocation_type,
+                Payload=json.dumps(event),
+            )
+        except (BotoCoreError, ClientError) as e:
+            raise ServiceCallError(f"Invoking {self.function_name} failed: {e}") from e
+
+    def call(self, operation, payload):
+        response = self._invoke(operation, payload, "RequestResponse")
+        body = response["Payload"].read().decode("utf-8") if "Payload" in response else ""
+        if response.get("StatusCode") != 200 or response.get("FunctionError"):
+            raise ServiceCallError(f"{self.function_name} returned {response.get('StatusCode')} "
+                                   f"({response.get('FunctionError')}): {body[:200]}")
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ServiceCallError(f"{self.function_name} returned invalid JSON") from e
+
+    def send(self, operation, payload, callback=None):
+        """Event invoke: Lambda queues it and returns 202; there is no result to pass to a callback"""
+        if callback is not None:
+            logger.warning("Lambda Event invocations return no result; the callback for %s is ignored", operation)
+        response = self._invoke(operation, payload, "Event")
+        if response.get("StatusCode") != 202:
+            raise ServiceCallError(f"Event invoke of {self.function_name} returned {response.get('StatusCode')}")
+
+
+# --- HTTP ---
+
+class HttpTransport:
+    name = "http"
+
+    def __init__(self, service, base_url, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.service = service
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests  # Only needed when this transport is used
+            session = requests.Session()
+            # One pooled connection per concurrent caller (threaded servers raise HTTP_POOL_SIZE)
+            pool_size = int(os.environ.get("HTTP_POOL_SIZE", 10))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def call(self, operation, payload):
+        import requests
+
+        method, path = OPERATIONS[self.service][operation]["http"]
+        try:
+            response = self.session.request(method, self.base_url + path, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ServiceCallError(f"{method} {path} failed: {e}") from e
+        try:
+            # The services answer errors with a JSON body too, so the caller can inspect "success"
+            return response.json()
+        except ValueError as e:
+            raise ServiceCallError(f"{method} {path} returned {response.status_code} without JSON") from e
+
+    def send(self, operation, payload, callback=None):
+        _submit(lambda: self.call(operation, payload), callback)
+
+
+# --- In-process ---
+
+def load_service_module(service, module="handler"):
+    """
+    Import services/<service>_service/<module>.py under a name of its own.
+
+    Every service has a handler.py, so they cannot all be imported as "handler"
+    in one process; this gives each one a distinct entry in sys.modules.
+    """
+    service_dir = os.path.join(backend_root, "services", f"{service}_service")
+    return load_module_from(os.path.join(service_dir, f"{module}.py"), f"{service}_service_{module}")
+
+
+class InProcessTransport:
+    name = "inprocess"
+
+    def __init__(self, service, module=None):
+        self.service = service
+        self._module = module
+
+    @property
+    def module(self):
+        if self._module is None:
+            self._module = load_service_module(self.service)
+        return self._module
+
+    def call(self, operation, payload):
+        spec = OPERATIONS[self.service][operation]
+        function = getattr(self.module, spec["function"])
+        try:
+            return function(*(payload.get(arg) for arg in spec["args"]))
+        except Exception as e:
+            raise ServiceCallError(f"{self.service}.{spec['function']} failed: {e}") from e
+
+    def send(self, operation, payload, callback=None):
+        _submit(lambda: self.call(operation, payload), callback)
+
+
+class ServiceClient:
+    """Calls the operations of one target service over the configured transport"""
+
+    def __init__(self, service, transport=None):
+        self.service = service
+        self.transport = transport
+
+    @property
+    def enabled(self):
+        return self.transport is not None
+
+    @classmethod
+    def from_env(cls, service):
+        prefix = service.upper()
+        env = os.environ
+        connect_timeout = float(env.get(f"{prefix}_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+        read_timeout = float(env.get(f"{prefix}_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+        function_name = env.get(f"{prefix}_LAMBDA_NAME")
+        base_url = env.get(f"{prefix}_SERVICE_URL")
+
+        kind = env.get(f"{prefix}_TRANSPORT", "").lower()
+        if not kind:
+            kind = "lambda" if function_name else "http" if base_url else "none"
+
+        transport = None
+        if kind == "lambda" and function_name:
+            transport = LambdaTransport(function_name, connect_timeout, read_timeout,
+                                        int(env.get(f"{prefix}_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+                                        env.get(f"{prefix}_LAMBDA_ENDPOINT_URL"))
+        elif kind == "http" and base_url:
+            transport = HttpTransport(service, base_url, connect_timeout, read_timeout)
+        elif kind == "inprocess":
+            transport = InProcessTransport(service)
+        elif kind != "none":
+            logger.warning("%s_TRANSPORT=%s is missing its settings; %s calls are disabled", prefix, kind, service)
+
+        logger.info("%s service client: %s", service, transport.name if transport else "disabled")
+        return cls(service, transport)
+
+    def call(self, operation, payload):
+        """Invoke and wait for the result. Raises ServiceCallError."""
+        if self.transport is None:
+            raise ServiceCallError(f"No transport configured for the {self.service} service")
+        with span(f"upstream.{self.service}"):
+            return self.transport.call(operation, payload)
+
+    def send(self, operation, payload, callback=None):
+        """
+        Fire-and-forget. callback(result) runs when the result arrives, except over
+        Lambda, where an Event invoke never returns one.
+        """
+        if self.transport is None:
+            raise ServiceCallError(f"No transport configured for the {self.service} service")
+        self.transport.send(operation, payload, callback)
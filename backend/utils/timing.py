@@ -0,0 +1,170 @@
+"""
+Per-request timing breakdown.
+
+Code wraps the phases of a request in spans (`with span("db.add_item"):` or
+`@timed("db.add_item")`). At the end of a Flask request the spans are reported
+in two ways:
+
+- a Server-Timing response header (visible in the browser's network panel),
+  only when SERVER_TIMING=1. It is off by default because it tells any caller
+  how long each phase took: on a login, whether bcrypt ran reveals whether
+  the username exists. Services can also turn it off for good (auth does).
+- one metrics line on stdout, in CloudWatch Embedded Metric Format on Lambda,
+  so CloudWatch turns it into per-route, per-phase metrics without any extra
+  infrastructure. Locally it is plain JSON.
+
+TIMING_METRICS=emf|json|off overrides the output format.
+Spans outside a request (background threads, direct invocations) cost one
+context variable lookup and are discarded.
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "GroceryAssistant")
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class Timings:
+    """Accumulated span durations of one request, by phase name"""
+
+    __slots__ = ("started", "durations", "counts")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+
+    def add(self, name, ms):
+        self.durations[name] = self.durations.get(name, 0.0) + ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def start_timings() -> Timings:
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current.get()
+
+
+def stop_timings():
+    _current.set(None)
+
+
+@contextmanager
+def span(name):
+    """Time a block as phase `name` of the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(timings, total_ms):
+    entries = []
+    for name, ms in timings.durations.items():
+        count = timings.counts[name]
+        entries.append(f'{name};dur={ms:.2f};desc="{count} calls"' if count > 1 else f"{name};dur={ms:.2f}")
+    entries.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(entries)
+
+
+def server_timing_enabled():
+    """Whether to send the Server-Timing header (SERVER_TIMING=1; off by default, including on Lambda)"""
+    return os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+
+def _metrics_format():
+    fmt = os.environ.get("TIMING_METRICS")
+    if fmt:
+        return fmt.lower()
+    return "emf" if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else "json"
+
+
+def metrics_record(service, route, method, status_code, timings, total_ms, fmt="json"):
+    """One request's timings as an EMF (or plain JSON) object"""
+    values = {name: round(ms, 3) for name, ms in timings.durations.items()}
+    values["total"] = round(total_ms, 3)
+    record = {"Service": service, "Route": route, "Method": method, "StatusCode": status_code}
+    if fmt == "emf":
+        record["_aws"] = {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["Service", "Route"]],
+                "Metrics": [{"Name": name, "Unit": "Milliseconds"} for name in values],
+            }],
+        }
+    else:
+        record["type"] = "request_timing"
+    record.update(values)
+    return record
+
+
+def init_request_timing(app, service, server_timing=None):
+    """
+    Time every request of a Flask app, including JSON serialization, and report
+    the spans. server_timing=False never sends the header, whatever SERVER_TIMING says.
+    """
+    from flask import request
+    from flask.json.provider import DefaultJSONProvider
+
+    class TimedJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            with span("json"):
+                return super().dumps(obj, **kwargs)
+
+    app.json = TimedJSONProvider(app)
+    fmt = _metrics_format()
+    send_header = server_timing_enabled() if server_timing is None else server_timing and server_timing_enabled()
+
+    @app.before_request
+    def _start_request_timing():
+        start_timings()
+
+    @app.after_request
+    def _report_request_timing(response):
+        timings = _current.get()
+        if timings is None:
+            return response
+        total_ms = timings.total_ms()
+        if send_header:
+            response.headers["Server-Timing"] = server_timing_header(timings, total_ms)
+        if fmt != "off":
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            record = metrics_record(service, route, request.method, response.status_code, timings, total_ms, fmt)
+            # A line of its own on stdout; Lambda forwards it to CloudWatch Logs, which extracts the metrics
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+        return response
+
+    @app.teardown_request
+    def _stop_request_timing(exc=None):
+        stop_timings()
@@ -0,0 +1,134 @@
+"""
+Prime routine for warmup invocations (serverless-plugin-warmup and similar).
+
+A warm container that has never served a request still pays for the first
+MongoDB handshake, the first TLS connection to the LLM host, secret loading
+and JWT key setup on a real user's request. On a warmup event each service runs
+its prime steps here, so that work is already done.
+
+Steps run one after another within a time budget: WARMUP_BUDGET_MS (default
+2000), capped by the Lambda's remaining time. A step that overruns the budget is
+left to finish in the background and reported as "timeout". The steps that did
+not get a chance to start are reported as "skipped".
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SOURCES = ("serverless-plugin-warmup", "warmup")
+DEFAULT_WARMUP_BUDGET_MS = 2000
+# Left over for returning the report before the invocation times out
+SAFETY_MARGIN_MS = 200
+
+
+def is_warmup_event(event) -> bool:
+    return isinstance(event, dict) and event.get("source") in WARMUP_SOURCES
+
+
+def _budget_ms(event, context):
+    budget = float(os.environ.get("WARMUP_BUDGET_MS", DEFAULT_WARMUP_BUDGET_MS))
+    if isinstance(event, dict) and event.get("budget_ms"):
+        budget = float(event["budget_ms"])
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        budget = min(budget, context.get_remaining_time_in_millis() - SAFETY_MARGIN_MS)
+    return max(budget, 0)
+
+
+def run_with_timeout(fn, timeout):
+    """Run fn in a worker thread; returns (finished, result, error)"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn()
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        return False, None, None
+    return True, outcome.get("result"), outcome.get("error")
+
+
+def run_warmup(service, steps, event=None, context=None) -> dict:
+    """
+    Run the (name, callable) prime steps and return a report of what was primed.
+
+    A step's return value (if any) is included in its report entry as "detail".
+    """
+    budget_ms = _budget_ms(event, context)
+    started = time.perf_counter()
+    primed = {}
+    for name, fn in steps:
+        remaining_ms = budget_ms - (time.perf_counter() - started) * 1000
+        if remaining_ms <= 0:
+            primed[name] = {"status": "skipped"}
+            continue
+        step_started = time.perf_counter()
+        finished, result, error = run_with_timeout(fn, remaining_ms / 1000)
+        entry = {"ms": round((time.perf_counter() - step_started) * 1000, 1)}
+        if not finished:
+            entry["status"] = "timeout"
+        elif error is not None:
+            entry["status"] = "failed"
+            entry["error"] = str(error)
+        else:
+            entry["status"] = "ok"
+            if result is not None:
+                entry["detail"] = result
+        primed[name] = entry
+
+    report = {
+        "warmup": True,
+        "service": service,
+        "budget_ms": round(budget_ms, 1),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "primed": primed,
+    }
+    logger.info("Warmup primed %s of %s steps in %s ms",
+                sum(1 for entry in primed.values() if entry["status"] == "ok"), len(primed),
+                report["elapsed_ms"], extra={"warmup": primed})
+    return report
+
+
+# --- Steps shared by the services ---
+
+def prime_jwt(app):
+    """Load the signing key and run one token through create/decode (and the verified-token cache)"""
+    from flask_jwt_extended import create_access_token, decode_token
+
+    with app.app_context():
+        token = create_access_token(identity="warmup")
+        decode_token(token)
+
+
+def prime_mongo(get_db):
+    """Create the database wrapper (first connection) and ping over the pool"""
+    db = get_db()
+    if db is None:
+        raise RuntimeError("database unavailable")
+    db.client.admin.command("ping")
+
+
+def prime_request(app, path):
+    """Dispatch one request through the adapter, Flask routing, CORS and JSON serialization"""
+    from utils.lambda_adapter import handle_api_gateway_event
+
+    event = {
+        "httpMethod": "GET",
+        "path": path,
+        "headers": {"Accept": "application/json", "X-Request-Id": "warmup"},
+        "requestContext": {"identity": {"sourceIp": "127.0.0.1"}},
+    }
+    return {"status_code": handle_api_gateway_event(app, event)["statusCode"]}
+
+
+def prime_http_session(session, url, timeout=2.0):
+    """Open (and pool) the TCP/TLS connection to an upstream host; any HTTP status will do"""
+    response = session.head(url, timeout=timeout)
+    return {"status_code": response.status_code}
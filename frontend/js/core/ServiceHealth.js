@@ -75,7 +75,14 @@ export class ServiceHealth {
             service.failureCount = 0;
             service.consecutiveFailures = 0;
             
-            const newStatus = response.ok ? 'healthy' : 'unhealthy';
+            // Readiness reports 'degraded' (200) when only a non-critical dependency, like the LLM, is down
+            let newStatus = response.ok ? 'healthy' : 'unhealthy';
+            if (response.ok) {
+                const body = await response.json().catch(() => null);
+                if (body?.status === 'degraded') {
+                    newStatus = 'degraded';
+                }
+            }
             if (service.status !== newStatus) {
                 service.status = newStatus;
                 this.emitStatusChange(serviceId, newStatus);
@@ -221,6 +221,11 @@ resource "aws_api_gateway_rest_api" "main" {
   name        = "${var.project_name}-API-${var.stage}"
   description = "API Gateway for ${var.project_name}"
 
+  # Lets base64 (e.g. gzip-compressed) Lambda responses through as binary. It also makes every
+  # request body binary: Lambda proxy bodies arrive base64-encoded (the adapter decodes them), and
+  # the MOCK OPTIONS integrations need content_handling = "CONVERT_TO_TEXT" to apply their templates
+  binary_media_types = ["*/*"]
+
   endpoint_configuration {
     types = ["REGIONAL"]
   }
@@ -407,6 +412,9 @@ resource "aws_api_gateway_integration" "auth_login_options_mock" {
   http_method = aws_api_gateway_method.auth_login_options.http_method
   type        = "MOCK" # Use MOCK integration for OPTIONS
 
+  # binary_media_types is */*; without this the request template below would not apply
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -431,6 +439,8 @@ resource "aws_api_gateway_integration_response" "auth_login_options_200" {
   http_method = aws_api_gateway_method.auth_login_options.http_method
   status_code = aws_api_gateway_method_response.auth_login_options_200.status_code
 
+  content_handling = "CONVERT_TO_TEXT"
+
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
     "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'",
@@ -456,6 +466,9 @@ resource "aws_api_gateway_integration" "auth_register_options_mock" {
   resource_id = aws_api_gateway_resource.auth_register.id
   http_method = aws_api_gateway_method.auth_register_options.http_method
   type        = "MOCK"
+
+  # binary_media_types is */*; without this the request template below would not apply
+  content_handling = "CONVERT_TO_TEXT"
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -478,6 +491,8 @@ resource "aws_api_gateway_integration_response" "auth_register_options_200" {
   resource_id = aws_api_gateway_resource.auth_register.id
   http_method = aws_api_gateway_method.auth_register_options.http_method
   status_code = aws_api_gateway_method_response.auth_register_options_200.status_code
+
+  content_handling = "CONVERT_TO_TEXT"
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
     "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'",
@@ -502,6 +517,9 @@ resource "aws_api_gateway_integration" "inventory_items_options_mock" {
   resource_id = aws_api_gateway_resource.inventory_items.id
   http_method = aws_api_gateway_method.inventory_items_options.http_method
   type        = "MOCK"
+
+  # binary_media_types is */*; without this the request template below would not apply
+  content_handling = "CONVERT_TO_TEXT"
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -524,6 +542,8 @@ resource "aws_api_gateway_integration_response" "inventory_items_options_200" {
   resource_id = aws_api_gateway_resource.inventory_items.id
   http_method = aws_api_gateway_method.inventory_items_options.http_method
   status_code = aws_api_gateway_method_response.inventory_items_options_200.status_code
+
+  content_handling = "CONVERT_TO_TEXT"
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,OPTIONS'",
@@ -548,6 +568,9 @@ resource "aws_api_gateway_integration" "inventory_item_id_options_mock" {
   resource_id = aws_api_gateway_resource.inventory_item_id.id
   http_method = aws_api_gateway_method.inventory_item_id_options.http_method
   type        = "MOCK"
+
+  # binary_media_types is */*; without this the request template below would not apply
+  content_handling = "CONVERT_TO_TEXT"
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -570,6 +593,8 @@ resource "aws_api_gateway_integration_response" "inventory_item_id_options_200"
   resource_id = aws_api_gateway_resource.inventory_item_id.id
   http_method = aws_api_gateway_method.inventory_item_id_options.http_method
   status_code = aws_api_gateway_method_response.inventory_item_id_options_200.status_code
+
+  content_handling = "CONVERT_TO_TEXT"
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
     "method.response.header.Access-Control-Allow-Methods" = "'DELETE,OPTIONS'",
@@ -594,6 +619,9 @@ resource "aws_api_gateway_integration" "recipes_generate_options_mock" {
   resource_id = aws_api_gateway_resource.recipes_generate.id
   http_method = aws_api_gateway_method.recipes_generate_options.http_method
   type        = "MOCK"
+
+  # binary_media_types is */*; without this the request template below would not apply
+  content_handling = "CONVERT_TO_TEXT"
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -616,6 +644,8 @@ resource "aws_api_gateway_integration_response" "recipes_generate_options_200" {
   resource_id = aws_api_gateway_resource.recipes_generate.id
   http_method = aws_api_gateway_method.recipes_generate_options.http_method
   status_code = aws_api_gateway_method_response.recipes_generate_options_200.status_code
+
+  content_handling = "CONVERT_TO_TEXT"
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
     "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'",